@@ -90,3 +90,117 @@ GO
 
 
 
+
+USE [datos_regulatorios_reco]
+GO
+
+/****** Object:  Table [dbo].[Interrupciones Equipos] ******/
+-- Tabla puente Interrupciones → Equipos de maniobras: una fila por código de la lista
+-- [Código de Equipo] de cada interrupción (la carga el ETL junto con Interrupciones)
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+CREATE TABLE [dbo].[Interrupciones Equipos](
+	[id] [int] IDENTITY(1,1) NOT NULL,
+	[ID_Interrupcion] [nvarchar](50) NULL,
+	[Código de equipo] [varchar](100) NULL,
+	[Posición] [int] NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[id] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+-- "¿Qué interrupciones afectaron al equipo X?" es un index seek (cubre ID_Interrupcion)
+CREATE NONCLUSTERED INDEX [IX_Interrupciones_Equipos_Código_de_equipo_ID_Interrupcion]
+	ON [dbo].[Interrupciones Equipos] ([Código de equipo], [ID_Interrupcion])
+GO
+
+CREATE NONCLUSTERED INDEX [IX_Interrupciones_Equipos_ID_Interrupcion]
+	ON [dbo].[Interrupciones Equipos] ([ID_Interrupcion])
+GO
+
+-- Tabla [dbo].[Interrupciones Equipos] creada exitosamente.
+
+/****** Object:  Table [dbo].[Topologia Red] ******/
+-- Índice del árbol de alimentadores (Equipos de maniobras y Centro MTBT): lo arma y
+-- actualiza el ETL después de cargar (ver topologia.py)
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+CREATE TABLE [dbo].[Topologia Red](
+	[id] [int] IDENTITY(1,1) NOT NULL,
+	[Tipo] [varchar](10) NULL,
+	[Código] [varchar](100) NULL,
+	[Padre] [varchar](100) NULL,
+	[Raíz] [varchar](110) NULL,
+	[Profundidad] [int] NULL,
+	[Entrada] [int] NULL,
+	[Salida] [int] NULL,
+	[KVA] [decimal](10, 2) NULL,
+	[KVA aguas abajo] [decimal](18, 4) NULL,
+	[Centros aguas abajo] [int] NULL,
+	[Estado] [varchar](20) NULL,
+	[Hash árbol] [bigint] NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[id] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+-- Subárbol de un equipo: [Raíz] = x.[Raíz] AND [Entrada] BETWEEN x.[Entrada] AND x.[Salida]
+CREATE NONCLUSTERED INDEX [IX_Topologia_Red_Raíz_Entrada]
+	ON [dbo].[Topologia Red] ([Raíz], [Entrada])
+GO
+
+CREATE NONCLUSTERED INDEX [IX_Topologia_Red_Código]
+	ON [dbo].[Topologia Red] ([Código])
+GO
+
+-- Tabla [dbo].[Topologia Red] creada exitosamente.
+
+/****** Object:  Table [dbo].[Resumen Confiabilidad] ******/
+-- Agregados de Interrupciones por mes, causa, origen y equipo: los mantiene el ETL
+-- (ver confiabilidad.py); [Código de equipo] = '(todos)' son los totales sin abrir por equipo
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+CREATE TABLE [dbo].[Resumen Confiabilidad](
+	[id] [int] IDENTITY(1,1) NOT NULL,
+	[Mes] [char](7) NULL,
+	[Causa] [varchar](255) NULL,
+	[Origen del evento] [varchar](100) NULL,
+	[Código de equipo] [varchar](100) NULL,
+	[Interrupciones] [int] NULL,
+	[Minutos] [decimal](18, 2) NULL,
+	[Minutos máximo] [decimal](18, 2) NULL,
+	[Sin duración] [int] NULL,
+	[KVA afectado] [decimal](18, 4) NULL,
+	[KVA minutos] [decimal](24, 4) NULL,
+PRIMARY KEY CLUSTERED 
+(
+	[id] ASC
+)WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, ALLOW_PAGE_LOCKS = ON, OPTIMIZE_FOR_SEQUENTIAL_KEY = OFF) ON [PRIMARY]
+) ON [PRIMARY]
+GO
+
+CREATE NONCLUSTERED INDEX [IX_Resumen_Confiabilidad_Mes]
+	ON [dbo].[Resumen Confiabilidad] ([Mes])
+GO
+
+CREATE NONCLUSTERED INDEX [IX_Resumen_Confiabilidad_Código_de_equipo_Mes]
+	ON [dbo].[Resumen Confiabilidad] ([Código de equipo], [Mes])
+GO
+
+-- Tabla [dbo].[Resumen Confiabilidad] creada exitosamente.
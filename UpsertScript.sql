@@ -0,0 +1,78 @@
+USE [datos_regulatorios_reco]
+GO
+
+/****** Preparación de las tablas para el modo upsert (--modo upsert) ******/
+-- 1. Elimina duplicados ya existentes por llave natural (se conserva el registro más reciente)
+-- 2. Agrega la columna [hash_fila] usada para omitir filas sin cambios
+-- 3. Crea índices únicos filtrados sobre la llave natural para el MERGE
+
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+-- =============================================================================
+-- 1. LIMPIEZA DE DUPLICADOS
+-- =============================================================================
+WITH duplicados AS (
+	SELECT [id], ROW_NUMBER() OVER (PARTITION BY [Código Centro de transformación MT/BT] ORDER BY [id] DESC) AS n
+	FROM [dbo].[Centro MTBT]
+	WHERE [Código Centro de transformación MT/BT] IS NOT NULL
+)
+DELETE FROM duplicados WHERE n > 1;
+GO
+
+WITH duplicados AS (
+	SELECT [id], ROW_NUMBER() OVER (PARTITION BY [Código de equipo] ORDER BY [id] DESC) AS n
+	FROM [dbo].[Equipos de maniobras]
+	WHERE [Código de equipo] IS NOT NULL
+)
+DELETE FROM duplicados WHERE n > 1;
+GO
+
+WITH duplicados AS (
+	SELECT [id], ROW_NUMBER() OVER (PARTITION BY [ID_Interrupcion] ORDER BY [id] DESC) AS n
+	FROM [dbo].[Interrupciones]
+	WHERE [ID_Interrupcion] IS NOT NULL
+)
+DELETE FROM duplicados WHERE n > 1;
+GO
+
+-- =============================================================================
+-- 2. COLUMNA HASH DE FILA
+-- =============================================================================
+IF COL_LENGTH('dbo.Centro MTBT', 'hash_fila') IS NULL
+	ALTER TABLE [dbo].[Centro MTBT] ADD [hash_fila] [bigint] NULL;
+GO
+
+IF COL_LENGTH('dbo.Equipos de maniobras', 'hash_fila') IS NULL
+	ALTER TABLE [dbo].[Equipos de maniobras] ADD [hash_fila] [bigint] NULL;
+GO
+
+IF COL_LENGTH('dbo.Interrupciones', 'hash_fila') IS NULL
+	ALTER TABLE [dbo].[Interrupciones] ADD [hash_fila] [bigint] NULL;
+GO
+
+-- =============================================================================
+-- 3. ÍNDICES ÚNICOS SOBRE LA LLAVE NATURAL
+-- =============================================================================
+CREATE UNIQUE NONCLUSTERED INDEX [UX_Centro_MTBT_Codigo]
+ON [dbo].[Centro MTBT] ([Código Centro de transformación MT/BT])
+INCLUDE ([hash_fila])
+WHERE [Código Centro de transformación MT/BT] IS NOT NULL;
+GO
+
+CREATE UNIQUE NONCLUSTERED INDEX [UX_Equipos_de_maniobras_Codigo]
+ON [dbo].[Equipos de maniobras] ([Código de equipo])
+INCLUDE ([hash_fila])
+WHERE [Código de equipo] IS NOT NULL;
+GO
+
+CREATE UNIQUE NONCLUSTERED INDEX [UX_Interrupciones_ID]
+ON [dbo].[Interrupciones] ([ID_Interrupcion])
+INCLUDE ([hash_fila])
+WHERE [ID_Interrupcion] IS NOT NULL;
+GO
+
+-- Tablas preparadas para el modo upsert.
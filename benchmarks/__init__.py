@@ -0,0 +1,6 @@
+"""
+Benchmarks reproducibles del ETL de sistemas aislados
+
+    python -m benchmarks.generador --filas 100000 --salida bench_data/
+    python -m benchmarks.suite --filas 1000 10000 100000
+"""
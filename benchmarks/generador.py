@@ -0,0 +1,179 @@
+import argparse
+import random
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+# =============================================================================
+# VARIANTES DE ENCABEZADOS (como llegan en las plantillas reales)
+# =============================================================================
+ENCABEZADOS = {
+    'Centro MTBT': [
+        ['Código Centro MT/BT', 'Codigo Centro MT/BT', 'Código Centro de transformación MT/BT'],
+        ['KVA instalado por transformador'],
+        ['Equipo aguas arriba'],
+        ['Propietario'],
+        ['UTM Centro MT/BT Norte'],
+        ['UTM Centro MT/BT Oeste'],
+    ],
+    'Equipos de maniobras': [
+        ['Código de Equipo', 'Codigo de Equipo', 'Codigo de equipo', 'Código de equipo'],
+        ['Tipo de Equipo', 'Tipo de equipo'],
+        ['Código de subestación'],
+        ['Codigo de Equipo Aguas Arriba'],
+        ['Nivel de tensión', 'Nivel de tension'],
+        ['Corriente máxima', 'Corriente maxima'],
+        ['UTM Equipo Norte'],
+        ['UTM Equipo Oeste'],
+    ],
+    'Interrupciones': [
+        ['ID_Interrupcion', 'ID Interrupcion'],
+        ['Fecha y Hora_Inicio', 'Fecha y Hora Inicio'],
+        ['Fecha y Hora_Cierre', 'Fecha y Hora Cierre'],
+        ['Causa'],
+        ['Fecha Notificacion al Usuario', 'Fecha Notificación al Usuario'],
+        ['Origen del evento'],
+        ['Código de Equipo', 'Codigo de Equipo'],
+        ['Enlace Medio de Notificacion a los Usuarios'],
+        ['Observaciones'],
+    ],
+}
+
+TIPOS_EQUIPO = ['Cuchilla monopolar', 'Cortacircuito', 'Interruptor', 'Reconectador', 'Seccionador']
+PROPIETARIOS = ['RECO', 'USUARIO (PRIVADO)', ' RECO ', 'reco']
+CAUSAS = ['Despeje Programado', 'Despeje No Programado', 'Despeje  Programado ']
+ORIGENES = ['DISTRIBUCION', 'TRANSMISION', 'EXTERNO']
+FECHAS_INVALIDAS = ['31/02/2025', 'pendiente', '2025-13-01', '-', 'N/A']
+TEXTOS_NULOS = ['nan', 'N/A', '#N/A', '-', '']
+
+# =============================================================================
+# GENERADORES DE FILAS
+# =============================================================================
+def _sucio(rng, proporcion):
+    return rng.random() < proporcion
+
+
+def _codigo_equipo(i):
+    return f"EQ-{i:06d}"
+
+
+def _filas_equipos(rng, n_equipos, proporcion_sucia):
+    for i in range(n_equipos):
+        aguas_arriba = _codigo_equipo(rng.randrange(i)) if i else None
+        if aguas_arriba and _sucio(rng, proporcion_sucia):
+            aguas_arriba = f"{aguas_arriba}, {_codigo_equipo(rng.randrange(max(i, 1)))}"
+        tension = rng.choice([4.16, 7.6, 13.8, 2.4])
+        if _sucio(rng, proporcion_sucia):
+            tension = 34.5  # sobre el umbral de advertencia (9.99 kV)
+        yield (
+            f"  {_codigo_equipo(i)} " if _sucio(rng, proporcion_sucia) else _codigo_equipo(i),
+            rng.choice(TIPOS_EQUIPO),
+            f"SE-{rng.randrange(20):02d}",
+            aguas_arriba,
+            tension,
+            rng.choice([100, 200, 400, 630.4]),
+            rng.randrange(1_500_000, 1_800_000),
+            rng.randrange(200_000, 900_000),
+        )
+
+
+def _filas_centros(rng, n_centros, n_equipos, proporcion_sucia):
+    for i in range(n_centros):
+        kva = rng.choice([10, 15, 25, 37.5, 50, 75])
+        if _sucio(rng, proporcion_sucia):
+            kva = rng.choice([150, 500.5, 'sin dato'])  # sobre el umbral de advertencia o texto
+        aguas_arriba = _codigo_equipo(rng.randrange(n_equipos))
+        if _sucio(rng, proporcion_sucia):
+            aguas_arriba = rng.choice(TEXTOS_NULOS)
+        yield (
+            f"CT-{i:07d}",
+            kva,
+            aguas_arriba,
+            rng.choice(PROPIETARIOS),
+            rng.randrange(1_500_000, 1_800_000),
+            rng.randrange(200_000, 900_000) if not _sucio(rng, proporcion_sucia) else 'nan',
+        )
+
+
+def _filas_interrupciones(rng, n_interrupciones, n_equipos, proporcion_sucia):
+    base = datetime(2020, 1, 1)
+    for i in range(n_interrupciones):
+        inicio = base + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+        cierre = inicio + timedelta(minutes=rng.randrange(5, 600))
+        n_codigos = 1 if not _sucio(rng, 10 * proporcion_sucia) else rng.randrange(2, 5)
+        codigos = ", ".join(_codigo_equipo(rng.randrange(n_equipos)) for _ in range(n_codigos))
+        notificacion = (inicio - timedelta(days=2)).date()
+
+        inicio_celda = inicio
+        if _sucio(rng, proporcion_sucia):
+            inicio_celda = rng.choice(FECHAS_INVALIDAS)
+        elif _sucio(rng, proporcion_sucia):
+            inicio_celda = inicio.strftime('%d/%m/%Y %H:%M')  # fecha como texto
+
+        yield (
+            f"{'IP' if rng.random() < 0.3 else 'I'}{i:07d}",
+            inicio_celda,
+            cierre,
+            rng.choice(CAUSAS),
+            notificacion if not _sucio(rng, proporcion_sucia) else rng.choice(FECHAS_INVALIDAS),
+            rng.choice(ORIGENES),
+            codigos,
+            rng.choice(['https://facebook.com/reco/posts/1', 'nan', None]),
+            rng.choice(['Mantenimiento  preventivo', ' Falla en línea ', 'nan', None]),
+        )
+
+# =============================================================================
+# GENERADOR DE LIBROS
+# =============================================================================
+def generar_libro(ruta, filas=1000, semilla=0, proporcion_sucia=0.02):
+    """
+    Genera un libro con las hojas 'Centro MTBT', 'Equipos de maniobras' e 'Interrupciones'
+    `filas` es el número de interrupciones y de centros; los equipos son filas/10 (mínimo 50)
+    Se escribe en modo write_only para poder generar millones de filas con memoria acotada
+    """
+    rng = random.Random(semilla)
+    n_equipos = max(50, filas // 10)
+
+    libro = Workbook(write_only=True)
+    hojas = {
+        'Centro MTBT': _filas_centros(rng, filas, n_equipos, proporcion_sucia),
+        'Equipos de maniobras': _filas_equipos(rng, n_equipos, proporcion_sucia),
+        'Interrupciones': _filas_interrupciones(rng, filas, n_equipos, proporcion_sucia),
+    }
+
+    for nombre_hoja, filas_hoja in hojas.items():
+        hoja = libro.create_sheet(nombre_hoja)
+        hoja.append([rng.choice(variantes) for variantes in ENCABEZADOS[nombre_hoja]])
+        for fila in filas_hoja:
+            hoja.append(fila)
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    libro.save(ruta)
+    return ruta
+
+
+def generar_carpeta(carpeta, filas=1000, archivos=1, semilla=0, proporcion_sucia=0.02):
+    """Genera `archivos` libros mensuales en la carpeta; retorna sus rutas"""
+    carpeta = Path(carpeta)
+    return [
+        generar_libro(
+            carpeta / f"Plantilla_Sintetica_{filas}_{n:02d}.xlsx",
+            filas=filas, semilla=semilla + n, proporcion_sucia=proporcion_sucia,
+        )
+        for n in range(1, archivos + 1)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera libros sintéticos para benchmarks del ETL")
+    parser.add_argument('--filas', type=int, default=10000, help="Filas de Interrupciones y Centro MTBT por libro")
+    parser.add_argument('--archivos', type=int, default=1, help="Número de libros a generar")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--sucio', type=float, default=0.02, help="Proporción de celdas con problemas")
+    parser.add_argument('--salida', default='bench_data', help="Carpeta de salida")
+    args = parser.parse_args()
+
+    for ruta in generar_carpeta(args.salida, args.filas, args.archivos, args.semilla, args.sucio):
+        print(f"✓ {ruta}")
@@ -0,0 +1,148 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Para medir no se conecta nunca a SQL Server (la carga se mide contra SQLite)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import etl_sistemas_aislados as etl  # noqa: E402
+from lector_excel import LibroExcel  # noqa: E402
+from cargadores import obtener_cargador  # noqa: E402
+from mapeo_columnas import CatalogoColumnas  # noqa: E402
+from benchmarks.generador import generar_libro  # noqa: E402
+
+CARPETA_RESULTADOS = Path(__file__).resolve().parent / 'resultados'
+RUTA_BASE = CARPETA_RESULTADOS / 'baseline.json'
+HOJAS = list(etl.TABLE_NAMES)
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+def mejor_tiempo(funcion, repeticiones):
+    """Mejor tiempo (segundos) de `repeticiones` ejecuciones de funcion()"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def medir_tamano(filas, carpeta, repeticiones=3, cargador='executemany'):
+    """Mide cada operación del pipeline sobre un libro sintético de `filas` filas"""
+    archivo = carpeta / f"bench_{filas}.xlsx"
+    if not archivo.exists():
+        generar_libro(archivo, filas=filas)
+
+    resultados = {}
+    resultados['obtener_archivos_excel'] = mejor_tiempo(lambda: etl.obtener_archivos_excel(carpeta), repeticiones)
+    resultados['read_excel'] = mejor_tiempo(
+        lambda: [pd.read_excel(archivo, sheet_name=hoja) for hoja in HOJAS], repeticiones
+    )
+
+    def leer_libro():
+        with LibroExcel(archivo) as libro:
+            return libro.leer_hojas(HOJAS)
+    resultados['libro_excel'] = mejor_tiempo(leer_libro, repeticiones)
+
+    crudos = leer_libro()
+    resultados['mapear_columnas'] = mejor_tiempo(
+        lambda: [etl.mapear_columnas(crudos[hoja], hoja) for hoja in HOJAS], repeticiones
+    )
+    resultados['limpiar_dataframe'] = mejor_tiempo(
+        lambda: [etl.limpiar_dataframe(crudos[hoja].copy(), hoja) for hoja in HOJAS], repeticiones
+    )
+
+    limpios = {hoja: etl.limpiar_dataframe(crudos[hoja].copy(), hoja) for hoja in HOJAS}
+    engine = create_engine(f"sqlite:///{carpeta / f'bench_{filas}.db'}")
+    estrategia = obtener_cargador(cargador)
+    resultados[f'carga_sqlite_{estrategia.nombre}'] = mejor_tiempo(
+        lambda: [estrategia.cargar(limpios[hoja], etl.TABLE_NAMES[hoja], engine, if_exists='replace')
+                 for hoja in HOJAS],
+        repeticiones
+    )
+    engine.dispose()
+
+    return resultados
+
+# =============================================================================
+# COMPARACIÓN CONTRA LA LÍNEA BASE
+# =============================================================================
+def comparar(resultados, base, tolerancia):
+    """Imprime la tabla de tiempos y retorna la lista de regresiones (> 1 + tolerancia)"""
+    regresiones = []
+    print(f"\n{'filas':>10}  {'operación':<28}{'actual (s)':>12}{'base (s)':>12}{'razón':>8}")
+    print("-" * 72)
+    for filas, operaciones in resultados.items():
+        for operacion, segundos in operaciones.items():
+            referencia = base.get(filas, {}).get(operacion)
+            if referencia:
+                razon = segundos / referencia
+                marca = '  ⚠️' if razon > 1 + tolerancia else ''
+                if marca:
+                    regresiones.append((filas, operacion, razon))
+                print(f"{filas:>10}  {operacion:<28}{segundos:>12.4f}{referencia:>12.4f}{razon:>7.2f}x{marca}")
+            else:
+                print(f"{filas:>10}  {operacion:<28}{segundos:>12.4f}{'-':>12}{'-':>8}")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks del ETL de sistemas aislados")
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 10000], help="Tamaños a medir")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--cargador', default='executemany', help="Estrategia de carga a medir contra SQLite")
+    parser.add_argument('--datos', default=None, help="Carpeta para los libros generados (se reutilizan)")
+    parser.add_argument('--base', default=str(RUTA_BASE), help="Archivo de línea base")
+    parser.add_argument('--guardar-base', action='store_true', help="Guarda estos resultados como nueva línea base")
+    parser.add_argument('--tolerancia', type=float, default=0.20, help="Regresión tolerada (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    # Los logs del ETL no interesan aquí, solo los tiempos
+    logging.getLogger().setLevel(logging.ERROR)
+
+    carpeta = Path(args.datos) if args.datos else Path(tempfile.mkdtemp(prefix='etl_bench_'))
+    carpeta.mkdir(parents=True, exist_ok=True)
+    # El catálogo de columnas se toma del esquema local (sin SQL Server)
+    etl.usar_catalogo(CatalogoColumnas(engine=None))
+
+    resultados = {}
+    for filas in args.filas:
+        print(f"Midiendo {filas:,} filas...")
+        resultados[str(filas)] = medir_tamano(filas, carpeta, args.repeticiones, args.cargador)
+
+    ruta_base = Path(args.base)
+    base = {}
+    if ruta_base.exists():
+        with open(ruta_base, encoding='utf-8') as f:
+            base = json.load(f).get('resultados', {})
+
+    regresiones = comparar(resultados, base, args.tolerancia)
+
+    CARPETA_RESULTADOS.mkdir(parents=True, exist_ok=True)
+    contenido = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'maquina': platform.node(),
+        'resultados': resultados,
+    }
+    with open(CARPETA_RESULTADOS / 'ultimo.json', 'w', encoding='utf-8') as f:
+        json.dump(contenido, f, indent=2)
+    if args.guardar_base:
+        with open(ruta_base, 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, indent=2)
+        print(f"\n✓ Línea base guardada en {ruta_base}")
+
+    if regresiones:
+        print(f"\n⚠️  {len(regresiones)} operación(es) más lentas que la línea base (> {args.tolerancia:.0%})")
+        sys.exit(1)
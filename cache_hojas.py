@@ -0,0 +1,205 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from importlib.util import find_spec
+
+import pandas as pd
+
+from manifiesto import hash_archivo
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CACHÉ DE HOJAS EN PARQUET (DIRECCIONADA POR CONTENIDO)
+# =============================================================================
+#
+# Cada hoja leída (y opcionalmente su versión limpia) se guarda como Parquet en:
+#
+#   .cache/hojas/<sha256[:2]>/<sha256 del libro>/<hoja>_<etapa>[_<versión>].parquet
+#   .cache/hojas/<sha256[:2]>/<sha256 del libro>/hojas.json   (nombres de las hojas)
+#
+# La clave es el contenido del archivo, no su nombre: un libro renombrado o copiado
+# reutiliza la caché, y uno modificado nunca recibe datos viejos. Las hojas limpias
+# llevan además la versión de la limpieza (esquema + mapeo), así un cambio de
+# esquema no reutiliza resultados anteriores. Cuando la carpeta supera el tamaño
+# máximo se borran primero los archivos usados hace más tiempo
+
+CARPETA_CACHE_POR_DEFECTO = Path('.cache') / 'hojas'
+TAMANO_MAXIMO_MB_POR_DEFECTO = 1024
+
+# Sin pyarrow no hay caché (el ETL funciona igual, solo vuelve a parsear el Excel)
+PYARROW_DISPONIBLE = find_spec('pyarrow') is not None
+
+
+def _nombre_hoja(hoja):
+    """Nombre de archivo seguro para una hoja ('Centro MTBT' → 'Centro_MTBT-1a2b3c4d')"""
+    legible = ''.join(c if c.isalnum() else '_' for c in hoja)[:40]
+    return f"{legible}-{hashlib.sha1(hoja.encode('utf-8')).hexdigest()[:8]}"
+
+
+def preparar_para_parquet(df):
+    """
+    Ajusta un DataFrame para que Parquet lo pueda guardar sin perder filas:
+    encabezados como texto y columnas con tipos mezclados (número + texto, fecha + texto)
+    convertidas a texto. Los nulos se conservan
+    """
+    import pyarrow as pa
+
+    if any(not isinstance(col, str) for col in df.columns):
+        df = df.rename(columns=str)
+
+    mezcladas = []
+    for col in df.select_dtypes(include=['object']).columns:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            mezcladas.append(col)
+
+    if mezcladas:
+        df = df.copy()
+        for col in mezcladas:
+            serie = df[col]
+            df[col] = serie.where(serie.isna(), serie.astype(str))
+    return df
+
+
+class CacheHojas:
+    """
+    Caché local de DataFrames por (hash del libro, hoja, etapa, versión) en Parquet.
+    Las lecturas usan memory-map, así recuperar una hoja cuesta milisegundos
+    """
+
+    def __init__(self, carpeta=None, tamano_maximo_mb=None):
+        self.carpeta = Path(carpeta or os.getenv('ETL_CACHE_DIR', CARPETA_CACHE_POR_DEFECTO))
+        self.tamano_maximo = int(
+            float(tamano_maximo_mb or os.getenv('ETL_CACHE_MAX_MB', TAMANO_MAXIMO_MB_POR_DEFECTO)) * 1024 * 1024
+        )
+        self.activa = PYARROW_DISPONIBLE
+        if not self.activa:
+            logger.warning("⚠️  pyarrow no está instalado - caché de hojas desactivada")
+        # Hash calculado en esta corrida por (ruta, tamaño, mtime)
+        self._hashes = {}
+
+    def hash_libro(self, archivo):
+        """SHA-256 del libro; se calcula una sola vez por corrida mientras el archivo no cambie"""
+        estado = os.stat(archivo)
+        clave = (str(archivo), estado.st_size, estado.st_mtime)
+        if clave not in self._hashes:
+            self._hashes[clave] = hash_archivo(archivo)
+        return self._hashes[clave]
+
+    def _carpeta_libro(self, hash_contenido):
+        return self.carpeta / hash_contenido[:2] / hash_contenido
+
+    def ruta(self, hash_contenido, hoja, etapa='cruda', version=None):
+        sufijo = f"_{version}" if version else ''
+        return self._carpeta_libro(hash_contenido) / f"{_nombre_hoja(hoja)}_{etapa}{sufijo}.parquet"
+
+    # Nombres de hojas (para no abrir el libro cuando todo está en caché)
+    def leer_nombres_hojas(self, hash_contenido):
+        if not self.activa:
+            return None
+        ruta = self._carpeta_libro(hash_contenido) / 'hojas.json'
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def guardar_nombres_hojas(self, hash_contenido, nombres):
+        if not self.activa:
+            return
+        ruta = self._carpeta_libro(hash_contenido) / 'hojas.json'
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(list(nombres), f, ensure_ascii=False)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.debug(f"   No se pudo guardar la lista de hojas en caché: {str(e)}")
+
+    # DataFrames
+    def leer(self, hash_contenido, hoja, etapa='cruda', version=None):
+        """DataFrame guardado, o None si no está en caché (o el archivo está dañado)"""
+        if not self.activa:
+            return None
+        ruta = self.ruta(hash_contenido, hoja, etapa, version)
+        if not ruta.exists():
+            return None
+        try:
+            df = pd.read_parquet(ruta, engine='pyarrow', memory_map=True)
+        except Exception as e:
+            logger.warning(f"   ⚠️  Entrada de caché dañada {ruta.name}: {str(e)} - se descarta")
+            ruta.unlink(missing_ok=True)
+            return None
+        # Marca de uso para el desalojo (el más antiguo se borra primero)
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return df
+
+    def guardar(self, df, hash_contenido, hoja, etapa='cruda', version=None):
+        """
+        Guarda el DataFrame y retorna la versión que se guardó (la misma que se
+        recuperará en las corridas siguientes, ver preparar_para_parquet)
+        """
+        if not self.activa:
+            return df
+        df = preparar_para_parquet(df)
+        ruta = self.ruta(hash_contenido, hoja, etapa, version)
+        temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(temporal, engine='pyarrow')
+            os.replace(temporal, ruta)
+        except Exception as e:
+            logger.warning(f"   ⚠️  No se pudo guardar '{hoja}' en la caché: {str(e)}")
+            temporal.unlink(missing_ok=True)
+            return df
+        self.desalojar()
+        return df
+
+    def obtener(self, hash_contenido, hoja, calcular, etapa='cruda', version=None):
+        """Lee de la caché o, si no está, ejecuta calcular() y guarda el resultado"""
+        df = self.leer(hash_contenido, hoja, etapa, version)
+        if df is None:
+            df = self.guardar(calcular(), hash_contenido, hoja, etapa, version)
+        return df
+
+    # Desalojo por tamaño
+    def tamano_actual(self):
+        return sum(ruta.stat().st_size for ruta in self.carpeta.rglob('*.parquet'))
+
+    def desalojar(self):
+        """Borra los archivos usados hace más tiempo hasta quedar bajo el tamaño máximo"""
+        entradas = []
+        for ruta in self.carpeta.rglob('*.parquet'):
+            try:
+                estado = ruta.stat()
+            except OSError:
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        if total <= self.tamano_maximo:
+            return 0
+
+        borrados = 0
+        for _, tamano, ruta in sorted(entradas, key=lambda e: e[0]):
+            if total <= self.tamano_maximo:
+                break
+            ruta.unlink(missing_ok=True)
+            total -= tamano
+            borrados += 1
+        logger.info(f"   Caché de hojas: {borrados} archivo(s) desalojados ({total / 1024 / 1024:.1f} MB en uso)")
+        return borrados
+
+    def limpiar(self):
+        """Vacía la caché completa"""
+        for ruta in self.carpeta.rglob('*'):
+            if ruta.is_file():
+                ruta.unlink(missing_ok=True)
@@ -0,0 +1,634 @@
+import csv
+import os
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import pandas as pd
+
+from esquemas import tipos_sql
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# LÍMITES DE PARÁMETROS POR MOTOR DE BASE DE DATOS
+# =============================================================================
+
+# SQL Server acepta como máximo 2100 parámetros por sentencia y 1000 filas en un VALUES
+# SQLite compilado antes de 3.32 acepta 999 parámetros (se usa el valor conservador)
+LIMITE_PARAMETROS = {
+    'mssql': 2100,
+    'sqlite': 999,
+}
+LIMITE_FILAS_VALUES = {
+    'mssql': 1000,
+}
+LIMITE_PARAMETROS_POR_DEFECTO = 999
+
+# Errores atribuibles a los datos de una fila (desborde de DECIMAL, texto más largo que la
+# columna, conversión fallida, restricciones): solo estos se aíslan por bisección. Los de
+# conexión, permisos o columnas inexistentes afectan a todas las filas y se propagan
+ERRORES_DE_DATOS = ('DataError', 'IntegrityError')
+
+# Filas rechazadas a partir de las cuales la hoja se da por fallida (demasiados viajes)
+MAX_RECHAZOS_POR_DEFECTO = 1000
+
+# Columna con el error de la base de datos en el DataFrame de filas rechazadas
+COLUMNA_ERROR = 'error_bd'
+
+
+def _nombre_calificado(engine, tabla):
+    """Nombre de tabla entre delimitadores según el dialecto ([..] en SQL Server, ".." en SQLite)"""
+    return engine.dialect.identifier_preparer.quote(tabla)
+
+
+def _marcador(engine):
+    """Marcador de parámetro del driver (pyodbc y sqlite3 usan '?')"""
+    return '?' if engine.dialect.paramstyle == 'qmark' else '%s'
+
+
+def _columnas_calificadas(engine, columnas):
+    preparer = engine.dialect.identifier_preparer
+    return ", ".join(preparer.quote(str(col)) for col in columnas)
+
+
+def es_conexion(destino):
+    """True si `destino` es una conexión de SQLAlchemy ya abierta (no un engine)"""
+    return hasattr(destino, 'in_transaction')
+
+
+@contextmanager
+def conexion_dbapi(destino):
+    """
+    Conexión del driver para ejecutar con cursor. Con un engine se toma una conexión
+    del pool y se confirma (o revierte) al salir; con una conexión ya en transacción
+    (carga atómica de un archivo) se usa esa misma y la confirma quien abrió la transacción
+    """
+    if es_conexion(destino):
+        yield destino.connection
+        return
+    conexion = destino.raw_connection()
+    try:
+        yield conexion
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        conexion.close()
+
+
+def transaccion(destino):
+    """engine.begin() con un engine; la misma conexión (sin confirmar) dentro de una transacción abierta"""
+    return nullcontext(destino) if es_conexion(destino) else destino.begin()
+
+
+# Con cargas concurrentes (varios hilos, ver etl_sistemas_aislados.cargar_hojas) dos
+# porciones de la misma tabla podrían crearla o crear sus índices a la vez: esas
+# sentencias DDL se serializan por tabla; las inserciones siguen en paralelo
+_bloqueos_tablas = {}
+_bloqueo_registro = threading.Lock()
+
+
+def bloqueo_tabla(tabla):
+    """Lock del proceso para el DDL de `tabla` (crear la tabla, columnas o índices)"""
+    with _bloqueo_registro:
+        return _bloqueos_tablas.setdefault(tabla, threading.Lock())
+
+
+def _filas_para_dbapi(df):
+    """
+    Convierte el DataFrame en una lista de tuplas con tipos nativos de Python
+    (NaN/NaT/pd.NA → None, Timestamp → datetime) listas para el driver
+    """
+    columnas = []
+    for col in df.columns:
+        serie = df[col]
+        valores = serie.astype(object).where(serie.notna(), None).tolist()
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            valores = [v.to_pydatetime() if v is not None else None for v in valores]
+        columnas.append(valores)
+    return list(zip(*columnas))
+
+
+def _preparar_tabla(df, tabla, engine, if_exists):
+    """
+    Aplica la semántica de if_exists de pandas ('append', 'replace', 'fail')
+    creando la tabla vacía si no existe, sin insertar filas. El texto toma la
+    longitud del esquema (esquemas.tipos_sql), así sus columnas se pueden indexar
+    """
+    df.head(0).to_sql(
+        name=tabla, con=engine, if_exists=if_exists, index=False, dtype=tipos_sql(tabla, df.columns)
+    )
+
+
+def es_error_de_datos(error):
+    """True si el error (del driver o envuelto por SQLAlchemy) se debe a los valores de las filas"""
+    return any(clase.__name__ in ERRORES_DE_DATOS for clase in type(error).__mro__)
+
+
+def mensaje_error(error):
+    """Mensaje del driver sin la sentencia ni los parámetros que agrega SQLAlchemy"""
+    return str(getattr(error, 'orig', None) or error)
+
+
+def _sumar_detalles(detalles):
+    """Suma los detalles numéricos (insertadas, actualizadas...) de varios lotes"""
+    total = {}
+    for detalle in detalles:
+        for clave, valor in (detalle or {}).items():
+            total[clave] = total.get(clave, 0) + valor
+    return total or None
+
+# =============================================================================
+# INTERFAZ DE CARGADORES
+# =============================================================================
+class Cargador:
+    """
+    Estrategia de inserción de un DataFrame en una tabla SQL
+    Las subclases implementan `_insertar`; `cargar` mide el tiempo y reporta filas/segundo
+    """
+
+    nombre = 'base'
+    # 0 desactiva el aislamiento: cualquier error hace fallar la hoja completa
+    max_rechazos = MAX_RECHAZOS_POR_DEFECTO
+
+    def cargar(self, df, tabla, engine, if_exists='append'):
+        """
+        Carga el DataFrame y retorna {'estrategia', 'filas', 'segundos', 'filas_por_segundo',
+        'rechazadas'}: `filas` son las filas cargadas y `rechazadas` un DataFrame con las
+        filas que la base de datos no aceptó (con la columna COLUMNA_ERROR)
+        """
+        inicio = time.perf_counter()
+        with bloqueo_tabla(tabla):
+            _preparar_tabla(df, tabla, engine, if_exists)
+        detalle, rechazadas = self._insertar_aislando(df, tabla, engine) if len(df) else (None, None)
+        segundos = time.perf_counter() - inicio
+
+        if rechazadas is None:
+            rechazadas = df.iloc[:0].assign(**{COLUMNA_ERROR: pd.Series(dtype=object)})
+        filas = len(df) - len(rechazadas)
+        metricas = {
+            'estrategia': self.nombre,
+            'filas': filas,
+            'segundos': segundos,
+            'filas_por_segundo': filas / segundos if segundos > 0 else float('inf'),
+            'rechazadas': rechazadas,
+        }
+        # Algunas estrategias reportan detalles adicionales (p. ej. insertadas/actualizadas)
+        if detalle:
+            metricas.update(detalle)
+        logger.info(
+            f"   ✓ Cargador '{self.nombre}': {metricas['filas']} filas en {segundos:.2f} s "
+            f"({metricas['filas_por_segundo']:,.0f} filas/s)"
+        )
+        return metricas
+
+    def _insertar_aislando(self, df, tabla, engine):
+        """
+        Inserta el DataFrame completo en un solo intento. Si la base de datos rechaza el
+        lote por sus datos, lo divide en mitades hasta aislar las filas culpables: con k
+        filas malas entre n se hacen O(k log n) intentos y el resto se carga normalmente
+        Retorna (detalle sumado de los lotes cargados, filas rechazadas o None)
+        """
+        try:
+            return self._insertar(df, tabla, engine), None
+        except Exception as e:
+            if not self.max_rechazos or not es_error_de_datos(e):
+                raise
+            logger.warning(
+                f"   ⚠️  La base de datos rechazó el lote de {len(df)} filas ({mensaje_error(e)}) "
+                f"- aislando las filas con error"
+            )
+
+        detalles = []
+        rechazos = []
+        pendientes = [df.iloc[len(df) // 2:], df.iloc[:len(df) // 2]]
+        intentos = 1
+        while pendientes:
+            lote = pendientes.pop()
+            intentos += 1
+            try:
+                detalles.append(self._insertar(lote, tabla, engine))
+            except Exception as e:
+                if not es_error_de_datos(e):
+                    raise
+                if len(lote) > 1:
+                    # La primera mitad sale antes de la pila: los rechazos quedan en el orden de la hoja
+                    mitad = len(lote) // 2
+                    pendientes.extend([lote.iloc[mitad:], lote.iloc[:mitad]])
+                    continue
+                rechazos.append(lote.assign(**{COLUMNA_ERROR: mensaje_error(e)}))
+                if len(rechazos) > self.max_rechazos:
+                    raise RuntimeError(
+                        f"Más de {self.max_rechazos} filas rechazadas en '{tabla}' "
+                        f"({len(df) - len(rechazos) - sum(len(p) for p in pendientes)} filas ya cargadas): "
+                        f"{mensaje_error(e)}"
+                    ) from e
+
+        logger.warning(
+            f"   ⚠️  {len(rechazos)} filas rechazadas en '{tabla}' aisladas en {intentos} intentos; "
+            f"{len(df) - len(rechazos)} filas cargadas"
+        )
+        return _sumar_detalles(detalles), pd.concat(rechazos) if rechazos else None
+
+    def _insertar(self, df, tabla, engine):
+        """Inserta las filas; puede retornar un dict con métricas adicionales"""
+        raise NotImplementedError
+
+
+class CargadorToSql(Cargador):
+    """Comportamiento original: df.to_sql en lotes de 500 filas"""
+
+    nombre = 'to_sql'
+
+    def __init__(self, chunksize=500):
+        self.chunksize = chunksize
+
+    def _insertar(self, df, tabla, engine):
+        # Una sola transacción: si un lote falla no quedan los anteriores a medio cargar
+        with transaccion(engine) as conexion:
+            df.to_sql(name=tabla, con=conexion, if_exists='append', index=False, chunksize=self.chunksize)
+
+
+class CargadorExecutemany(Cargador):
+    """
+    executemany con enlace de arreglos: con pyodbc activa fast_executemany para
+    enviar cada lote en un solo viaje en lugar de una ida y vuelta por fila
+    """
+
+    nombre = 'executemany'
+
+    def __init__(self, tamano_lote=10000):
+        self.tamano_lote = tamano_lote
+
+    def _insertar(self, df, tabla, engine):
+        marcadores = ", ".join([_marcador(engine)] * len(df.columns))
+        sql = (
+            f"INSERT INTO {_nombre_calificado(engine, tabla)} "
+            f"({_columnas_calificadas(engine, df.columns)}) VALUES ({marcadores})"
+        )
+        filas = _filas_para_dbapi(df)
+
+        with conexion_dbapi(engine) as conexion:
+            cursor = conexion.cursor()
+            if hasattr(cursor, 'fast_executemany'):
+                cursor.fast_executemany = True
+            for i in range(0, len(filas), self.tamano_lote):
+                cursor.executemany(sql, filas[i:i + self.tamano_lote])
+
+
+class CargadorMultiValues(Cargador):
+    """
+    INSERT ... VALUES (...), (...), ... con tantas filas por sentencia como
+    permite el límite de parámetros del motor
+    """
+
+    nombre = 'multi_values'
+
+    def filas_por_sentencia(self, engine, n_columnas):
+        limite_parametros = LIMITE_PARAMETROS.get(engine.dialect.name, LIMITE_PARAMETROS_POR_DEFECTO)
+        # Se deja un parámetro libre: algunos drivers reservan uno
+        filas = max(1, (limite_parametros - 1) // max(n_columnas, 1))
+        limite_filas = LIMITE_FILAS_VALUES.get(engine.dialect.name)
+        return min(filas, limite_filas) if limite_filas else filas
+
+    def _insertar(self, df, tabla, engine):
+        n_columnas = len(df.columns)
+        por_sentencia = self.filas_por_sentencia(engine, n_columnas)
+        grupo = "(" + ", ".join([_marcador(engine)] * n_columnas) + ")"
+        encabezado = (
+            f"INSERT INTO {_nombre_calificado(engine, tabla)} "
+            f"({_columnas_calificadas(engine, df.columns)}) VALUES "
+        )
+        filas = _filas_para_dbapi(df)
+
+        with conexion_dbapi(engine) as conexion:
+            cursor = conexion.cursor()
+            sql_completo = encabezado + ", ".join([grupo] * por_sentencia)
+            for i in range(0, len(filas), por_sentencia):
+                lote = filas[i:i + por_sentencia]
+                sql = sql_completo if len(lote) == por_sentencia else encabezado + ", ".join([grupo] * len(lote))
+                cursor.execute(sql, [valor for fila in lote for valor in fila])
+
+
+class CargadorBulkInsert(Cargador):
+    """
+    Escribe el DataFrame a un archivo delimitado y lo carga con BULK INSERT
+    a una tabla temporal, desde donde pasa a la tabla destino en un solo INSERT ... SELECT
+
+    El archivo debe quedar en una ruta que el servicio de SQL Server pueda leer
+    (BULK_STAGING_DIR, normalmente un recurso compartido). En motores sin BULK INSERT
+    (SQLite de pruebas) el mismo archivo se lee y se inserta con executemany
+    """
+
+    nombre = 'bulk'
+
+    def __init__(self, carpeta_staging=None):
+        self.carpeta_staging = carpeta_staging or os.getenv('BULK_STAGING_DIR') or tempfile.gettempdir()
+
+    def _escribir_archivo(self, df):
+        """Escribe el archivo delimitado (CSV UTF-8, fechas ISO, NULL como campo vacío)"""
+        descriptor, ruta = tempfile.mkstemp(suffix='.csv', prefix='etl_bulk_', dir=self.carpeta_staging)
+        with os.fdopen(descriptor, 'w', encoding='utf-8', newline='') as archivo:
+            escritor = csv.writer(archivo, quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+            escritor.writerow([str(col) for col in df.columns])
+            for fila in _filas_para_dbapi(df):
+                escritor.writerow([
+                    v.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] if hasattr(v, 'strftime') else v
+                    for v in fila
+                ])
+        return ruta
+
+    def _insertar(self, df, tabla, engine):
+        ruta = self._escribir_archivo(df)
+        try:
+            if engine.dialect.name == 'mssql':
+                self._bulk_insert_mssql(ruta, df, tabla, engine)
+            else:
+                self._cargar_archivo_generico(ruta, df, tabla, engine)
+        finally:
+            Path(ruta).unlink(missing_ok=True)
+
+    def _bulk_insert_mssql(self, ruta, df, tabla, engine):
+        columnas = _columnas_calificadas(engine, df.columns)
+        tabla_sql = _nombre_calificado(engine, tabla)
+        ruta_sql = str(ruta).replace("'", "''")
+
+        with conexion_dbapi(engine) as conexion:
+            cursor = conexion.cursor()
+            # La tabla temporal tiene exactamente las columnas del archivo (sin el IDENTITY)
+            cursor.execute(f"SELECT TOP 0 {columnas} INTO #staging_bulk FROM {tabla_sql}")
+            cursor.execute(
+                f"BULK INSERT #staging_bulk FROM '{ruta_sql}' "
+                f"WITH (FORMAT = 'CSV', FIRSTROW = 2, CODEPAGE = '65001', "
+                f"FIELDTERMINATOR = ',', ROWTERMINATOR = '0x0a', TABLOCK)"
+            )
+            cursor.execute(f"INSERT INTO {tabla_sql} ({columnas}) SELECT {columnas} FROM #staging_bulk")
+            cursor.execute("DROP TABLE #staging_bulk")
+
+    def _cargar_archivo_generico(self, ruta, df, tabla, engine):
+        marcadores = ", ".join([_marcador(engine)] * len(df.columns))
+        sql = (
+            f"INSERT INTO {_nombre_calificado(engine, tabla)} "
+            f"({_columnas_calificadas(engine, df.columns)}) VALUES ({marcadores})"
+        )
+
+        with conexion_dbapi(engine) as conexion:
+            cursor = conexion.cursor()
+            with open(ruta, encoding='utf-8', newline='') as archivo:
+                lector = csv.reader(archivo)
+                next(lector)
+                cursor.executemany(sql, ([v if v != '' else None for v in fila] for fila in lector))
+
+# =============================================================================
+# UPSERT IDEMPOTENTE: STAGING + MERGE POR LLAVE NATURAL
+# =============================================================================
+COLUMNA_HASH = 'hash_fila'
+
+
+def calcular_hash_filas(df, columnas=None):
+    """Hash de 64 bits por fila (vectorizado) sobre las columnas de datos"""
+    columnas = [c for c in (columnas or df.columns) if c != COLUMNA_HASH]
+    return pd.util.hash_pandas_object(df[columnas], index=False).astype('int64')
+
+
+class CargadorUpsert(Cargador):
+    """
+    Carga cada hoja a una tabla temporal de staging y aplica un único MERGE
+    set-based sobre la llave natural de la tabla:
+      - filas nuevas → INSERT
+      - filas existentes con hash distinto → UPDATE
+      - filas existentes con el mismo hash → no se tocan
+    En motores sin MERGE (SQLite de pruebas) se usa UPDATE ... FROM + INSERT ... WHERE NOT EXISTS
+    """
+
+    nombre = 'upsert'
+
+    def __init__(self, llaves_naturales, tamano_lote=10000):
+        self.llaves_naturales = llaves_naturales
+        self.tamano_lote = tamano_lote
+
+    def cargar(self, df, tabla, engine, if_exists='append'):
+        """
+        Como Cargador.cargar, más 'omitidas' (cuántas filas no entraron al MERGE) e
+        'indice_omitidas' (su índice en `df`): filas sin llave natural y apariciones
+        anteriores de una llave repetida, que no quedan en la tabla
+        """
+        llaves = self.llaves_naturales.get(tabla)
+        if not llaves:
+            raise ValueError(f"No hay llave natural configurada para la tabla '{tabla}'")
+        faltantes = [llave for llave in llaves if llave not in df.columns]
+        if faltantes:
+            raise ValueError(f"La hoja no tiene las columnas de la llave natural: {faltantes}")
+
+        # Filas sin llave no se pueden emparejar: se reportan y se excluyen
+        sin_llave = df[llaves].isna().any(axis=1)
+        if sin_llave.any():
+            logger.warning(f"   ⚠️  {sin_llave.sum()} filas sin llave natural {llaves} - se omiten del upsert")
+        omitidas = df.index[sin_llave]
+        df = df[~sin_llave]
+
+        # El MERGE falla si la llave se repite en el origen: gana la última aparición
+        duplicadas = df.duplicated(subset=llaves, keep='last')
+        if duplicadas.any():
+            logger.warning(f"   ⚠️  {duplicadas.sum()} filas con llave repetida en el archivo - se usa la última")
+        omitidas = omitidas.append(df.index[duplicadas])
+        df = df[~duplicadas]
+
+        df = df.assign(**{COLUMNA_HASH: calcular_hash_filas(df)})
+        self._asegurar_columna_hash(tabla, engine)
+        metricas = super().cargar(df, tabla, engine, if_exists=if_exists)
+        metricas['omitidas'] = len(omitidas)
+        metricas['indice_omitidas'] = omitidas
+        metricas['rechazadas'] = metricas['rechazadas'].drop(columns=[COLUMNA_HASH])
+        return metricas
+
+    def _asegurar_columna_hash(self, tabla, engine):
+        """Agrega la columna hash_fila a la tabla destino si existe y aún no la tiene"""
+        from sqlalchemy import inspect, text
+
+        with bloqueo_tabla(tabla):
+            inspector = inspect(engine)
+            if not inspector.has_table(tabla):
+                return
+            columnas = {col['name'] for col in inspector.get_columns(tabla)}
+            if COLUMNA_HASH in columnas:
+                return
+            with transaccion(engine) as conexion:
+                conexion.execute(text(
+                    f"ALTER TABLE {_nombre_calificado(engine, tabla)} "
+                    f"ADD {engine.dialect.identifier_preparer.quote(COLUMNA_HASH)} BIGINT NULL"
+                ))
+        logger.info(f"   ✓ Agregada columna '{COLUMNA_HASH}' a la tabla '{tabla}'")
+
+    def _insertar(self, df, tabla, engine):
+        preparer = engine.dialect.identifier_preparer
+        llaves = self.llaves_naturales[tabla]
+        columnas = [str(col) for col in df.columns]
+        tabla_sql = _nombre_calificado(engine, tabla)
+        lista_columnas = _columnas_calificadas(engine, columnas)
+        es_mssql = engine.dialect.name == 'mssql'
+        staging = '#staging_upsert' if es_mssql else 'staging_upsert'
+
+        condicion_llave = " AND ".join(f"t.{preparer.quote(k)} = s.{preparer.quote(k)}" for k in llaves)
+        hash_sql = preparer.quote(COLUMNA_HASH)
+        cambio = f"(t.{hash_sql} IS NULL OR t.{hash_sql} <> s.{hash_sql})"
+        asignaciones = ", ".join(
+            f"{preparer.quote(c)} = s.{preparer.quote(c)}" for c in columnas if c not in llaves
+        )
+
+        with conexion_dbapi(engine) as conexion:
+            cursor = conexion.cursor()
+            if hasattr(cursor, 'fast_executemany'):
+                cursor.fast_executemany = True
+
+            # 1. Tabla de staging con las mismas columnas (y tipos) que el destino
+            if es_mssql:
+                cursor.execute(f"SELECT TOP 0 {lista_columnas} INTO {staging} FROM {tabla_sql}")
+            else:
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+                cursor.execute(f"CREATE TEMP TABLE {staging} AS SELECT {lista_columnas} FROM {tabla_sql} WHERE 0 = 1")
+
+            # 2. Carga masiva al staging
+            marcadores = ", ".join([_marcador(engine)] * len(columnas))
+            sql_insert = f"INSERT INTO {staging} ({lista_columnas}) VALUES ({marcadores})"
+            filas = _filas_para_dbapi(df)
+            for i in range(0, len(filas), self.tamano_lote):
+                cursor.executemany(sql_insert, filas[i:i + self.tamano_lote])
+
+            # 3. Un solo MERGE set-based
+            if es_mssql:
+                valores_origen = ", ".join(f"s.{preparer.quote(c)}" for c in columnas)
+                cursor.execute(
+                    f"SET NOCOUNT ON; "
+                    f"DECLARE @acciones TABLE (accion NVARCHAR(10)); "
+                    f"MERGE {tabla_sql} WITH (HOLDLOCK) AS t "
+                    f"USING {staging} AS s ON {condicion_llave} "
+                    f"WHEN MATCHED AND {cambio} THEN UPDATE SET {asignaciones} "
+                    f"WHEN NOT MATCHED BY TARGET THEN INSERT ({lista_columnas}) VALUES ({valores_origen}) "
+                    f"OUTPUT $action INTO @acciones; "
+                    f"SELECT accion, COUNT(*) FROM @acciones GROUP BY accion;"
+                )
+                conteos = {accion: n for accion, n in cursor.fetchall()}
+                insertadas = conteos.get('INSERT', 0)
+                actualizadas = conteos.get('UPDATE', 0)
+                cursor.execute(f"DROP TABLE {staging}")
+            else:
+                cursor.execute(
+                    f"UPDATE {tabla_sql} AS t SET {asignaciones} "
+                    f"FROM {staging} AS s WHERE {condicion_llave} AND {cambio}"
+                )
+                actualizadas = cursor.rowcount
+                cursor.execute(
+                    f"INSERT INTO {tabla_sql} ({lista_columnas}) "
+                    f"SELECT {lista_columnas} FROM {staging} AS s "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {tabla_sql} AS t WHERE {condicion_llave})"
+                )
+                insertadas = cursor.rowcount
+                cursor.execute(f"DROP TABLE temp.{staging}")
+
+
+        sin_cambios = len(df) - insertadas - actualizadas
+        logger.info(
+            f"   ✓ Upsert '{tabla}': {insertadas} insertadas, {actualizadas} actualizadas, "
+            f"{sin_cambios} sin cambios"
+        )
+        return {'insertadas': insertadas, 'actualizadas': actualizadas, 'sin_cambios': sin_cambios}
+
+# =============================================================================
+# TABLAS HIJAS: REEMPLAZO POR LLAVE DEL PADRE E ÍNDICES
+# =============================================================================
+def borrar_por_llave(engine, tabla, columna, valores):
+    """
+    DELETE de las filas de `tabla` cuya `columna` está en `valores`, en sentencias
+    IN (...) del tamaño que permite el límite de parámetros del motor (una transacción)
+    Con una conexión en transacción (ver conexion_dbapi) el DELETE lo confirma quien la
+    abrió, junto con lo que se inserte después. Retorna las filas borradas; si la tabla
+    no existe no hace nada
+    """
+    from sqlalchemy import inspect
+
+    valores = list(dict.fromkeys(valores))
+    if not valores or not inspect(engine).has_table(tabla):
+        return 0
+    por_sentencia = LIMITE_PARAMETROS.get(engine.dialect.name, LIMITE_PARAMETROS_POR_DEFECTO) - 1
+    encabezado = (
+        f"DELETE FROM {_nombre_calificado(engine, tabla)} "
+        f"WHERE {engine.dialect.identifier_preparer.quote(columna)} IN "
+    )
+
+    borradas = 0
+    with conexion_dbapi(engine) as conexion:
+        cursor = conexion.cursor()
+        for i in range(0, len(valores), por_sentencia):
+            lote = valores[i:i + por_sentencia]
+            cursor.execute(encabezado + "(" + ", ".join([_marcador(engine)] * len(lote)) + ")", lote)
+            borradas += max(cursor.rowcount, 0)
+    return borradas
+
+
+def asegurar_indices(engine, tabla, indices):
+    """
+    Crea los índices no agrupados de `indices` (listas de columnas) que la tabla aún
+    no tenga, p. ej. cuando la creó el ETL y no CreateScript.sql. Los datos ya están
+    confirmados: un índice que no se puede crear se advierte en el log sin propagar
+    el error. Retorna los nombres de los índices creados
+    """
+    with bloqueo_tabla(tabla):
+        return _crear_indices_faltantes(engine, tabla, indices)
+
+
+def _crear_indices_faltantes(engine, tabla, indices):
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(engine)
+    if not indices or not inspector.has_table(tabla):
+        return []
+    existentes = {tuple(indice['column_names']) for indice in inspector.get_indexes(tabla)}
+    preparer = engine.dialect.identifier_preparer
+
+    creados = []
+    for columnas in indices:
+        if tuple(columnas) in existentes:
+            continue
+        nombre = 'IX_' + '_'.join(
+            ''.join(c if c.isalnum() else '_' for c in parte) for parte in [tabla, *columnas]
+        )
+        try:
+            with transaccion(engine) as conexion:
+                conexion.execute(text(
+                    f"CREATE INDEX {preparer.quote(nombre)} ON {_nombre_calificado(engine, tabla)} "
+                    f"({_columnas_calificadas(engine, columnas)})"
+                ))
+        except Exception as e:
+            logger.warning(f"   ⚠️  No se pudo crear el índice '{nombre}' en '{tabla}': {mensaje_error(e)}")
+            continue
+        creados.append(nombre)
+    return creados
+
+# =============================================================================
+# REGISTRO DE ESTRATEGIAS
+# =============================================================================
+CARGADORES = {
+    CargadorToSql.nombre: CargadorToSql,
+    CargadorExecutemany.nombre: CargadorExecutemany,
+    CargadorMultiValues.nombre: CargadorMultiValues,
+    CargadorBulkInsert.nombre: CargadorBulkInsert,
+}
+
+
+def obtener_cargador(cargador=None):
+    """Acepta un nombre registrado, una instancia de Cargador o None (executemany)"""
+    if cargador is None:
+        return CargadorExecutemany()
+    if isinstance(cargador, Cargador):
+        return cargador
+    if cargador not in CARGADORES:
+        raise ValueError(
+            f"Cargador '{cargador}' no reconocido. Opciones: {', '.join(CARGADORES)}"
+        )
+    return CARGADORES[cargador]()
@@ -0,0 +1,236 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from cargadores import (
+    LIMITE_PARAMETROS, LIMITE_PARAMETROS_POR_DEFECTO, CargadorExecutemany, asegurar_indices, borrar_por_llave,
+    transaccion,
+)
+from esquemas import indices_tabla, separar_codigos
+from topologia import CENTROS, TABLA_TOPOLOGIA
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# RESUMEN DE CONFIABILIDAD (AGREGADOS MATERIALIZADOS DE INTERRUPCIONES)
+# =============================================================================
+#
+# Los reportes calculan duración y número de interrupciones por Causa, Origen del
+# evento, equipo y mes recorriendo toda la tabla Interrupciones. El ETL mantiene esos
+# agregados en la tabla 'Resumen Confiabilidad' (unos cientos de filas):
+#
+#   meses afectados = meses de 'Fecha y Hora_Inicio' de las filas que cargó cada archivo
+#                     (en upsert, también el mes que tenían antes las interrupciones corregidas)
+#   → se leen de Interrupciones solo esos meses → se agregan con pandas (groupby)
+#   → se reemplazan solo esos meses en el resumen
+#
+# Los meses se recalculan desde la tabla (no sumando el archivo al resumen): así el
+# resultado es el mismo con append, upsert o un archivo cargado dos veces
+#
+# Cada interrupción cuenta una vez por equipo de su lista; las filas con
+# 'Código de equipo' = TODOS cuentan cada interrupción una sola vez (totales por
+# Causa/Origen/mes sin duplicar las interrupciones con varios equipos)
+# Con `kva` cada interrupción se pondera por el KVA aguas abajo de sus equipos
+# (índice de topología, o los centros conectados directamente si no existe)
+
+TABLA_RESUMEN = 'Resumen Confiabilidad'
+TABLA_INTERRUPCIONES = 'Interrupciones'
+
+ID = 'ID_Interrupcion'
+INICIO = 'Fecha y Hora_Inicio'
+CIERRE = 'Fecha y Hora_Cierre'
+EQUIPOS_AFECTADOS = 'Código de Equipo'
+DIMENSIONES = ['Mes', 'Causa', 'Origen del evento', 'Código de equipo']
+
+COLUMNAS_RESUMEN = DIMENSIONES + [
+    'Interrupciones', 'Minutos', 'Minutos máximo', 'Sin duración', 'KVA afectado', 'KVA minutos',
+]
+
+# Filas del resumen con todas las interrupciones (sin abrir por equipo)
+TODOS = '(todos)'
+SIN_DATO = '(sin dato)'
+
+
+def mes(fechas):
+    """Mes 'AAAA-MM' de cada fecha (None si no hay fecha)"""
+    return pd.to_datetime(fechas, errors='coerce').dt.strftime('%Y-%m')
+
+
+def meses_afectados(df):
+    """Meses de inicio (sin repetir, ordenados) de un DataFrame limpio de Interrupciones"""
+    if INICIO not in df.columns:
+        return []
+    return sorted(mes(df[INICIO]).dropna().unique().tolist())
+
+
+def meses_guardados(engine, ids):
+    """
+    Meses de inicio que tienen en la tabla las interrupciones `ids`, leídos antes de un
+    upsert: si una corrección mueve la interrupción a otro mes, el mes que deja también
+    se recalcula. `engine` puede ser una conexión en transacción (carga atómica)
+    """
+    from sqlalchemy import bindparam, inspect, text
+
+    ids = list(dict.fromkeys(ids))
+    if not ids or not inspect(engine).has_table(TABLA_INTERRUPCIONES):
+        return []
+    preparer = engine.dialect.identifier_preparer
+    sql = text(
+        f"SELECT DISTINCT {preparer.quote(INICIO)} FROM {preparer.quote(TABLA_INTERRUPCIONES)} "
+        f"WHERE {preparer.quote(ID)} IN :ids"
+    ).bindparams(bindparam('ids', expanding=True))
+    por_sentencia = LIMITE_PARAMETROS.get(engine.dialect.name, LIMITE_PARAMETROS_POR_DEFECTO) - 1
+
+    fechas = []
+    with transaccion(engine) as conexion:
+        for i in range(0, len(ids), por_sentencia):
+            fechas.extend(fila[0] for fila in conexion.execute(sql, {'ids': ids[i:i + por_sentencia]}))
+    return sorted(mes(pd.Series(fechas, dtype=object)).dropna().unique().tolist())
+
+
+def resumir_interrupciones(df, kva_por_equipo=None):
+    """
+    Agrega un DataFrame de Interrupciones (columnas de SQL Server) por DIMENSIONES
+    `kva_por_equipo` (Series código de equipo en mayúsculas → KVA) activa las columnas de KVA
+    Retorna un DataFrame con COLUMNAS_RESUMEN
+    """
+    minutos = (
+        pd.to_datetime(df[CIERRE], errors='coerce') - pd.to_datetime(df[INICIO], errors='coerce')
+    ).dt.total_seconds() / 60
+    # Sin cierre o con cierre anterior al inicio: cuenta la interrupción, no su duración
+    minutos = minutos.where(minutos >= 0)
+    base = pd.DataFrame({
+        'Mes': mes(df[INICIO]),
+        'Causa': df['Causa'].fillna(SIN_DATO),
+        'Origen del evento': df['Origen del evento'].fillna(SIN_DATO),
+        'Minutos': minutos,
+    }, index=df.index)
+    base = base[base['Mes'].notna()]
+
+    # Una fila por (interrupción, equipo) sin códigos repetidos en la misma lista
+    codigos = separar_codigos(df.loc[base.index, EQUIPOS_AFECTADOS]).str.upper()
+    codigos = codigos[~pd.MultiIndex.from_arrays([codigos.index, codigos.to_numpy()]).duplicated()]
+    por_equipo = base.loc[codigos.index].assign(**{'Código de equipo': codigos.to_numpy()})
+    # Las interrupciones sin equipos también se cuentan
+    sin_equipo = base.index.difference(codigos.index)
+    por_equipo = pd.concat([por_equipo, base.loc[sin_equipo].assign(**{'Código de equipo': SIN_DATO})])
+
+    if kva_por_equipo is not None:
+        por_equipo['KVA afectado'] = por_equipo['Código de equipo'].map(kva_por_equipo).fillna(0).astype(float)
+        # El total de una interrupción es la suma de sus equipos
+        base['KVA afectado'] = por_equipo.groupby(level=0)['KVA afectado'].sum().reindex(base.index)
+    else:
+        por_equipo['KVA afectado'] = np.nan
+        base['KVA afectado'] = np.nan
+    base['Código de equipo'] = TODOS
+
+    resumen = pd.concat([_agregar(por_equipo), _agregar(base)], ignore_index=True)
+    if kva_por_equipo is None:
+        resumen[['KVA afectado', 'KVA minutos']] = np.nan
+    return resumen[COLUMNAS_RESUMEN]
+
+
+def _agregar(filas):
+    filas = filas.assign(**{
+        'KVA minutos': filas['KVA afectado'] * filas['Minutos'],
+        'Sin duración': filas['Minutos'].isna().astype(int),
+    })
+    grupos = filas.groupby(DIMENSIONES, sort=True)
+    return grupos.agg(**{
+        'Interrupciones': ('Minutos', 'size'),
+        'Minutos': ('Minutos', 'sum'),
+        'Minutos máximo': ('Minutos', 'max'),
+        'Sin duración': ('Sin duración', 'sum'),
+        'KVA afectado': ('KVA afectado', 'sum'),
+        'KVA minutos': ('KVA minutos', 'sum'),
+    }).reset_index()
+
+
+def kva_por_equipo(engine):
+    """
+    KVA aguas abajo de cada equipo: del índice de topología si existe; si no, los KVA
+    de los centros MT/BT conectados directamente al equipo
+    """
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    if inspector.has_table(TABLA_TOPOLOGIA):
+        topologia = pd.read_sql_table(TABLA_TOPOLOGIA, engine, columns=['Tipo', 'Código', 'KVA aguas abajo'])
+        equipos = topologia[topologia['Tipo'] == 'equipo']
+        return equipos.set_index('Código')['KVA aguas abajo'].astype(float)
+    if not inspector.has_table(CENTROS['tabla']):
+        return pd.Series(dtype=float)
+    centros = pd.read_sql_table(CENTROS['tabla'], engine, columns=[CENTROS['padre'], CENTROS['kva']])
+    codigos = separar_codigos(centros[CENTROS['padre']]).str.upper()
+    codigos = codigos[~codigos.index.duplicated()]
+    kva = pd.to_numeric(centros.loc[codigos.index, CENTROS['kva']], errors='coerce').fillna(0)
+    return kva.groupby(codigos.to_numpy()).sum()
+
+
+def leer_interrupciones(engine, meses=None):
+    """Interrupciones de los meses indicados (todas si `meses` es None) con las columnas del resumen"""
+    from sqlalchemy import text
+
+    preparer = engine.dialect.identifier_preparer
+    columnas = ", ".join(
+        preparer.quote(columna) for columna in [INICIO, CIERRE, 'Causa', 'Origen del evento', EQUIPOS_AFECTADOS]
+    )
+    sql = f"SELECT {columnas} FROM {preparer.quote(TABLA_INTERRUPCIONES)}"
+    parametros = {}
+    if meses is not None:
+        # Un solo rango del primer al último mes (aprovecha un índice sobre la fecha si lo hay)
+        desde = pd.Timestamp(min(meses) + '-01')
+        hasta = pd.Timestamp(max(meses) + '-01') + pd.offsets.MonthBegin(1)
+        sql += f" WHERE {preparer.quote(INICIO)} >= :desde AND {preparer.quote(INICIO)} < :hasta"
+        parametros = {'desde': desde.to_pydatetime(), 'hasta': hasta.to_pydatetime()}
+    with engine.connect() as conexion:
+        df = pd.read_sql(text(sql), conexion, params=parametros)
+    if meses is not None:
+        df = df[mes(df[INICIO]).isin(meses)]
+    return df
+
+
+def actualizar_resumen(engine, meses=None, kva=False, tabla=TABLA_RESUMEN):
+    """
+    Recalcula los meses indicados (o todo el resumen si `meses` es None) desde la
+    tabla Interrupciones y los reemplaza en `tabla`. Retorna un resumen (dict)
+    """
+    from sqlalchemy import inspect
+
+    if not inspect(engine).has_table(TABLA_INTERRUPCIONES):
+        return {'meses': 0, 'interrupciones': 0, 'filas_escritas': 0, 'filas_borradas': 0}
+    interrupciones = leer_interrupciones(engine, meses)
+    resumen = resumir_interrupciones(interrupciones, kva_por_equipo(engine) if kva else None)
+
+    cargador = CargadorExecutemany()
+    # Un mes a medias daría totales equivocados: cualquier rechazo hace fallar la actualización
+    cargador.max_rechazos = 0
+    # DELETE e INSERT en una sola transacción: si la inserción falla, los meses
+    # guardados quedan como estaban
+    with engine.connect() as conexion, conexion.begin():
+        if meses is None:
+            # Reconstrucción completa: también salen los meses que ya no tienen interrupciones
+            from sqlalchemy import text
+
+            borradas = 0
+            if inspect(conexion).has_table(tabla):
+                borradas = conexion.execute(
+                    text(f"DELETE FROM {engine.dialect.identifier_preparer.quote(tabla)}")
+                ).rowcount
+            meses = sorted(resumen['Mes'].unique().tolist())
+        else:
+            borradas = borrar_por_llave(conexion, tabla, 'Mes', meses)
+
+        if len(resumen):
+            cargador.cargar(resumen, tabla, conexion)
+
+    if len(resumen):
+        asegurar_indices(engine, tabla, indices_tabla(tabla))
+
+    return {
+        'meses': len(meses),
+        'interrupciones': len(interrupciones),
+        'filas_escritas': len(resumen),
+        'filas_borradas': max(borradas, 0),
+    }
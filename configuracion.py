@@ -0,0 +1,194 @@
+import os
+import urllib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN DE CONEXIÓN Y POOL (SIN EFECTOS AL IMPORTAR)
+# =============================================================================
+#
+# Importar este módulo no lee .env, no valida credenciales ni se conecta a nada:
+# las variables de entorno se leen en Configuracion.desde_entorno() y el engine se
+# crea la primera vez que se pide. Los engines quedan guardados por URL y
+# parámetros del pool, así varias corridas dentro del mismo proceso (programador
+# de tareas, notebooks, pruebas) reutilizan las conexiones ya abiertas
+
+CARPETA_EXCEL_POR_DEFECTO = 'C:\\Users\\David Raudales\\Documents\\Datos Regulatorios Sistemas Aislados'
+DRIVER_POR_DEFECTO = 'ODBC Driver 17 for SQL Server'
+CARPETA_LOGS_POR_DEFECTO = 'logs'
+
+# Pool de conexiones (QueuePool de SQLAlchemy)
+POOL_SIZE_POR_DEFECTO = 5
+MAX_OVERFLOW_POR_DEFECTO = 10
+# SQL Server y los firewalls cierran conexiones inactivas: se renuevan antes (segundos)
+POOL_RECYCLE_POR_DEFECTO = 1800
+# Verifica cada conexión al tomarla del pool (descarta las que murieron entre corridas)
+POOL_PRE_PING_POR_DEFECTO = True
+
+# Engines ya creados por (URL, parámetros del pool)
+_engines = {}
+
+
+def _entero_env(nombre, defecto):
+    valor = os.getenv(nombre)
+    return int(valor) if valor not in (None, '') else defecto
+
+
+def _booleano_env(nombre, defecto):
+    valor = os.getenv(nombre)
+    if valor in (None, ''):
+        return defecto
+    return valor.strip().lower() in ('true', '1', 'si', 'sí', 'yes')
+
+
+class Configuracion:
+    """
+    Parámetros de conexión a SQL Server, del pool de conexiones y de las carpetas
+    de trabajo. Se arma con argumentos o con desde_entorno() (variables SQL_*,
+    EXCEL_FOLDER y .env); `url` (SQL_URL) reemplaza la conexión a SQL Server por
+    cualquier URL de SQLAlchemy, p. ej. sqlite:///pruebas.db
+    """
+
+    def __init__(self, servidor=None, base_datos=None, usuario=None, contrasena=None,
+                 driver=DRIVER_POR_DEFECTO, autenticacion_windows=False, url=None,
+                 carpeta_excel=CARPETA_EXCEL_POR_DEFECTO, carpeta_logs=CARPETA_LOGS_POR_DEFECTO,
+                 pool_size=POOL_SIZE_POR_DEFECTO, max_overflow=MAX_OVERFLOW_POR_DEFECTO,
+                 pool_recycle=POOL_RECYCLE_POR_DEFECTO, pool_pre_ping=POOL_PRE_PING_POR_DEFECTO):
+        self.servidor = servidor
+        self.base_datos = base_datos
+        self.usuario = usuario
+        self.contrasena = contrasena
+        self.driver = driver or DRIVER_POR_DEFECTO
+        self.autenticacion_windows = autenticacion_windows
+        self.url = url
+        self.carpeta_excel = carpeta_excel or CARPETA_EXCEL_POR_DEFECTO
+        self.carpeta_logs = carpeta_logs or CARPETA_LOGS_POR_DEFECTO
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+
+    @classmethod
+    def desde_entorno(cls, archivo_env=None, **cambios):
+        """Lee .env (o `archivo_env`) y las variables de entorno; `cambios` tiene prioridad"""
+        from dotenv import load_dotenv
+
+        load_dotenv(archivo_env)
+        valores = {
+            'servidor': os.getenv('SQL_SERVER'),
+            'base_datos': os.getenv('SQL_DATABASE'),
+            'usuario': os.getenv('SQL_USERNAME'),
+            'contrasena': os.getenv('SQL_PASSWORD'),
+            'driver': os.getenv('SQL_DRIVER', DRIVER_POR_DEFECTO),
+            # Use Windows Auth solamente en la fase de testing, cambiar al modo credenciales al finalizar pruebas
+            'autenticacion_windows': _booleano_env('SQL_USE_WINDOWS_AUTH', False),
+            'url': os.getenv('SQL_URL') or None,
+            'carpeta_excel': os.getenv('EXCEL_FOLDER', CARPETA_EXCEL_POR_DEFECTO),
+            'pool_size': _entero_env('SQL_POOL_SIZE', POOL_SIZE_POR_DEFECTO),
+            'max_overflow': _entero_env('SQL_MAX_OVERFLOW', MAX_OVERFLOW_POR_DEFECTO),
+            'pool_recycle': _entero_env('SQL_POOL_RECYCLE', POOL_RECYCLE_POR_DEFECTO),
+            'pool_pre_ping': _booleano_env('SQL_POOL_PRE_PING', POOL_PRE_PING_POR_DEFECTO),
+        }
+        valores.update(cambios)
+        return cls(**valores)
+
+    def validar(self):
+        """Verifica que estén las variables esenciales (ValueError con instrucciones si faltan)"""
+        if self.url:
+            return
+        if not self.servidor or not self.base_datos:
+            raise ValueError(
+                "Error: Faltan variables de entorno para la conexión SQL.\n"
+                "Variables requeridas:\n"
+                "  - SQL_SERVER (ej: localhost, localhost\\SQLEXPRESS, 127.0.0.1,1433)\n"
+                "  - SQL_DATABASE\n"
+                "\n"
+                "Para autenticación SQL Server (por defecto):\n"
+                "  - SQL_USERNAME\n"
+                "  - SQL_PASSWORD\n"
+                "\n"
+                "Para autenticación de Windows:\n"
+                "  - SQL_USE_WINDOWS_AUTH=true\n"
+                "\n"
+                "Puedes usar .env.example como plantilla."
+            )
+        if not self.autenticacion_windows and (not self.usuario or not self.contrasena):
+            raise ValueError(
+                "Error: Para autenticación SQL Server se requieren SQL_USERNAME y SQL_PASSWORD.\n"
+                "O configura SQL_USE_WINDOWS_AUTH=true para usar autenticación de Windows."
+            )
+
+    def url_conexion(self):
+        """URL de SQLAlchemy (mssql+pyodbc con el connection string de ODBC, salvo que haya `url`)"""
+        if self.url:
+            return self.url
+        self.validar()
+        if self.autenticacion_windows:
+            # Windows Authentication (Trusted Connection)
+            connection_string = (
+                f'DRIVER={{{self.driver}}};SERVER={self.servidor};DATABASE={self.base_datos};'
+                f'Trusted_Connection=yes'
+            )
+        else:
+            # SQL Server Authentication
+            connection_string = (
+                f'DRIVER={{{self.driver}}};SERVER={self.servidor};DATABASE={self.base_datos};'
+                f'UID={self.usuario};PWD={self.contrasena}'
+            )
+        params = urllib.parse.quote_plus(connection_string)
+        return f"mssql+pyodbc:///?odbc_connect={params}"
+
+    def _opciones_engine(self, url):
+        opciones = {'pool_pre_ping': self.pool_pre_ping, 'pool_recycle': self.pool_recycle}
+        if url.startswith('mssql'):
+            # fast_executemany: pyodbc envía cada lote como un arreglo en lugar de un viaje por fila
+            opciones['fast_executemany'] = True
+        if not url.startswith('sqlite'):
+            # SQLite (pruebas) usa su propio pool; el tamaño solo aplica a servidores
+            opciones.update(pool_size=self.pool_size, max_overflow=self.max_overflow)
+        return opciones
+
+    def engine(self):
+        """
+        Engine para esta configuración: se crea en la primera llamada y se reutiliza
+        (con su pool) en todas las corridas del proceso con la misma conexión y pool
+        """
+        url = self.url_conexion()
+        opciones = self._opciones_engine(url)
+        clave = (url, tuple(sorted(opciones.items())))
+        if clave not in _engines:
+            from sqlalchemy import create_engine
+
+            _engines[clave] = create_engine(url, **opciones)
+            self._registrar()
+        return _engines[clave]
+
+    def _registrar(self):
+        if self.url:
+            logger.info(f"✓ Conexión configurada con SQL_URL ({self.url.split(':', 1)[0]})")
+            return
+        if self.autenticacion_windows:
+            logger.info("✓ Usando autenticación de Windows (Trusted Connection)")
+        else:
+            logger.info("✓ Usando autenticación SQL Server")
+        logger.info("✓ Configuración SQL cargada desde variables de entorno")
+        logger.info(f"  - Servidor: {self.servidor}")
+        logger.info(f"  - Base de datos: {self.base_datos}")
+        if not self.autenticacion_windows:
+            logger.info(f"  - Usuario: {self.usuario}")
+        logger.info(
+            f"  - Pool: {self.pool_size} conexiones (+{self.max_overflow}), "
+            f"pre-ping {'sí' if self.pool_pre_ping else 'no'}, reciclado {self.pool_recycle} s"
+        )
+
+    def __repr__(self):
+        destino = self.url.split(':', 1)[0] if self.url else f"{self.servidor}/{self.base_datos}"
+        return f"Configuracion({destino}, pool_size={self.pool_size}, pool_recycle={self.pool_recycle})"
+
+
+def cerrar_engines():
+    """Cierra los pools de todos los engines creados en el proceso"""
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
@@ -0,0 +1,503 @@
+import re
+import logging
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from fechas import parsear_fechas
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# ESQUEMA DECLARATIVO POR TABLA (nombres de columna exactos de SQL Server)
+# =============================================================================
+#
+# Tipos soportados:
+#   'texto'   → longitud: tamaño del varchar/nvarchar (None = MAX)
+#   'entero'  → redondeo + Int64 (nullable)
+#   'decimal' → precision, escala: el DECIMAL(p, s) de SQL Server; se advierte cuando un
+#               valor no cabe. 'advertir_mayor_que' agrega un umbral de advertencia propio
+#               de la columna (valores que caben pero son sospechosos)
+#   'fecha'   → datetime64
+#
+# 'llave': True marca la llave natural de la tabla (no puede ser nula ni repetirse)
+# 'referencia' indica la tabla y columna (su llave) donde deben existir los códigos de la
+# columna; con 'separador' la celda es una lista de códigos (ver integridad.py)
+# 'alias' mapea encabezados de Excel con un nombre distinto al de la columna en SQL
+#
+# Plan de tipos en memoria de las columnas de texto (ver tipo_memoria):
+#   'categoria': True → category: pocos valores distintos; se limpia una vez por valor
+#   resto             → string[pyarrow]: un búfer contiguo por columna en lugar de un
+#                       objeto str de Python por celda (sin pyarrow quedan como object)
+#
+# Las columnas derivadas se calculan después de las conversiones:
+#   'primer_elemento' → primer valor de una lista separada por `separador` en `origen`
+#
+# Las tablas hijas se arman a partir de las filas ya cargadas de la tabla padre:
+#   'explotar_lista' → una fila por (llave del padre, valor, posición) de la lista
+#                      separada por `separador` en `origen`, sin espacios ni repetidos
+#
+# Agregar una tabla = agregar una entrada aquí; limpiar_dataframe no tiene ramas por tabla
+
+# Llave de Equipos de maniobras, a la que apuntan los códigos de equipo de las otras hojas
+EQUIPOS = {'tabla': 'Equipos de maniobras', 'columna': 'Código de equipo', 'separador': ','}
+
+ESQUEMAS_TABLAS = {
+    'Centro MTBT': {
+        'columnas': {
+            'Código Centro de transformación MT/BT': {'tipo': 'texto', 'longitud': 100, 'llave': True},
+            'KVA instalado por transformador': {
+                'tipo': 'decimal', 'precision': 10, 'escala': 2, 'advertir_mayor_que': 99.9999,
+            },
+            'Equipo aguas arriba': {'tipo': 'texto', 'longitud': 500, 'referencia': EQUIPOS},
+            'Propietario': {'tipo': 'texto', 'longitud': 100, 'categoria': True},
+            'UTM Centro MT/BT Norte': {'tipo': 'entero'},
+            'UTM Centro MT/BT Oeste': {'tipo': 'entero'},
+        },
+        'derivadas': {},
+        'alias': {
+            # Excel usa el nombre corto → SQL Server nombre exacto
+            'Código Centro MT/BT': 'Código Centro de transformación MT/BT',
+        },
+    },
+    'Equipos de maniobras': {
+        'columnas': {
+            'Código de equipo': {'tipo': 'texto', 'longitud': 100, 'llave': True},
+            'Tipo de equipo': {'tipo': 'texto', 'longitud': 100, 'categoria': True},
+            'Código de subestación': {'tipo': 'texto', 'longitud': 100, 'categoria': True},
+            'Codigo de Equipo Aguas Arriba': {'tipo': 'texto', 'longitud': 500, 'referencia': EQUIPOS},
+            'Nivel de tensión': {
+                'tipo': 'decimal', 'precision': 6, 'escala': 2, 'unidad': 'kV', 'advertir_mayor_que': 9.99,
+            },
+            'Corriente máxima': {'tipo': 'entero'},
+            'UTM Equipo Norte': {'tipo': 'entero'},
+            'UTM Equipo Oeste': {'tipo': 'entero'},
+        },
+        'derivadas': {},
+    },
+    'Interrupciones': {
+        'columnas': {
+            'ID_Interrupcion': {'tipo': 'texto', 'longitud': 50, 'llave': True},
+            'Fecha y Hora_Inicio': {'tipo': 'fecha'},
+            'Fecha y Hora_Cierre': {'tipo': 'fecha'},
+            'Causa': {'tipo': 'texto', 'longitud': 255, 'categoria': True},
+            'Fecha Notificacion al Usuario': {'tipo': 'fecha'},
+            'Origen del evento': {'tipo': 'texto', 'longitud': 100, 'categoria': True},
+            'Código de Equipo': {'tipo': 'texto', 'longitud': 255, 'referencia': EQUIPOS},
+            'Enlace Medio de Notificacion a los Usuarios': {'tipo': 'texto', 'longitud': 255},
+            'Observaciones': {'tipo': 'texto', 'longitud': 255},
+        },
+        'derivadas': {
+            'CódigoDePrimerEquipo': {
+                'funcion': 'primer_elemento', 'origen': 'Código de Equipo', 'separador': ',', 'longitud': 255,
+            },
+        },
+        'hijas': {
+            # Buscar las interrupciones de un equipo es un index seek sobre esta tabla
+            # en lugar de un LIKE '%código%' sobre la lista de Interrupciones
+            'Interrupciones Equipos': {
+                'funcion': 'explotar_lista', 'origen': 'Código de Equipo', 'separador': ',',
+                'llave': 'ID_Interrupcion', 'valor': 'Código de equipo', 'posicion': 'Posición',
+            },
+        },
+    },
+    # Tabla puente Interrupciones → Equipos de maniobras (no tiene hoja en el Excel)
+    'Interrupciones Equipos': {
+        'columnas': {
+            'ID_Interrupcion': {'tipo': 'texto', 'longitud': 50, 'llave': True},
+            'Código de equipo': {'tipo': 'texto', 'longitud': 100, 'llave': True},
+            'Posición': {'tipo': 'entero'},
+        },
+        'derivadas': {},
+        # Índices no agrupados que se crean si la tabla la crea el ETL (ver CreateScript.sql)
+        'indices': [['Código de equipo', 'ID_Interrupcion'], ['ID_Interrupcion']],
+    },
+    # Índice de topología de la red armado después de cargar (ver topologia.py)
+    'Topologia Red': {
+        'columnas': {
+            'Tipo': {'tipo': 'texto', 'longitud': 10, 'llave': True},
+            'Código': {'tipo': 'texto', 'longitud': 100, 'llave': True},
+            'Padre': {'tipo': 'texto', 'longitud': 100},
+            # '<tipo>:<código>' de la raíz: 'equipo:' + un código de hasta 100 caracteres
+            'Raíz': {'tipo': 'texto', 'longitud': 110},
+            'Profundidad': {'tipo': 'entero'},
+            'Entrada': {'tipo': 'entero'},
+            'Salida': {'tipo': 'entero'},
+            # Mismo tipo que 'KVA instalado por transformador' de Centro MTBT
+            'KVA': {'tipo': 'decimal', 'precision': 10, 'escala': 2},
+            'KVA aguas abajo': {'tipo': 'decimal', 'precision': 18, 'escala': 4},
+            'Centros aguas abajo': {'tipo': 'entero'},
+            'Estado': {'tipo': 'texto', 'longitud': 20},
+            'Hash árbol': {'tipo': 'entero'},
+        },
+        'derivadas': {},
+        # Subárbol de un nodo = rango de Entrada dentro de su Raíz
+        'indices': [['Raíz', 'Entrada'], ['Código']],
+    },
+    # Agregados de Interrupciones por mes que mantiene el ETL (ver confiabilidad.py)
+    'Resumen Confiabilidad': {
+        'columnas': {
+            'Mes': {'tipo': 'texto', 'longitud': 7, 'llave': True},
+            'Causa': {'tipo': 'texto', 'longitud': 255, 'llave': True},
+            'Origen del evento': {'tipo': 'texto', 'longitud': 100, 'llave': True},
+            'Código de equipo': {'tipo': 'texto', 'longitud': 100, 'llave': True},
+            'Interrupciones': {'tipo': 'entero'},
+            'Minutos': {'tipo': 'decimal', 'precision': 18, 'escala': 2},
+            'Minutos máximo': {'tipo': 'decimal', 'precision': 18, 'escala': 2},
+            'Sin duración': {'tipo': 'entero'},
+            'KVA afectado': {'tipo': 'decimal', 'precision': 18, 'escala': 4},
+            'KVA minutos': {'tipo': 'decimal', 'precision': 24, 'escala': 4},
+        },
+        'derivadas': {},
+        'indices': [['Mes'], ['Código de equipo', 'Mes']],
+    },
+}
+
+
+# Texto respaldado por Arrow para las columnas de texto que no son categorías
+TEXTO_ARROW = 'string[pyarrow]' if find_spec('pyarrow') is not None else None
+
+# Textos que en las plantillas significan "sin dato" (no cuentan como conversión fallida)
+TOKENS_NA = ['nan', 'NaN', 'NA', 'N/A', '#N/A', '-', '/', '']
+
+
+def valor_maximo_decimal(precision, escala):
+    """Mayor valor absoluto representable en DECIMAL(precision, escala)"""
+    return 10 ** (precision - escala) - 10 ** (-escala)
+
+
+def llaves_naturales(tabla):
+    """Columnas marcadas como llave natural en el esquema de la tabla"""
+    columnas = ESQUEMAS_TABLAS.get(tabla, {}).get('columnas', {})
+    return [columna for columna, spec in columnas.items() if spec.get('llave')]
+
+
+def spec_columna(tabla, columna):
+    """Especificación de una columna (o derivada) del esquema, None si no se conoce"""
+    esquema = ESQUEMAS_TABLAS.get(tabla, {})
+    return esquema.get('columnas', {}).get(columna) or esquema.get('derivadas', {}).get(columna)
+
+
+def referencias(tabla):
+    """{columna: referencia} de las columnas de la tabla que apuntan a la llave de otra tabla"""
+    columnas = ESQUEMAS_TABLAS.get(tabla, {}).get('columnas', {})
+    return {columna: spec['referencia'] for columna, spec in columnas.items() if spec.get('referencia')}
+
+
+def longitud_maxima(tabla, columna):
+    """Longitud declarada de una columna de texto (o derivada), None si no se conoce"""
+    spec = spec_columna(tabla, columna)
+    return spec.get('longitud') if spec else None
+
+
+def tipos_sql(tabla, columnas):
+    """
+    dtype= de to_sql para crear la tabla: las columnas de texto (y derivadas) del esquema
+    con longitud quedan como NVARCHAR(longitud). Sin él, to_sql crea el texto como
+    VARCHAR(max) en SQL Server, que no admite índices
+    """
+    from sqlalchemy.types import NVARCHAR
+
+    tipos = {}
+    for columna in columnas:
+        spec = spec_columna(tabla, columna)
+        if spec and spec.get('tipo', 'texto') == 'texto' and spec.get('longitud'):
+            tipos[columna] = NVARCHAR(spec['longitud'])
+    return tipos
+
+# =============================================================================
+# LIMPIEZA DE TEXTO
+# =============================================================================
+def tipo_memoria(tabla, columna):
+    """
+    Tipo en memoria de una columna de texto del esquema: 'categoria', 'arrow' o None
+    (object: columnas fuera del esquema, columnas que se convierten a número o fecha,
+    o texto sin pyarrow instalado)
+    """
+    spec = spec_columna(tabla, columna) if columna else None
+    if spec is None or spec['tipo'] != 'texto':
+        return None
+    if spec.get('categoria'):
+        return 'categoria'
+    return 'arrow' if TEXTO_ARROW else None
+
+
+# Espacios internos (cualquier secuencia de blancos) que se colapsan a uno solo
+_ESPACIOS = re.compile(r'\s+')
+
+
+class TextoNormalizado:
+    """
+    Resultado de normalizar_columna: la columna limpia y lo que cambió la limpieza,
+    contado en celdas (una celda que pasa a nulo no cuenta como recortada)
+    """
+
+    def __init__(self, valores, frecuencias, longitudes, recortadas, colapsadas, tokens):
+        self.valores = valores                                 # Columna limpia, con el índice original
+        self.celdas = int(frecuencias.sum())                   # Celdas con valor antes de limpiar
+        self.distintos = len(frecuencias)                      # Valores distintos antes de limpiar
+        self.recortadas = int(frecuencias[recortadas].sum())   # Espacios al inicio/final
+        self.espacios_colapsados = int(frecuencias[colapsadas].sum())
+        self.tokens_na = int(frecuencias[tokens].sum())        # Tokens de nulo → nulo
+        self.longitud_maxima = int(longitudes.max()) if len(longitudes) else 0
+        self._frecuencias = frecuencias
+        self._longitudes = longitudes
+
+    @property
+    def cambios(self):
+        return self.recortadas + self.espacios_colapsados + self.tokens_na
+
+    def filas_mas_largas(self, limite):
+        """Celdas con más de `limite` caracteres (medidas una vez por valor distinto)"""
+        return int(self._frecuencias[self._longitudes > limite].sum())
+
+    def como_dict(self):
+        return {clave: valor for clave, valor in vars(self).items()
+                if clave != 'valores' and not clave.startswith('_')}
+
+
+def normalizar_columna(serie, tipo=None, tokens_nulos=TOKENS_NA):
+    """
+    Normaliza una columna de Excel en una sola pasada sobre sus valores distintos:
+    quita espacios al inicio/final, colapsa los internos, convierte los tokens de nulo
+    (TOKENS_NA) en nulo y mide la longitud. El resultado vuelve a las filas con los
+    códigos de factorize; los nulos reales no se tocan (no pasan por astype(str))
+    `tipo` (ver tipo_memoria) deja el texto como category o string[pyarrow]
+    Retorna un TextoNormalizado
+    """
+    no_nulos = serie.notna().to_numpy()
+    valores = serie[no_nulos]
+    if pd.api.types.infer_dtype(valores, skipna=True) != 'string':
+        # Celdas mezcladas: 1, 1.0 y True son el mismo valor para factorize pero no como texto
+        valores = valores.astype(str)
+    codigos, distintos = pd.factorize(valores)
+    frecuencias = np.bincount(codigos, minlength=len(distintos))
+
+    distintos = pd.Series(distintos, dtype=object)
+    recortados = distintos.str.strip()
+    limpios = recortados.str.replace(_ESPACIOS, ' ', regex=True)
+    tokens = limpios.isin(tokens_nulos).to_numpy()
+    recortadas = (recortados != distintos).to_numpy() & ~tokens
+    colapsadas = (limpios != recortados).to_numpy() & ~tokens
+    longitudes = np.where(tokens, 0, limpios.str.len().to_numpy(dtype=np.int64, na_value=0))
+
+    # Un código extra (el último) para las celdas nulas
+    limpios = np.append(limpios.where(~tokens, None).to_numpy(dtype=object), None)
+    codigos_filas = np.full(len(serie), len(distintos), dtype=np.intp)
+    codigos_filas[no_nulos] = codigos
+    if tipo == 'categoria':
+        # Los valores que quedan iguales (' A' y 'A') comparten categoría
+        codigos_limpios, categorias = pd.factorize(limpios)
+        columna = pd.Categorical.from_codes(codigos_limpios[codigos_filas], categorias)
+    elif tipo == 'arrow':
+        # El texto pasa a Arrow una vez por valor distinto; take arma la columna en Arrow
+        columna = pd.array(limpios, dtype=TEXTO_ARROW).take(codigos_filas)
+    else:
+        columna = limpios[codigos_filas]
+
+    return TextoNormalizado(
+        pd.Series(columna, index=serie.index, name=serie.name),
+        frecuencias, longitudes, recortadas, colapsadas, tokens,
+    )
+
+
+def se_convierte(tabla, columna):
+    """True si la columna del esquema se convierte a número o fecha (ver CONVERTIDORES)"""
+    spec = spec_columna(tabla, columna) if columna else None
+    return spec is not None and spec.get('tipo') in CONVERTIDORES
+
+
+def quitar_tokens_nulos(serie, tokens_nulos=TOKENS_NA):
+    """
+    Limpieza de las columnas que se convierten a número o fecha: solo las celdas de texto
+    que son un token de nulo (con o sin espacios) pasan a nulo. Fechas y números de Excel
+    conservan su tipo, así los convertidores toman sus caminos directos en lugar de volver
+    a parsear su texto. Retorna (serie, celdas con token)
+    """
+    if pd.api.types.infer_dtype(serie, skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+        return serie, 0
+    # .str deja nulas las celdas que no son texto
+    tokens = serie.str.strip().isin(tokens_nulos)
+    return serie.mask(tokens), int(tokens.sum())
+
+# =============================================================================
+# CONVERTIDORES VECTORIZADOS
+# =============================================================================
+def _convertir_entero(serie, columna, spec):
+    return pd.to_numeric(serie, errors='coerce').round().astype('Int64')
+
+
+def _convertir_decimal(serie, columna, spec):
+    return pd.to_numeric(serie, errors='coerce')
+
+
+def _convertir_fecha(serie, columna, spec):
+    fechas, _ = parsear_fechas(serie, columna, TOKENS_NA)
+    return fechas
+
+
+def celdas_no_convertidas(serie, convertida):
+    """Máscara de celdas con valor (que no es un token de nulo) que la conversión dejó nulas"""
+    con_valor = serie.notna()
+    if serie.dtype == object:
+        con_valor &= ~serie.isin(TOKENS_NA)
+    return con_valor & convertida.isna()
+
+
+def _advertir_no_convertidas(serie, convertida, columna, spec):
+    fallidas = celdas_no_convertidas(serie, convertida)
+    if fallidas.any():
+        destino = 'fecha' if spec['tipo'] == 'fecha' else 'número'
+        logger.warning(
+            f"   ⚠️  {fallidas.sum()} valores de '{columna}' no se pudieron convertir a {destino} "
+            f"y quedan NULL - ejemplos: {serie[fallidas].head(3).tolist()}"
+        )
+
+
+def fuera_de_rango(serie, spec):
+    """Máscara de valores convertidos que no caben en el tipo SQL (DECIMAL(p, s)), o None"""
+    if spec['tipo'] != 'decimal':
+        return None
+    return serie.abs() > valor_maximo_decimal(spec['precision'], spec['escala'])
+
+
+def sobre_umbral(serie, spec):
+    """Máscara de valores convertidos mayores que 'advertir_mayor_que', o None si no hay umbral"""
+    if spec.get('advertir_mayor_que') is None:
+        return None
+    return serie > spec['advertir_mayor_que']
+
+
+def _advertir_fuera_de_rango(serie, columna, spec):
+    unidad = f" {spec['unidad']}" if spec.get('unidad') else ''
+    mascara = fuera_de_rango(serie, spec)
+    if mascara is not None and mascara.any():
+        limite = valor_maximo_decimal(spec['precision'], spec['escala'])
+        logger.warning(
+            f"   ⚠️  {mascara.sum()} valores de '{columna}' > {limite:g}{unidad} no caben en "
+            f"DECIMAL({spec['precision']},{spec['escala']}): la base de datos los rechazará"
+        )
+    mascara = sobre_umbral(serie, spec)
+    if mascara is not None and mascara.any():
+        logger.warning(
+            f"   ⚠️  {mascara.sum()} valores de '{columna}' > {spec['advertir_mayor_que']:g}{unidad} "
+            f"(umbral de advertencia)"
+        )
+
+
+def _derivar_primer_elemento(df, columna, spec):
+    origen = df[spec['origen']]
+    primero = origen.str.split(spec['separador'], n=1).str[0].str.strip()
+    primero = primero.where(origen.notna(), None)
+    # Mismo tipo en memoria que la columna de origen
+    return primero.astype(origen.dtype) if isinstance(origen.dtype, pd.StringDtype) else primero
+
+
+def separar_codigos(serie, separador=','):
+    """
+    Listas de códigos separados por `separador` → una fila por código, sin espacios ni
+    vacíos. Un split + explode para toda la columna: cada código conserva el índice de su fila
+    """
+    codigos = serie.dropna().astype(str).str.split(separador).explode().str.strip()
+    return codigos[codigos.notna() & (codigos != '')]
+
+
+def _explotar_lista(df, tabla_hija, spec):
+    llave, valor, posicion = spec['llave'], spec['valor'], spec['posicion']
+    origen = df[spec['origen']]
+    codigos = separar_codigos(origen[df[llave].notna()], spec['separador'])
+    # El índice de la fila padre se conserva: una fila hija rechazada se reporta con su fila del Excel
+    hija = pd.DataFrame({llave: df[llave].reindex(codigos.index), valor: codigos})
+    # Un código repetido en la misma interrupción (o la misma interrupción en dos filas) va una vez
+    hija = hija.drop_duplicates(subset=[llave, valor])
+    hija[posicion] = (hija.groupby(llave, sort=False).cumcount() + 1).astype('Int64')
+    return hija
+
+
+CONVERTIDORES = {
+    'entero': _convertir_entero,
+    'decimal': _convertir_decimal,
+    'fecha': _convertir_fecha,
+}
+
+DERIVACIONES = {
+    'primer_elemento': _derivar_primer_elemento,
+}
+
+DESCOMPOSICIONES = {
+    'explotar_lista': _explotar_lista,
+}
+
+# Esquemas compilados: tabla → (conversiones, derivaciones)
+_compilados = {}
+
+
+def compilar_esquema(tabla):
+    """
+    Compila (una sola vez por tabla) el esquema declarativo en listas de
+    funciones vectorizadas: [(columna, convertidor, spec)], [(columna, derivación, spec)]
+    """
+    if tabla not in _compilados:
+        esquema = ESQUEMAS_TABLAS.get(tabla, {})
+        conversiones = [
+            (columna, CONVERTIDORES[spec['tipo']], spec)
+            for columna, spec in esquema.get('columnas', {}).items()
+            if spec['tipo'] in CONVERTIDORES
+        ]
+        derivaciones = [
+            (columna, DERIVACIONES[spec['funcion']], spec)
+            for columna, spec in esquema.get('derivadas', {}).items()
+        ]
+        _compilados[tabla] = (conversiones, derivaciones)
+    return _compilados[tabla]
+
+
+def aplicar_esquema(df, tabla, convertidas=None):
+    """
+    Aplica las conversiones de tipo y las columnas derivadas del esquema de la tabla
+    `convertidas` ({columna: serie ya convertida}, p. ej. del perfilador) evita repetir
+    la conversión de esas columnas
+    """
+    conversiones, derivaciones = compilar_esquema(tabla)
+    convertidas = convertidas or {}
+
+    for columna, convertidor, spec in conversiones:
+        if columna in df.columns:
+            if columna in convertidas:
+                # Ya convertida (y reportada) por el perfilador
+                df[columna] = convertidas[columna]
+            else:
+                original = df[columna]
+                df[columna] = convertidor(original, columna, spec)
+                _advertir_no_convertidas(original, df[columna], columna, spec)
+                _advertir_fuera_de_rango(df[columna], columna, spec)
+
+    for columna, derivacion, spec in derivaciones:
+        if spec['origen'] in df.columns:
+            df[columna] = derivacion(df, columna, spec)
+            logger.info(f"   ✓ Creada columna '{columna}'")
+
+    return df
+
+
+def tablas_hijas(tabla):
+    """{tabla hija: especificación} de las tablas que se arman a partir de la tabla"""
+    return ESQUEMAS_TABLAS.get(tabla, {}).get('hijas', {})
+
+
+def indices_tabla(tabla):
+    """Índices declarados en el esquema de la tabla (listas de columnas)"""
+    return ESQUEMAS_TABLAS.get(tabla, {}).get('indices', [])
+
+
+def derivar_tablas_hijas(df, tabla):
+    """
+    Arma las tablas hijas del esquema a partir del DataFrame limpio de la tabla padre
+    Retorna {tabla hija: DataFrame}; se omiten las hijas cuyo origen no está en la hoja
+    """
+    hijas = {}
+    for tabla_hija, spec in tablas_hijas(tabla).items():
+        if spec['origen'] in df.columns and spec['llave'] in df.columns:
+            hijas[tabla_hija] = DESCOMPOSICIONES[spec['funcion']](df, tabla_hija, spec)
+    return hijas
@@ -1,151 +1,80 @@
-import pandas as pd
-import pyodbc
-from sqlalchemy import create_engine
-import urllib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from copy import copy
+from itertools import islice
+import cProfile
 import os
+import json
+import hashlib
 from pathlib import Path
 import logging
 from datetime import datetime
-from dotenv import load_dotenv
 
-# Cargar variables de entorno desde el archivo .env
-load_dotenv()
-
-# =============================================================================
-# CONFIGURACIÓN Y LOGGING
-# =============================================================================
-
-# Configurar logging
-log_dir = Path('logs')
-log_dir.mkdir(exist_ok=True)
-timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-log_file = log_dir / f"etl_{timestamp}.log"
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from lector_excel import LibroExcel, LibroExcelPorBloques, motor_por_defecto, seleccionar_motor
+from cargadores import (
+    CARGADORES, COLUMNA_ERROR, MAX_RECHAZOS_POR_DEFECTO, CargadorUpsert, asegurar_indices, borrar_por_llave,
+    obtener_cargador,
 )
-logger = logging.getLogger(__name__)
-
-# =============================================================================
-# CONFIGURACIÓN DE CONEXIÓN A SQL SERVER (desde variables de entorno)
-# =============================================================================
-server = os.getenv('SQL_SERVER')
-database = os.getenv('SQL_DATABASE')
-username = os.getenv('SQL_USERNAME')
-password = os.getenv('SQL_PASSWORD')
-driver = os.getenv('SQL_DRIVER', 'ODBC Driver 17 for SQL Server')
-use_windows_auth = os.getenv('SQL_USE_WINDOWS_AUTH', 'false').lower() == 'true'
-#Use Windows Auth solamente en la fase de testing, cambiar al modo credenciales al finalizar pruebas
-
-
-
-# Validar que las variables esenciales estén configuradas
-if not server or not database:
-    raise ValueError(
-        "Error: Faltan variables de entorno para la conexión SQL.\n"
-        "Variables requeridas:\n"
-        "  - SQL_SERVER (ej: localhost, localhost\\SQLEXPRESS, 127.0.0.1,1433)\n"
-        "  - SQL_DATABASE\n"
-        "\n"
-        "Para autenticación SQL Server (por defecto):\n"
-        "  - SQL_USERNAME\n"
-        "  - SQL_PASSWORD\n"
-        "\n"
-        "Para autenticación de Windows:\n"
-        "  - SQL_USE_WINDOWS_AUTH=true\n"
-        "\n"
-        "Puedes usar .env.example como plantilla."
-    )
-
-# Construir connection string según el tipo de autenticación
-if use_windows_auth:
-    # Windows Authentication (Trusted Connection)
-    connection_string = f'DRIVER={{{driver}}};SERVER={server};DATABASE={database};Trusted_Connection=yes'
-    logger.info("✓ Usando autenticación de Windows (Trusted Connection)")
-else:
-    # SQL Server Authentication
-    if not username or not password:
-        raise ValueError(
-            "Error: Para autenticación SQL Server se requieren SQL_USERNAME y SQL_PASSWORD.\n"
-            "O configura SQL_USE_WINDOWS_AUTH=true para usar autenticación de Windows."
-        )
-    connection_string = f'DRIVER={{{driver}}};SERVER={server};DATABASE={database};UID={username};PWD={password}'
-    logger.info("✓ Usando autenticación SQL Server")
-
-params = urllib.parse.quote_plus(connection_string)
-engine = create_engine(f"mssql+pyodbc:///?odbc_connect={params}")
+from rechazos import crear_destino
+from manifiesto import ManifiestoCargas
+from esquemas import (
+    ESQUEMAS_TABLAS, aplicar_esquema, derivar_tablas_hijas, indices_tabla, llaves_naturales,
+    longitud_maxima, normalizar_columna, quitar_tokens_nulos, se_convierte, tablas_hijas, tipo_memoria,
+)
+from mapeo_columnas import CatalogoColumnas, MapeadorColumnas
+from cache_hojas import CacheHojas
+from perfilador import fila_excel, perfilar_hoja
+from integridad import LlavesBaseDatos, VerificadorIntegridad
+from topologia import CENTROS, EQUIPOS, TABLA_TOPOLOGIA, actualizar_topologia
+from confiabilidad import TABLA_INTERRUPCIONES, TABLA_RESUMEN, actualizar_resumen, meses_afectados, meses_guardados
+from salidas import crear_salidas, destinos_manifiesto, incluye_sql
+from configuracion import CARPETA_EXCEL_POR_DEFECTO, Configuracion
+from vigilante import ESPERA_POR_DEFECTO, INTERVALO_SONDEO_POR_DEFECTO, VigilanteCarpeta
+import fechas
+import metricas
 
-logger.info("✓ Configuración SQL cargada desde variables de entorno")
-logger.info(f"  - Servidor: {server}")
-logger.info(f"  - Base de datos: {database}")
-if not use_windows_auth:
-    logger.info(f"  - Usuario: {username}")
+# Importar este módulo no lee .env, no crea carpetas ni se conecta a la base de datos:
+# la configuración se lee y el engine se crea al usar Pipeline (ver configuracion.py)
+logger = logging.getLogger(__name__)
 
 # =============================================================================
-# CONFIGURACIÓN DEL ARCHIVO EXCEL (desde variables de entorno)
+# CONFIGURACIÓN DE LOGGING (SOLO AL EJECUTAR COMO SCRIPT)
 # =============================================================================
-carpeta_excel = os.getenv('EXCEL_FOLDER', 'C:\\Users\\David Raudales\\Documents\\Datos Regulatorios Sistemas Aislados')
-
-if carpeta_excel == 'C:\\Users\\David Raudales\\Documents\\Datos Regulatorios Sistemas Aislados':
-    logger.warning("⚠️  Usando ruta de Excel por defecto. Configura EXCEL_FOLDER en .env")
+def configurar_logging(carpeta_logs='logs', nivel=logging.INFO):
+    """
+    Log a consola y a <carpeta_logs>/etl_YYYYMMDD_HHMMSS.log
+    Retorna (ruta del log, marca de tiempo de la corrida)
+    """
+    log_dir = Path(carpeta_logs)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    log_file = log_dir / f"etl_{timestamp}.log"
+    
+    logging.basicConfig(
+        level=nivel,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+    return log_file, timestamp
 
 # =============================================================================
 # MAPEO CRÍTICO: Excel → SQL Server (NOMBRES EXACTOS)
 # =============================================================================
 
 # IMPORTANTE: Los nombres de columnas en SQL tienen acentos, espacios y caracteres especiales
-# Debemos mapear exactamente como están en SQL Server
+# Las variantes de escritura (acentos, mayúsculas, espacios, guion bajo) se resuelven solas
+# contra las columnas reales de cada tabla (ver mapeo_columnas.py). Los alias conocidos
+# (encabezados con un nombre distinto al de la columna) están en esquemas.ESQUEMAS_TABLAS;
+# aquí se pueden agregar otros sin tocar el esquema
 
 COLUMN_MAPPINGS = {
-    'Centro MTBT': {
-        # Excel puede tener variaciones → SQL Server nombre exacto
-        'Código Centro MT/BT': 'Código Centro de transformación MT/BT',
-        'Codigo Centro MT/BT': 'Código Centro de transformación MT/BT',
-        'Código Centro de transformación MT/BT': 'Código Centro de transformación MT/BT',
-        'KVA instalado por transformador': 'KVA instalado por transformador',
-        'Equipo aguas arriba': 'Equipo aguas arriba',
-        'Propietario': 'Propietario',
-        'UTM Centro MT/BT Norte': 'UTM Centro MT/BT Norte',
-        'UTM Centro MT/BT Oeste': 'UTM Centro MT/BT Oeste',
-    },
-    'Equipos de maniobras': {
-        # Manejar variaciones de capitalización
-        'Código de Equipo': 'Código de equipo',  # Nota: SQL tiene minúscula
-        'Código de equipo': 'Código de equipo',
-        'Codigo de Equipo': 'Código de equipo',
-        'Codigo de equipo': 'Código de equipo',
-        'Tipo de Equipo': 'Tipo de equipo',
-        'Tipo de equipo': 'Tipo de equipo',
-        'Código de subestación': 'Código de subestación',
-        'Codigo de Equipo Aguas Arriba': 'Codigo de Equipo Aguas Arriba',
-        'Nivel de tensión': 'Nivel de tensión',
-        'Nivel de tension': 'Nivel de tensión',
-        'Corriente máxima': 'Corriente máxima',
-        'Corriente maxima': 'Corriente máxima',
-        'UTM Equipo Norte': 'UTM Equipo Norte',
-        'UTM Equipo Oeste': 'UTM Equipo Oeste',
-    },
-    'Interrupciones': {
-        'ID_Interrupcion': 'ID_Interrupcion',
-        'ID Interrupcion': 'ID_Interrupcion',
-        'Fecha y Hora_Inicio': 'Fecha y Hora_Inicio',
-        'Fecha y Hora Inicio': 'Fecha y Hora_Inicio',
-        'Fecha y Hora_Cierre': 'Fecha y Hora_Cierre',
-        'Fecha y Hora Cierre': 'Fecha y Hora_Cierre',
-        'Causa': 'Causa',
-        'Fecha Notificacion al Usuario': 'Fecha Notificacion al Usuario',
-        'Fecha Notificación al Usuario': 'Fecha Notificacion al Usuario',
-        'Origen del evento': 'Origen del evento',
-        'Código de Equipo': 'Código de Equipo',
-        'Codigo de Equipo': 'Código de Equipo',
-        'Enlace Medio de Notificacion a los Usuarios': 'Enlace Medio de Notificacion a los Usuarios',
-        'Observaciones': 'Observaciones',
-    }
+    'Centro MTBT': {},
+    'Equipos de maniobras': {},
+    'Interrupciones': {},
 }
 
 # Nombres de tablas SQL exactos (con espacios)
@@ -155,134 +84,722 @@ TABLE_NAMES = {
     'Interrupciones': 'Interrupciones'
 }
 
+# Llave natural de cada tabla para el modo upsert (columnas con 'llave' en el esquema)
+LLAVES_NATURALES = {tabla: llaves_naturales(tabla) for tabla in TABLE_NAMES.values()}
+
+# Mapeador compilado encabezado → columna, compartido por todos los archivos de la corrida
+# Sin catálogo usa el esquema local; Pipeline le asigna el catálogo de su base de datos,
+# que se lee una vez (con caché local en .cache/)
+mapeador_columnas = MapeadorColumnas(COLUMN_MAPPINGS, tablas=TABLE_NAMES.values())
+
+# Se incrementa cuando cambia el código de limpieza: invalida las hojas limpias en caché
+VERSION_LIMPIEZA = 3
+_version_limpieza = None
+
+
+def version_limpieza():
+    """
+    Huella de todo lo que determina el resultado de limpiar_dataframe: VERSION_LIMPIEZA,
+    los esquemas, los alias y las columnas destino. Forma parte de la clave de las
+    hojas limpias en la caché
+    """
+    global _version_limpieza
+    if _version_limpieza is None:
+        contenido = json.dumps(
+            [VERSION_LIMPIEZA, ESQUEMAS_TABLAS, COLUMN_MAPPINGS,
+             {hoja: mapeador_columnas.columnas_destino(hoja) for hoja in TABLE_NAMES}],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        _version_limpieza = hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:12]
+    return _version_limpieza
+
+
+def usar_catalogo(catalogo):
+    """Cambia el catálogo de columnas del mapeador (otra base de datos o el esquema local)"""
+    global _version_limpieza
+    mapeador_columnas.usar_catalogo(catalogo)
+    _version_limpieza = None
+
 # =============================================================================
 # FUNCIÓN PARA OBTENER ARCHIVOS EXCEL
 # =============================================================================
-def obtener_archivos_excel(carpeta):
-    """Obtiene todos los archivos Excel (.xlsx, .xls) de una carpeta"""
+def obtener_archivos_excel(carpeta, manifiesto=None, tabla_sheet_map=None):
+    """
+    Obtiene todos los archivos Excel (.xlsx, .xls) de una carpeta
+    Si se pasa un manifiesto, solo retorna los archivos nuevos, modificados
+    o con alguna hoja de tabla_sheet_map que no se cargó con éxito
+    """
     ruta = Path(carpeta)
     archivos_excel = []
     
     for extension in ['*.xlsx', '*.xls']:
         archivos_excel.extend(ruta.glob(extension))
     
-    return sorted(archivos_excel)
+    archivos_excel = sorted(archivos_excel)
+    
+    if manifiesto is not None:
+        tabla_sheet_map = tabla_sheet_map or TABLE_NAMES
+        pendientes = [a for a in archivos_excel if manifiesto.hojas_pendientes(a, tabla_sheet_map)]
+        omitidos = len(archivos_excel) - len(pendientes)
+        if omitidos:
+            logger.info(f"✓ {omitidos} archivo(s) ya cargados según el manifiesto - se omiten")
+        archivos_excel = pendientes
+    
+    return archivos_excel
 
 # =============================================================================
 # FUNCIÓN PARA MAPEAR COLUMNAS
 # =============================================================================
 def mapear_columnas(df, tabla):
-    """Mapea columnas de Excel a nombres exactos de SQL Server"""
-    mapeo = COLUMN_MAPPINGS.get(tabla, {})
+    """
+    Mapea columnas de Excel a nombres exactos de SQL Server
+    Las columnas sin equivalente en la tabla se omiten (to_sql fallaría con ellas)
+    """
+    renombres, no_mapeadas = mapeador_columnas.renombres(df.columns, tabla)
     
-    # Crear diccionario de mapeo solo para columnas que existen en el DataFrame
-    columnas_a_renombrar = {}
-    columnas_no_mapeadas = []
+    if logger.isEnabledFor(logging.DEBUG):
+        for col_excel, col_sql in renombres.items():
+            logger.debug(f"   Mapeo: '{col_excel}' → '{col_sql}'")
     
-    for col_excel in df.columns:
-        if col_excel in mapeo:
-            columnas_a_renombrar[col_excel] = mapeo[col_excel]
-            logger.info(f"   Mapeo: '{col_excel}' → '{mapeo[col_excel]}'")
-        else:
-            # Columna no está en el mapeo - mantener nombre original
-            columnas_no_mapeadas.append(col_excel)
-            logger.warning(f"   ⚠️  Columna '{col_excel}' no está en mapeo - manteniendo nombre original")
+    if no_mapeadas:
+        logger.warning(f"   ⚠️  Columnas sin equivalente en la tabla '{tabla}' - se omiten: {no_mapeadas}")
+        df = df.drop(columns=no_mapeadas)
     
     # Renombrar columnas
-    df = df.rename(columns=columnas_a_renombrar)
+    df = df.rename(columns=renombres)
     
     return df
 
 # =============================================================================
 # FUNCIÓN PARA LIMPIAR Y PREPARAR DATOS
 # =============================================================================
-def limpiar_dataframe(df, nombre_tabla):
-    """Limpia y prepara el DataFrame según la tabla destino"""
-    df = df.dropna(axis=1, how='all')
-    df = df.dropna(axis=0, how='all')
-    for col in df.select_dtypes(include=['object']).columns:
-        df[col] = df[col].astype(str).str.strip()  # Remove leading/trailing spaces
-        df[col] = df[col].str.replace(r'\s+', ' ', regex=True)  # Replace multiple spaces with single space
-        df[col] = df[col].replace('nan', None)  # Convert 'nan' strings back to None
-    
-    df = mapear_columnas(df, nombre_tabla)
-    
-    if nombre_tabla == 'Centro MTBT':
-        if 'KVA instalado por transformador' in df.columns:
-            df['KVA instalado por transformador'] = pd.to_numeric(
-                df['KVA instalado por transformador'], errors='coerce'
-            )
-            valores_grandes = df['KVA instalado por transformador'] > 99.9999
-            if valores_grandes.any():
-                logger.warning(
-                    f"   ⚠️  {valores_grandes.sum()} valores de KVA > 99.9999 serán truncados"
-                )
+def registrar_normalizacion(normalizados):
+    """Escribe en el log lo que cambió la normalización del texto ({columna: esquemas.TextoNormalizado})"""
+    recortadas = sum(normalizado.recortadas for normalizado in normalizados.values())
+    colapsadas = sum(normalizado.espacios_colapsados for normalizado in normalizados.values())
+    tokens = sum(normalizado.tokens_na for normalizado in normalizados.values())
+    if not recortadas + colapsadas + tokens:
+        return
+    logger.info(
+        f"   ✓ Texto normalizado: {recortadas} celdas recortadas, {colapsadas} con espacios "
+        f"internos colapsados, {tokens} sin dato (NA, -, /) → nulo"
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        for col, normalizado in normalizados.items():
+            if normalizado.cambios:
+                logger.debug(f"   '{col}': {normalizado.como_dict()}")
+
+
+def limpiar_dataframe(df, nombre_tabla, reporte=None, normalizados=None):
+    """
+    Limpia y prepara el DataFrame según la tabla destino
+    Las conversiones de tipo y columnas derivadas vienen de esquemas.ESQUEMAS_TABLAS
+    Con el `reporte` del perfilador (perfilador.perfilar_hoja sobre este mismo df) se
+    reutilizan el texto limpio y las columnas ya convertidas en lugar de recalcularlos
+    Si se pasa el dict `normalizados` se llena con el esquemas.TextoNormalizado de cada
+    columna de texto (por columna SQL), que verificar_longitudes reutiliza
+    """
+    texto_limpio = reporte.texto_limpio if reporte is not None else {}
+    convertidas = reporte.convertidas if reporte is not None else None
+    normalizados = {} if normalizados is None else normalizados
+    
+    with metricas.medir('limpieza'):
+        df = df.dropna(axis=1, how='all')
+        df = df.dropna(axis=0, how='all')
+        # Espacios, tokens de nulo y longitudes en una pasada por valor distinto; el texto
+        # queda con el tipo en memoria de su columna destino (category / string[pyarrow])
+        renombres, _ = mapeador_columnas.renombres(df.columns, nombre_tabla)
+        for col in df.select_dtypes(include=['object']).columns:
+            if se_convierte(nombre_tabla, renombres.get(col)):
+                # Números y fechas: solo tokens de nulo; con el reporte ya están convertidas
+                if renombres[col] not in (convertidas or {}):
+                    df[col], _ = quitar_tokens_nulos(df[col])
+                continue
+            normalizado = texto_limpio.get(col)
+            if normalizado is None:
+                normalizado = normalizar_columna(df[col], tipo_memoria(nombre_tabla, renombres.get(col)))
+            df[col] = normalizado.valores
+            if col in renombres:
+                normalizados[renombres[col]] = normalizado
+        registrar_normalizacion(normalizados)
+    
+    with metricas.medir('mapeo') as medicion:
+        df = mapear_columnas(df, nombre_tabla)
+        medicion['filas'] = len(df)
+    
+    with metricas.medir('limpieza') as medicion:
+        df = aplicar_esquema(df, nombre_tabla, convertidas)
         
-        #  FIXED: Proper Int64 conversion
-        if 'UTM Centro MT/BT Norte' in df.columns:
-            df['UTM Centro MT/BT Norte'] = pd.to_numeric(
-                df['UTM Centro MT/BT Norte'], errors='coerce'
-            ).round().astype('Int64')  # Round first, then convert
-            
-        if 'UTM Centro MT/BT Oeste' in df.columns:
-            df['UTM Centro MT/BT Oeste'] = pd.to_numeric(
-                df['UTM Centro MT/BT Oeste'], errors='coerce'
-            ).round().astype('Int64')
-    
-    elif nombre_tabla == 'Equipos de maniobras':
-        if 'Nivel de tensión' in df.columns:
-            df['Nivel de tensión'] = pd.to_numeric(
-                df['Nivel de tensión'], errors='coerce'
-            )
-            valores_grandes = df['Nivel de tensión'] > 9.99
-            if valores_grandes.any():
-                logger.warning(
-                    f"   ⚠️  {valores_grandes.sum()} valores > 9.99 kV serán truncados"
-                )
+        if 'id' in df.columns:
+            df = df.drop(columns=['id'])
+            logger.info("   ✓ Removida columna 'id' (IDENTITY en SQL)")
         
-        if 'Corriente máxima' in df.columns:
-            df['Corriente máxima'] = pd.to_numeric(
-                df['Corriente máxima'], errors='coerce'
-            ).round().astype('Int64')  
+        medicion['filas'] = len(df)
+        medicion['bytes'] = int(df.memory_usage().sum())
+    
+    return df
+# =============================================================================
+# VERIFICACIÓN DE LONGITUDES ANTES DE CARGAR
+# =============================================================================
+def verificar_longitudes(df, nombre_tabla=None, normalizados=None):
+    """
+    Advierte sobre columnas de texto que exceden su longitud en SQL
+    (la del esquema de la tabla, o 255 si la columna no está en el esquema)
+    Las columnas en `normalizados` (ver limpiar_dataframe) usan la longitud ya medida
+    """
+    normalizados = normalizados or {}
+    for col in df.select_dtypes(include=['object', 'string', 'category']):
+        limite = longitud_maxima(nombre_tabla, col) or 255
+        if col in normalizados:
+            max_len = normalizados[col].longitud_maxima
+        else:
+            valores = df[col].dropna()
+            if not len(valores):
+                continue
+            # category y string[pyarrow] ya son texto (en category se mide una vez por valor distinto)
+            max_len = (valores.astype(str) if valores.dtype == object else valores).str.len().max()
+        if max_len > limite:
+            logger.warning(
+                f"   ⚠️  Columna '{col}' tiene valores hasta {max_len} caracteres "
+                f"(límite SQL: {limite})"
+            )
+
+# =============================================================================
+# PREPARACIÓN DE UNA HOJA (LECTURA + LIMPIEZA)
+# =============================================================================
+def memoria_hoja(df):
+    """Bytes que ocupa el DataFrame, contando el contenido de los textos (object)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def registrar_memoria(antes, despues):
+    """Memoria de la hoja leída frente a la hoja limpia con el plan de tipos (esquemas.tipo_memoria)"""
+    if not antes or not despues:
+        return
+    logger.info(
+        f"✓ Memoria de la hoja: {antes / 2**20:.1f} MB leída → {despues / 2**20:.1f} MB limpia "
+        f"({antes / despues:.1f}x)"
+    )
+
+def preparar_hoja(libro, hoja_excel):
+    """
+    Lee, valida y limpia una hoja del libro ya abierto; retorna el DataFrame listo para cargar
+    La validación (perfilador) convierte cada columna una sola vez y la limpieza reutiliza
+    esas conversiones. Si el libro tiene caché y la hoja ya se limpió con la misma versión
+    de limpieza, se recupera directamente la hoja limpia
+    """
+    with metricas.contexto(hoja=hoja_excel):
+        # Leer la hoja de Excel (o la hoja ya limpia desde la caché)
+        with metricas.medir('lectura') as medicion:
+            df = libro.leer_de_cache(hoja_excel, 'limpia', version_limpieza())
+            desde_cache = df is not None
+            if not desde_cache:
+                df = libro.leer_hoja(hoja_excel)
+                libro.liberar_hoja(hoja_excel)
+            medicion['filas'] = len(df)
+            medicion['bytes'] = int(df.memory_usage().sum())
         
-        #  FIXED: UTM coordinates
-        if 'UTM Equipo Norte' in df.columns:
-            df['UTM Equipo Norte'] = pd.to_numeric(
-                df['UTM Equipo Norte'], errors='coerce'
-            ).round().astype('Int64')
+        if desde_cache:
+            logger.info(f"✓ Datos limpios recuperados de la caché: {len(df)} filas")
+            with metricas.medir('validacion') as medicion:
+                verificar_longitudes(df, hoja_excel)
+                medicion['filas'] = len(df)
+        else:
+            logger.info(f"✓ Datos leídos: {len(df)} filas, {len(df.columns)} columnas")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"   Columnas originales: {list(df.columns)}")
+            
+            # Validar: nulos, longitudes, conversiones fallidas, desbordes y llaves
+            with metricas.medir('validacion') as medicion:
+                reporte = perfilar_hoja(df, hoja_excel, mapeador=mapeador_columnas)
+                for advertencia in reporte.advertencias():
+                    logger.warning(f"   ⚠️  {advertencia}")
+                medicion['filas'] = len(df)
             
-        if 'UTM Equipo Oeste' in df.columns:
-            df['UTM Equipo Oeste'] = pd.to_numeric(
-                df['UTM Equipo Oeste'], errors='coerce'
-            ).round().astype('Int64')
-    
-    elif nombre_tabla == 'Interrupciones':
-        # Date conversions
-        for col in ['Fecha y Hora_Inicio', 'Fecha y Hora_Cierre', 'Fecha Notificacion al Usuario']:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+            # Limpiar y preparar datos (reutilizando las conversiones de la validación)
+            memoria_leida = memoria_hoja(df)
+            df = limpiar_dataframe(df, hoja_excel, reporte)
+            df = libro.guardar_en_cache(df, hoja_excel, 'limpia', version_limpieza())
+            logger.info(f"✓ Datos limpiados: {len(df)} filas válidas")
+            registrar_memoria(memoria_leida, memoria_hoja(df))
         
-        if 'Código de Equipo' in df.columns:
-            df['CódigoDePrimerEquipo'] = df['Código de Equipo'].astype(str).apply(
-                lambda x: x.split(',')[0].strip() if pd.notna(x) and x != 'nan' else None
+        # Columnas finales y primeras filas solo con --debug (armar los dicts tiene costo)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"   Columnas finales para SQL: {list(df.columns)}")
+            logger.debug("\n   Primeras 3 filas:")
+            for i, row in df.head(3).iterrows():
+                logger.debug(f"   {i}: {row.to_dict()}")
+    
+    return df
+
+# =============================================================================
+# FILAS RECHAZADAS POR LA BASE DE DATOS
+# =============================================================================
+def registrar_rechazos(metricas_carga, tabla_sql, archivo, hoja_excel, rechazos=None):
+    """
+    Guarda en `rechazos` (rechazos.RechazosArchivo/RechazosTabla) las filas que la base
+    de datos no aceptó; sin destino solo se listan en el log. Retorna cuántas fueron
+    """
+    rechazadas = metricas_carga.get('rechazadas')
+    if rechazadas is None or not len(rechazadas):
+        return 0
+    
+    if rechazos is not None:
+        rechazos.escribir(rechazadas, tabla_sql, archivo, hoja_excel)
+        logger.warning(f"   ⚠️  {len(rechazadas)} filas rechazadas guardadas en {rechazos.descripcion}")
+    else:
+        for indice, error in rechazadas[COLUMNA_ERROR].head(20).items():
+            logger.warning(f"   ⚠️  Fila Excel {fila_excel([indice])[0]} rechazada: {error}")
+    return len(rechazadas)
+
+# =============================================================================
+# INTEGRIDAD REFERENCIAL ENTRE HOJAS
+# =============================================================================
+def registrar_integridad(reporte, despues_de_cargar=False):
+    """Escribe en el log los huérfanos y las llaves repetidas de un archivo (integridad.ReporteIntegridad)"""
+    advertencias = reporte.advertencias()
+    momento = " (revisado después de cargar por bloques)" if despues_de_cargar else ''
+    if not advertencias:
+        logger.info(f"✓ Integridad referencial de {reporte.archivo}: sin huérfanos ni llaves repetidas{momento}")
+        return
+    logger.warning(f"⚠️  Integridad referencial de {reporte.archivo}{momento}:")
+    for advertencia in advertencias:
+        logger.warning(f"   ⚠️  {advertencia}")
+
+
+def verificar_integridad(nombre_archivo, preparados, tabla_sheet_map, llaves_bd=None):
+    """
+    Revisa las referencias entre las hojas preparadas de un archivo con conjuntos hash
+    (integridad.VerificadorIntegridad) y escribe el reporte; retorna el verificador
+    """
+    verificador = VerificadorIntegridad(llaves_bd)
+    with metricas.medir('validacion', archivo=nombre_archivo, hoja='(integridad)') as medicion:
+        for hoja_excel, df in preparados.items():
+            verificador.agregar(tabla_sheet_map[hoja_excel], df)
+        reporte = verificador.reporte(nombre_archivo)
+        medicion['filas'] = sum(len(df) for df in preparados.values())
+    registrar_integridad(reporte)
+    return verificador
+
+
+def incorporar_llaves(llaves_bd, verificador, resultados, nombre_archivo, tabla_sheet_map):
+    """Las llaves de las hojas cargadas cuentan como existentes para los archivos siguientes"""
+    if llaves_bd is None:
+        return
+    cargadas = {
+        tabla_sql for tabla_sql in tabla_sheet_map.values()
+        if resultados.get(f"{nombre_archivo} - {tabla_sql}", {}).get('estado') == 'éxito'
+    }
+    llaves_bd.incorporar(verificador, cargadas)
+
+# =============================================================================
+# TABLAS HIJAS (P. EJ. INTERRUPCIONES → EQUIPOS)
+# =============================================================================
+def filas_aceptadas(df, metricas_carga):
+    """
+    Filas de la hoja (o bloque) que quedaron en la tabla: sin las que la base de datos
+    rechazó ni las que el upsert omitió (sin llave o con la llave repetida más abajo)
+    """
+    descartadas = list(metricas_carga.get('indice_omitidas', ()))
+    rechazadas = metricas_carga.get('rechazadas')
+    if rechazadas is not None:
+        descartadas.extend(rechazadas.index)
+    return df.drop(index=descartadas) if descartadas else df
+
+
+def cargar_tablas_hijas(df, metricas_carga, tabla_sql, engine, if_exists='append', cargador=None,
+                        archivo=None, hoja_excel=None, rechazos=None):
+    """
+    Arma y carga las tablas hijas del esquema (esquemas.derivar_tablas_hijas) con las
+    filas de la tabla padre que la base de datos aceptó, justo después de cargarlas
+    En modo upsert las hijas de cada fila padre se reemplazan completas: un código que
+    se quitó en el reenvío corregido no queda en la tabla puente
+    Retorna {tabla hija: {'filas', 'rechazadas'}}
+    """
+    if not tablas_hijas(tabla_sql):
+        return {}
+    cargador = obtener_cargador(cargador)
+    df = filas_aceptadas(df, metricas_carga)
+    
+    resultados = {}
+    for tabla_hija, df_hija in derivar_tablas_hijas(df, tabla_sql).items():
+        spec = tablas_hijas(tabla_sql)[tabla_hija]
+        with metricas.medir('carga', hoja=hoja_excel) as medicion:
+            cargador_hija = cargador
+            if isinstance(cargador, CargadorUpsert):
+                borradas = borrar_por_llave(engine, tabla_hija, spec['llave'], df[spec['llave']].dropna())
+                if borradas:
+                    logger.info(f"   ✓ {borradas} filas anteriores de '{tabla_hija}' reemplazadas")
+                cargador_hija = obtener_cargador()
+                cargador_hija.max_rechazos = cargador.max_rechazos
+            metricas_hija = cargador_hija.cargar(df_hija, tabla_hija, engine, if_exists=if_exists)
+            for indice in asegurar_indices(engine, tabla_hija, indices_tabla(tabla_hija)):
+                logger.info(f"   ✓ Creado índice '{indice}' en '{tabla_hija}'")
+            medicion['filas'] = metricas_hija['filas']
+            medicion['bytes'] = int(df_hija.memory_usage().sum())
+        resultados[tabla_hija] = {
+            'filas': metricas_hija['filas'],
+            'rechazadas': registrar_rechazos(metricas_hija, tabla_hija, archivo, hoja_excel, rechazos),
+        }
+        logger.info(f"✓ {metricas_hija['filas']} filas cargadas a la tabla hija '{tabla_hija}'")
+    return resultados
+
+
+def sumar_hijas(acumulado, hijas):
+    """Acumula los resultados de cargar_tablas_hijas (carga por bloques)"""
+    for tabla_hija, resultado in hijas.items():
+        total = acumulado.setdefault(tabla_hija, {'filas': 0, 'rechazadas': 0})
+        total['filas'] += resultado['filas']
+        total['rechazadas'] += resultado['rechazadas']
+    return acumulado
+
+
+def meses_cargados(df, metricas_carga, tabla_sql):
+    """
+    Meses de las interrupciones que la base de datos aceptó (para el resumen de
+    confiabilidad), más los que tenían antes las interrupciones actualizadas en upsert
+    """
+    if tabla_sql != TABLA_INTERRUPCIONES:
+        return []
+    meses = set(meses_afectados(filas_aceptadas(df, metricas_carga)))
+    return sorted(meses.union(metricas_carga.get('meses_anteriores', [])))
+
+# =============================================================================
+# SALIDAS EN ARCHIVOS (PARQUET / CSV, VER salidas.py)
+# =============================================================================
+def escribir_salidas(salidas, df, tabla_sql, archivo, hoja_excel):
+    """
+    Escribe las filas cargadas de una hoja (o porción, o bloque) y sus tablas hijas en
+    cada salida de archivos. Retorna {tabla: filas escritas}
+    """
+    if not salidas:
+        return {}
+    tablas = {tabla_sql: df, **derivar_tablas_hijas(df, tabla_sql)}
+    escritas = {}
+    with metricas.medir('salidas', archivo=archivo, hoja=hoja_excel) as medicion:
+        for salida in salidas:
+            for tabla, df_tabla in tablas.items():
+                escritas[tabla] = salida.escribir(df_tabla, tabla, archivo, hoja_excel)
+        medicion['filas'] = sum(escritas.values())
+    logger.info(
+        f"   ✓ Salidas ({', '.join(salida.formato for salida in salidas)}): "
+        + ", ".join(f"{filas} filas de '{tabla}'" for tabla, filas in escritas.items())
+    )
+    return escritas
+
+
+def cargar_en_destinos(df, tabla_sql, engine, if_exists, cargador, archivo, hoja_excel, rechazos=None, salidas=()):
+    """
+    Carga una hoja (o porción, o bloque) en la base de datos si hay `engine`, con sus
+    tablas hijas, y después escribe las filas aceptadas en `salidas`
+    Retorna (métricas de la carga, filas rechazadas, {tabla hija: resultado})
+    """
+    if engine is None:
+        # Solo salidas de archivos: nada que rechazar
+        metricas_carga = {'filas': len(df)}
+        escritas = escribir_salidas(salidas, df, tabla_sql, archivo, hoja_excel)
+        hijas = {tabla: {'filas': filas, 'rechazadas': 0} for tabla, filas in escritas.items() if tabla != tabla_sql}
+        return metricas_carga, 0, hijas
+    
+    with metricas.medir('carga', hoja=hoja_excel) as medicion:
+        meses_anteriores = []
+        if tabla_sql == TABLA_INTERRUPCIONES and isinstance(cargador, CargadorUpsert):
+            # Antes del MERGE: el mes en que estaban las interrupciones que se van a corregir
+            meses_anteriores = meses_guardados(engine, df[LLAVES_NATURALES[tabla_sql][0]].dropna())
+        metricas_carga = cargador.cargar(df, tabla_sql, engine, if_exists=if_exists)
+        metricas_carga['meses_anteriores'] = meses_anteriores
+        medicion['filas'] = metricas_carga['filas']
+        medicion['bytes'] = int(df.memory_usage().sum())
+    rechazadas = registrar_rechazos(metricas_carga, tabla_sql, archivo, hoja_excel, rechazos)
+    hijas = cargar_tablas_hijas(
+        df, metricas_carga, tabla_sql, engine, if_exists, cargador, archivo, hoja_excel, rechazos
+    )
+    escribir_salidas(salidas, filas_aceptadas(df, metricas_carga), tabla_sql, archivo, hoja_excel)
+    return metricas_carga, rechazadas, hijas
+
+# =============================================================================
+# CARGA POR BLOQUES (MEMORIA ACOTADA)
+# =============================================================================
+def cargar_hoja_por_bloques(libro, hoja_excel, tabla_sql, engine, if_exists='append', tamano_bloque=50000,
+                            cargador=None, rechazos=None, verificador=None, salidas=()):
+    """
+    Carga una hoja en bloques de tamaño fijo: cada bloque se limpia, se mapea y se
+    inserta antes de leer el siguiente, así la memoria no depende del tamaño de la hoja
+    Con `verificador` (integridad.VerificadorIntegridad) cada bloque aporta sus llaves y referencias
+    Cada bloque es una parte nueva en las `salidas` de archivos; sin `engine` solo se escriben ahí
+    Retorna (filas cargadas, filas rechazadas, {tabla hija: resultado}, meses cargados)
+    """
+    cargador = obtener_cargador(cargador)
+    total_filas = 0
+    total_rechazadas = 0
+    hijas = {}
+    meses = set()
+    memoria_leida = memoria_limpia = 0
+    bloques = libro.iterar_bloques(hoja_excel, tamano_bloque)
+    n_bloque = 0
+    
+    with metricas.contexto(hoja=hoja_excel):
+        while True:
+            with metricas.medir('lectura') as medicion:
+                df = next(bloques, None)
+                medicion['filas'] = len(df) if df is not None else 0
+            if df is None:
+                break
+            n_bloque += 1
+            
+            memoria_leida += memoria_hoja(df)
+            normalizados = {}
+            df = limpiar_dataframe(df, hoja_excel, normalizados=normalizados)
+            memoria_limpia += memoria_hoja(df)
+            with metricas.medir('validacion') as medicion:
+                verificar_longitudes(df, hoja_excel, normalizados)
+                if verificador is not None:
+                    verificador.agregar(tabla_sql, df)
+                medicion['filas'] = len(df)
+            
+            # Solo el primer bloque respeta if_exists ('replace' no debe borrar los bloques anteriores)
+            metricas_carga, rechazadas, hijas_bloque = cargar_en_destinos(
+                df, tabla_sql, engine, if_exists if n_bloque == 1 else 'append', cargador,
+                os.path.basename(libro.archivo), hoja_excel, rechazos, salidas
             )
-            logger.info("   ✓ Creada columna 'CódigoDePrimerEquipo'")
+            total_rechazadas += rechazadas
+            sumar_hijas(hijas, hijas_bloque)
+            meses.update(meses_cargados(df, metricas_carga, tabla_sql))
+            
+            total_filas += metricas_carga['filas']
+            logger.info(f"   ✓ Bloque {n_bloque}: {metricas_carga['filas']} filas cargadas (acumulado: {total_filas})")
+    
+    registrar_memoria(memoria_leida, memoria_limpia)
+    return total_filas, total_rechazadas, hijas, sorted(meses)
+
+# =============================================================================
+# CARGA CONCURRENTE Y ATÓMICA DE LAS HOJAS DE UN ARCHIVO
+# =============================================================================
+#
+# Con `conexiones` > 1 las hojas preparadas de un archivo se cargan en un pool de
+# hilos, cada tarea con su propia conexión del pool de SQLAlchemy (la espera es de
+# red y del servidor, no de Python). Con `porciones` > 1 una hoja grande además se
+# parte en porciones contiguas que se insertan a la vez; cada porción carga también
+# sus filas de las tablas hijas. Los resultados se reportan en el orden de tabla_sheet_map
+#
+# Con `atomico` todas las hojas del archivo van en una sola transacción: si una falla
+# se revierte el archivo completo y todas sus hojas quedan pendientes en el manifiesto
+
+# Una porción de menos filas no compensa la conexión extra
+FILAS_MINIMAS_POR_PORCION = 10000
+
+
+def porciones(df, n):
+    """Parte el DataFrame en hasta `n` porciones contiguas de al menos FILAS_MINIMAS_POR_PORCION filas"""
+    n = max(1, min(n, len(df) // FILAS_MINIMAS_POR_PORCION))
+    limites = [len(df) * i // n for i in range(n + 1)]
+    return [df.iloc[inicio:fin] for inicio, fin in zip(limites, limites[1:])]
+
+
+def cargar_porcion(df, tabla_sql, engine, if_exists, cargador, nombre_archivo, hoja_excel, rechazos=None,
+                   salidas=()):
+    """
+    Carga una hoja preparada (o una porción) con sus tablas hijas (ver cargar_en_destinos).
+    `engine` puede ser una conexión ya en transacción (carga atómica) o None (solo
+    salidas de archivos). Retorna {'filas', 'rechazadas', 'hijas', 'meses', 'aceptadas'}
+    (las filas que quedaron en la tabla, ver filas_aceptadas)
+    """
+    # Las variables de contexto de métricas no pasan a los hilos del pool: se fijan aquí
+    with metricas.contexto(archivo=nombre_archivo, hoja=hoja_excel):
+        metricas_carga, rechazadas, hijas = cargar_en_destinos(
+            df, tabla_sql, engine, if_exists, cargador, nombre_archivo, hoja_excel, rechazos, salidas
+        )
+    return {
+        'filas': metricas_carga['filas'],
+        'rechazadas': rechazadas,
+        'hijas': hijas,
+        'meses': meses_cargados(df, metricas_carga, tabla_sql),
+        'aceptadas': filas_aceptadas(df, metricas_carga),
+    }
+
+
+def resultado_hoja(partes):
+    """Suma las porciones cargadas de una hoja en su entrada del diccionario de resultados"""
+    resultado = {
+        'estado': 'éxito',
+        'filas': sum(parte['filas'] for parte in partes),
+        'rechazadas': sum(parte['rechazadas'] for parte in partes),
+    }
+    hijas = {}
+    for parte in partes:
+        sumar_hijas(hijas, parte['hijas'])
+    if hijas:
+        resultado['hijas'] = hijas
+    meses = sorted(set().union(*(parte['meses'] for parte in partes)))
+    if meses:
+        resultado['meses'] = meses
+    return resultado
+
+
+def cargar_hojas(nombre_archivo, preparados, errores, tabla_sheet_map, engine, if_exists='append',
+                 cargador=None, rechazos=None, conexiones=1, porciones_por_tabla=1, salidas=()):
+    """
+    Carga las hojas preparadas de un archivo, en hasta `conexiones` tareas a la vez y con
+    hasta `porciones_por_tabla` porciones por hoja. Una hoja que falla no detiene las demás
+    `max_rechazos` del cargador aplica a cada porción
+    Retorna {"<archivo> - <tabla>": resultado} en el orden de tabla_sheet_map
+    """
+    cargador = obtener_cargador(cargador)
+    if conexiones <= 1 or isinstance(cargador, CargadorUpsert) or if_exists != 'append':
+        # Upsert: dos porciones con la misma llave competirían en el MERGE
+        # 'replace': cada porción borraría las anteriores
+        porciones_por_tabla = 1
     
-    if 'id' in df.columns:
-        df = df.drop(columns=['id'])
-        logger.info("   ✓ Removida columna 'id' (IDENTITY en SQL)")
+    pool = ThreadPoolExecutor(max_workers=conexiones) if conexiones > 1 else None
+    tareas = {}
+    for hoja_excel, tabla_sql in tabla_sheet_map.items():
+        if hoja_excel in errores:
+            continue
+        tareas[hoja_excel] = []
+        for df in porciones(preparados[hoja_excel], porciones_por_tabla):
+            argumentos = (df, tabla_sql, engine, if_exists, cargador, nombre_archivo, hoja_excel, rechazos, salidas)
+            # Sin pool cada hoja se carga al reportarla (mismo orden que la carga secuencial)
+            tareas[hoja_excel].append(pool.submit(cargar_porcion, *argumentos) if pool else argumentos)
+        if len(tareas[hoja_excel]) > 1:
+            logger.info(f"   {hoja_excel}: {len(tareas[hoja_excel])} porciones en paralelo")
     
-    return df
+    resultados = {}
+    try:
+        for hoja_excel, tabla_sql in tabla_sheet_map.items():
+            clave = f"{nombre_archivo} - {tabla_sql}"
+            
+            if hoja_excel in errores:
+                logger.error(f"✗ Error procesando {hoja_excel}: {errores[hoja_excel]}")
+                resultados[clave] = {'estado': 'error', 'mensaje': errores[hoja_excel]}
+                continue
+            
+            try:
+                partes = [
+                    tarea.result() if pool else cargar_porcion(*tarea) for tarea in tareas[hoja_excel]
+                ]
+                logger.info(f"✓ {nombre_archivo}: datos cargados exitosamente a la tabla '{tabla_sql}'")
+                resultados[clave] = resultado_hoja(partes)
+            except Exception as e:
+                logger.error(f"✗ Error cargando {hoja_excel}: {str(e)}")
+                resultados[clave] = {'estado': 'error', 'mensaje': str(e)}
+    finally:
+        if pool:
+            pool.shutdown()
+    
+    return resultados
+
+
+def cargar_archivo_atomico(nombre_archivo, preparados, errores, tabla_sheet_map, engine, if_exists='append',
+                           cargador=None, rechazos=None, salidas=()):
+    """
+    Carga todas las hojas de un archivo en una sola transacción (una conexión, en orden):
+    o quedan todas o ninguna. Cualquier fila rechazada revierte el archivo, porque
+    dentro de la transacción los lotes no se pueden reintentar para aislar filas
+    Las salidas de archivos se escriben solo después de confirmar la transacción
+    Retorna {"<archivo> - <tabla>": resultado}
+    """
+    claves = {hoja_excel: f"{nombre_archivo} - {tabla_sql}" for hoja_excel, tabla_sql in tabla_sheet_map.items()}
+    if errores:
+        for hoja_excel, error in errores.items():
+            logger.error(f"✗ Error procesando {hoja_excel}: {error}")
+        logger.error(f"✗ {nombre_archivo}: no se carga ninguna hoja (carga atómica y hojas con error de lectura)")
+        return {
+            clave: {
+                'estado': 'error',
+                'mensaje': errores.get(hoja_excel, f"No se cargó: hojas con error en el archivo ({', '.join(errores)})"),
+            }
+            for hoja_excel, clave in claves.items()
+        }
+    
+    cargador = copy(obtener_cargador(cargador))
+    cargador.max_rechazos = 0
+    resultados = {}
+    aceptadas = {}
+    hoja_actual = None
+    try:
+        with engine.connect() as conexion, conexion.begin():
+            for hoja_excel, tabla_sql in tabla_sheet_map.items():
+                hoja_actual = hoja_excel
+                parte = cargar_porcion(
+                    preparados[hoja_excel], tabla_sql, conexion, if_exists, cargador, nombre_archivo, hoja_excel
+                )
+                resultados[claves[hoja_excel]] = resultado_hoja([parte])
+                aceptadas[hoja_excel] = parte['aceptadas']
+    except Exception as e:
+        logger.error(f"✗ Error cargando {hoja_actual}: {str(e)}")
+        logger.error(f"✗ {nombre_archivo}: carga atómica revertida, no quedó ninguna hoja del archivo")
+        mensaje = f"Carga del archivo revertida ({hoja_actual}: {str(e)})"
+        return {clave: {'estado': 'error', 'mensaje': mensaje} for clave in claves.values()}
+    
+    logger.info(f"✓ {nombre_archivo}: {len(resultados)} hojas confirmadas en una sola transacción")
+    for hoja_excel, tabla_sql in tabla_sheet_map.items():
+        with metricas.contexto(archivo=nombre_archivo, hoja=hoja_excel):
+            escribir_salidas(salidas, aceptadas[hoja_excel], tabla_sql, nombre_archivo, hoja_excel)
+        logger.info(f"✓ {nombre_archivo}: datos cargados exitosamente a la tabla '{tabla_sql}'")
+    return resultados
+
 # =============================================================================
 # FUNCIÓN PRINCIPAL PARA CARGAR DATOS
 # =============================================================================
-def cargar_excel_a_sql(archivo_excel, tabla_sheet_map, engine, if_exists='append'):
+def cargar_excel_a_sql(archivo_excel, tabla_sheet_map, engine, if_exists='append', motor_excel=None,
+                       tamano_bloque=None, cargador=None, cache=None, rechazos=None, llaves_bd=None,
+                       conexiones=1, porciones_por_tabla=1, atomico=False, salidas=()):
     """
     Lee las hojas del Excel y las carga en las tablas SQL correspondientes
+    El libro se abre una sola vez y todas las hojas se leen sobre el mismo archivo abierto
+    Con `tamano_bloque` cada hoja se lee, limpia y carga por bloques de ese número de filas
+    `cargador` es el nombre de una estrategia de cargadores.CARGADORES (por defecto executemany)
+    `cache` (CacheHojas) evita volver a parsear y limpiar hojas de un libro ya visto
+    Las filas que la base de datos rechaza se aíslan y se guardan en `rechazos`
+    (ver registrar_rechazos); el resto de la hoja se carga
+    Antes de cargar se revisan las referencias entre las hojas del archivo (y con
+    `llaves_bd`, contra las tablas); por bloques la revisión se reporta al final
+    `conexiones`, `porciones_por_tabla` y `atomico` se aplican a las hojas completas
+    (ver cargar_hojas y cargar_archivo_atomico); por bloques la carga es secuencial
+    `salidas` (salidas.SalidaParquet/SalidaCSV) reciben en la misma pasada las filas
+    cargadas; con `engine` None las hojas solo se escriben en esas salidas
     """
     resultados = {}
     nombre_archivo = os.path.basename(archivo_excel)
+    cargador = obtener_cargador(cargador)
     
+    try:
+        if tamano_bloque:
+            libro = LibroExcelPorBloques(archivo_excel)
+            logger.info(f"✓ Libro abierto en modo por bloques ({tamano_bloque} filas por bloque)")
+        else:
+            libro = LibroExcel(archivo_excel, motor=motor_excel, cache=cache)
+            logger.info(f"✓ Libro abierto con motor '{libro.motor}'")
+    except Exception as e:
+        logger.error(f"✗ Error abriendo {nombre_archivo}: {str(e)}")
+        for tabla_sql in tabla_sheet_map.values():
+            resultados[f"{nombre_archivo} - {tabla_sql}"] = {
+                'estado': 'error', 
+                'mensaje': str(e)
+            }
+        return resultados
+    
+    if not tamano_bloque:
+        # Primero se preparan todas las hojas: la integridad entre hojas se revisa antes de cargar
+        preparados = {}
+        errores = {}
+        with libro, metricas.contexto(archivo=nombre_archivo), fechas.fuente(nombre_archivo):
+            for hoja_excel, tabla_sql in tabla_sheet_map.items():
+                logger.info(f"\n{'='*60}")
+                logger.info(f"Archivo: {nombre_archivo}")
+                logger.info(f"Procesando: {hoja_excel} → {tabla_sql}")
+                logger.info(f"{'='*60}")
+                try:
+                    preparados[hoja_excel] = preparar_hoja(libro, hoja_excel)
+                except Exception as e:
+                    errores[hoja_excel] = str(e)
+        
+        return escribir_archivo_preparado(
+            nombre_archivo, preparados, errores, tabla_sheet_map, engine, if_exists, cargador, rechazos, llaves_bd,
+            conexiones, porciones_por_tabla, atomico, salidas
+        )
+    
+    verificador = VerificadorIntegridad(llaves_bd)
     for hoja_excel, tabla_sql in tabla_sheet_map.items():
         try:
             logger.info(f"\n{'='*60}")
@@ -290,44 +807,22 @@ def cargar_excel_a_sql(archivo_excel, tabla_sheet_map, engine, if_exists='append
             logger.info(f"Procesando: {hoja_excel} → {tabla_sql}")
             logger.info(f"{'='*60}")
             
-            # Leer la hoja de Excel
-            df = pd.read_excel(archivo_excel, sheet_name=hoja_excel)
-            logger.info(f"✓ Datos leídos: {len(df)} filas, {len(df.columns)} columnas")
-            logger.info(f"   Columnas originales: {list(df.columns)}")
-            
-            # Limpiar y preparar datos
-            df = limpiar_dataframe(df, hoja_excel)
-            logger.info(f"✓ Datos limpiados: {len(df)} filas válidas")
-            logger.info(f"   Columnas finales para SQL: {list(df.columns)}")
-            
-            # Mostrar primeras filas
-            logger.info("\n   Primeras 3 filas:")
-            for i, row in df.head(3).iterrows():
-                logger.info(f"   {i}: {row.to_dict()}")
-            
-            # Verificar que no haya columnas que excedan límites de SQL
-            for col in df.select_dtypes(include=['object']):
-                max_len = df[col].astype(str).str.len().max()
-                if max_len > 255:
-                    logger.warning(
-                        f"   ⚠️  Columna '{col}' tiene valores hasta {max_len} caracteres "
-                        f"(límite SQL puede ser 255)"
-                    )
-            
-            # Cargar a SQL Server
-            rows_inserted = df.to_sql(
-                name=tabla_sql,
-                con=engine,
-                if_exists=if_exists,
-                index=False,
-                chunksize=500
-            )
+            with metricas.contexto(archivo=nombre_archivo), fechas.fuente(nombre_archivo):
+                filas_cargadas, filas_rechazadas, hijas, meses = cargar_hoja_por_bloques(
+                    libro, hoja_excel, tabla_sql, engine, if_exists, tamano_bloque, cargador, rechazos, verificador,
+                    salidas
+                )
             
             logger.info(f"✓ Datos cargados exitosamente a la tabla '{tabla_sql}'")
             resultados[f"{nombre_archivo} - {tabla_sql}"] = {
                 'estado': 'éxito', 
-                'filas': len(df)
+                'filas': filas_cargadas,
+                'rechazadas': filas_rechazadas
             }
+            if hijas:
+                resultados[f"{nombre_archivo} - {tabla_sql}"]['hijas'] = hijas
+            if meses:
+                resultados[f"{nombre_archivo} - {tabla_sql}"]['meses'] = meses
             
         except Exception as e:
             logger.error(f"✗ Error procesando {hoja_excel}: {str(e)}")
@@ -336,69 +831,658 @@ def cargar_excel_a_sql(archivo_excel, tabla_sheet_map, engine, if_exists='append
                 'mensaje': str(e)
             }
     
+    libro.cerrar()
+    # Por bloques las hojas no están completas en memoria: la revisión queda después de cargar
+    registrar_integridad(verificador.reporte(nombre_archivo), despues_de_cargar=True)
+    incorporar_llaves(llaves_bd, verificador, resultados, nombre_archivo, tabla_sheet_map)
     return resultados
 
 # =============================================================================
-# EJECUTAR EL PROCESO
+# PROCESAMIENTO EN PARALELO DE VARIOS ARCHIVOS
 # =============================================================================
-if __name__ == "__main__":
-    logger.info("="*60)
-    logger.info("INICIO DEL PROCESO DE CARGA MASIVA")
+def preparar_archivo(archivo_excel, hojas, motor_excel=None, cache=None):
+    """
+    Trabajo de cada proceso del pool: abre el libro, lee y limpia todas las hojas
+    Retorna ({hoja: DataFrame}, {hoja: mensaje de error}, [mediciones de métricas])
+    """
+    preparados = {}
+    errores = {}
+    # Descartar mediciones heredadas del proceso padre (fork) o de la tarea anterior
+    metricas.registro.extraer()
+    
+    try:
+        libro = LibroExcel(archivo_excel, motor=motor_excel, cache=cache)
+    except Exception as e:
+        return preparados, {hoja: str(e) for hoja in hojas}, metricas.registro.extraer()
+    
+    with libro, metricas.contexto(archivo=os.path.basename(archivo_excel)), fechas.fuente(archivo_excel):
+        for hoja_excel in hojas:
+            try:
+                preparados[hoja_excel] = preparar_hoja(libro, hoja_excel)
+            except Exception as e:
+                errores[hoja_excel] = str(e)
+    
+    return preparados, errores, metricas.registro.extraer()
+
+
+def escribir_archivo_preparado(nombre_archivo, preparados, errores, tabla_sheet_map, engine,
+                               if_exists='append', cargador=None, rechazos=None, llaves_bd=None,
+                               conexiones=1, porciones_por_tabla=1, atomico=False, salidas=()):
+    """
+    Etapa de escritura: revisa la integridad referencial entre las hojas ya preparadas,
+    las carga (ver cargar_hojas y cargar_archivo_atomico) y arma el diccionario de resultados
+    """
+    verificador = verificar_integridad(nombre_archivo, preparados, tabla_sheet_map, llaves_bd)
+    
+    if atomico:
+        resultados = cargar_archivo_atomico(
+            nombre_archivo, preparados, errores, tabla_sheet_map, engine, if_exists, cargador, rechazos, salidas
+        )
+    else:
+        resultados = cargar_hojas(
+            nombre_archivo, preparados, errores, tabla_sheet_map, engine, if_exists, cargador, rechazos,
+            conexiones, porciones_por_tabla, salidas
+        )
+    
+    incorporar_llaves(llaves_bd, verificador, resultados, nombre_archivo, tabla_sheet_map)
+    return resultados
+
+
+def _inicializar_proceso(columnas_catalogo):
+    """Inicializador de cada proceso del pool: mismo catálogo de columnas que el proceso principal"""
+    usar_catalogo(CatalogoColumnas(columnas=columnas_catalogo))
+
+
+def procesar_en_paralelo(archivos, tabla_sheet_map, engine, workers, if_exists='append', cargador=None,
+                         max_pendientes=None, mapas_por_archivo=None, manifiesto=None, cache=None,
+                         rechazos=None, llaves_bd=None, conexiones=1, porciones_por_tabla=1, atomico=False,
+                         salidas=()):
+    """
+    Lee y limpia los archivos en un pool de `workers` procesos y los carga en este
+    proceso, en el orden original. Como máximo `max_pendientes` archivos (por defecto
+    2 × workers) están en vuelo o esperando escritura, lo que acota la memoria
+    `mapas_por_archivo` permite procesar solo algunas hojas de cada archivo
+    """
+    max_pendientes = max_pendientes or 2 * workers
+    mapas_por_archivo = mapas_por_archivo or {}
+    todos_resultados = {}
+    
+    def enviar(archivo):
+        hojas = list(mapas_por_archivo.get(archivo, tabla_sheet_map))
+        # El motor se elige en este proceso: con spawn (Windows) los hijos no heredan el
+        # motor medido con --medir-motores
+        return archivo, pool.submit(
+            preparar_archivo, str(archivo), hojas, motor_excel=motor_por_defecto(archivo), cache=cache
+        )
+    
+    # Los procesos hijos reciben el catálogo ya leído (no se conectan a la base de datos)
+    columnas_catalogo = mapeador_columnas.catalogo.cargar(mapeador_columnas.tablas)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_proceso,
+                             initargs=(columnas_catalogo,)) as pool:
+        restantes = iter(archivos)
+        pendientes = deque(enviar(archivo) for archivo in islice(restantes, max_pendientes))
+        
+        while pendientes:
+            archivo, futuro = pendientes.popleft()
+            mapa = mapas_por_archivo.get(archivo, tabla_sheet_map)
+            
+            try:
+                preparados, errores, mediciones = futuro.result()
+                metricas.registro.agregar(mediciones)
+            except Exception as e:
+                # El proceso hijo murió o el resultado no se pudo transferir
+                preparados, errores = {}, {hoja: str(e) for hoja in mapa}
+            
+            # Reponer la cola antes de escribir, para que el pool siga trabajando
+            siguiente = next(restantes, None)
+            if siguiente is not None:
+                pendientes.append(enviar(siguiente))
+            
+            logger.info(f"\n{'#'*60}")
+            logger.info(f"CARGANDO ARCHIVO: {archivo.name}")
+            logger.info(f"{'#'*60}")
+            
+            resultados = escribir_archivo_preparado(
+                archivo.name, preparados, errores, mapa, engine, if_exists, cargador, rechazos, llaves_bd,
+                conexiones, porciones_por_tabla, atomico, salidas
+            )
+            if manifiesto is not None:
+                manifiesto.registrar(archivo, mapa, resultados)
+            todos_resultados.update(resultados)
+    
+    return todos_resultados
+
+
+# =============================================================================
+# PIPELINE REUTILIZABLE (PROGRAMADOR DE TAREAS, NOTEBOOKS, PRUEBAS)
+# =============================================================================
+def registrar_resumen(todos_resultados, rechazos=None):
+    """Escribe en el log el resumen de la corrida; retorna (exitosos, errores, filas, rechazadas)"""
+    logger.info("\n" + "="*60)
+    logger.info("RESUMEN GENERAL DEL PROCESO")
     logger.info("="*60)
     
+    exitosos = 0
+    errores = 0
+    total_filas = 0
+    total_rechazadas = 0
+    
+    for clave, resultado in todos_resultados.items():
+        if resultado['estado'] == 'éxito':
+            rechazadas = resultado.get('rechazadas', 0)
+            if rechazadas:
+                logger.warning(f"⚠️  {clave}: {resultado['filas']} filas cargadas, {rechazadas} rechazadas")
+            else:
+                logger.info(f"✓ {clave}: {resultado['filas']} filas cargadas")
+            for tabla_hija, hija in resultado.get('hijas', {}).items():
+                logger.info(f"   ↳ {tabla_hija}: {hija['filas']} filas")
+                total_rechazadas += hija['rechazadas']
+            exitosos += 1
+            total_filas += resultado['filas']
+            total_rechazadas += rechazadas
+        else:
+            logger.error(f"✗ {clave}: ERROR - {resultado['mensaje']}")
+            errores += 1
+    
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Total de operaciones exitosas: {exitosos}")
+    logger.info(f"Total de errores: {errores}")
+    logger.info(f"Total de filas cargadas: {total_filas}")
+    if total_rechazadas:
+        destino = f" (ver {rechazos.descripcion})" if rechazos is not None else ''
+        logger.warning(f"Total de filas rechazadas: {total_rechazadas}{destino}")
+    logger.info(f"{'='*60}")
+    
+    return exitosos, errores, total_filas, total_rechazadas
+
+# =============================================================================
+# ÍNDICE DE TOPOLOGÍA DE LA RED
+# =============================================================================
+def actualizar_indice_topologia(engine, todos_resultados):
+    """
+    Actualiza 'Topologia Red' si en la corrida se cargaron filas de Equipos de maniobras
+    o de Centro MTBT (solo se reescriben los árboles que cambiaron). Retorna el resumen o None
+    """
+    tablas = {EQUIPOS['tabla'], CENTROS['tabla']}
+    cargadas = any(
+        resultado['estado'] == 'éxito' and resultado['filas'] > 0 and clave.rsplit(' - ', 1)[-1] in tablas
+        for clave, resultado in todos_resultados.items()
+    )
+    if not cargadas:
+        return None
+
+    logger.info(f"\nActualizando índice de topología '{TABLA_TOPOLOGIA}'...")
+    try:
+        with metricas.medir('carga', hoja='(topología)') as medicion:
+            resumen = actualizar_topologia(engine)
+            medicion['filas'] = resumen['filas_escritas']
+    except Exception as e:
+        # El índice se puede reconstruir en la próxima corrida: la carga ya terminó
+        logger.error(f"✗ No se pudo actualizar el índice de topología: {str(e)}")
+        return None
+
+    if resumen['arboles_actualizados']:
+        logger.info(
+            f"✓ Topología: {resumen['nodos']} nodos en {resumen['arboles']} árboles; "
+            f"{resumen['arboles_actualizados']} árboles reescritos ({resumen['filas_escritas']} filas)"
+        )
+    else:
+        logger.info(f"✓ Topología sin cambios ({resumen['nodos']} nodos en {resumen['arboles']} árboles)")
+    if resumen['huerfanos']:
+        logger.warning(
+            f"⚠️  Topología: {resumen['huerfanos']} nodos con equipo aguas arriba inexistente "
+            f"(quedan como raíz de su árbol) - ejemplos: {resumen['ejemplos_huerfanos']}"
+        )
+    if resumen['en_ciclos']:
+        logger.warning(
+            f"⚠️  Topología: {resumen['en_ciclos']} nodos en ciclos de equipos aguas arriba "
+            f"(no se incluyen en el índice) - ejemplos: {resumen['ejemplos_ciclos']}"
+        )
+    if resumen['enlaces_multiples']:
+        logger.warning(
+            f"⚠️  Topología: {resumen['enlaces_multiples']} enlaces aguas arriba con más de un código "
+            f"(se usa el primero)"
+        )
+    return resumen
+
+# =============================================================================
+# RESUMEN DE CONFIABILIDAD
+# =============================================================================
+def actualizar_resumen_confiabilidad(engine, todos_resultados, kva=False):
+    """
+    Recalcula en 'Resumen Confiabilidad' los meses de las interrupciones cargadas en la
+    corrida (resultado['meses'] de cada hoja de Interrupciones). Retorna el resumen o None
+    """
+    meses = sorted({
+        mes for resultado in todos_resultados.values()
+        if resultado['estado'] == 'éxito' for mes in resultado.get('meses', [])
+    })
+    if not meses:
+        return None
+
+    logger.info(f"\nActualizando '{TABLA_RESUMEN}' ({len(meses)} meses: {meses[0]} a {meses[-1]})...")
     try:
+        with metricas.medir('carga', hoja='(resumen)') as medicion:
+            resumen = actualizar_resumen(engine, meses, kva=kva)
+            medicion['filas'] = resumen['filas_escritas']
+    except Exception as e:
+        # La actualización se revierte completa: el resumen conserva las cifras anteriores
+        # de esos meses hasta la próxima corrida que los cargue
+        logger.error(f"✗ No se pudo actualizar el resumen de confiabilidad: {str(e)}")
+        return None
+
+    logger.info(
+        f"✓ Resumen de confiabilidad: {resumen['interrupciones']} interrupciones de {resumen['meses']} meses "
+        f"→ {resumen['filas_escritas']} filas ({resumen['filas_borradas']} reemplazadas)"
+    )
+    return resumen
+
+
+class Pipeline:
+    """
+    ETL completo listo para usarse desde otro programa:
+    
+        pipeline = Pipeline(Configuracion.desde_entorno())
+        resultados = pipeline.ejecutar()            # cada corrida reutiliza el mismo engine
+        pipeline.cerrar()
+    
+    El engine se crea en la primera corrida (no al construir el Pipeline) y se comparte,
+    con su pool de conexiones, entre corridas y entre pipelines con la misma configuración
+    Opciones iguales a las de la línea de comandos: `cargador` (nombre en CARGADORES),
+    `modo` ('append' o 'upsert'), `workers`, `bloque`, `usar_cache`, `rechazos` (ruta CSV
+    o 'tabla[:NOMBRE]'), `max_rechazos`, `manifiesto` (ruta del manifiesto) e
+    `integridad_bd` (revisar las referencias también contra las tablas existentes),
+    `topologia` (actualizar el índice 'Topologia Red' al cargar equipos o centros),
+    `resumen` (actualizar 'Resumen Confiabilidad' con los meses cargados), `resumen_kva`
+    (ponderar las interrupciones por el KVA aguas abajo de sus equipos), `conexiones` y
+    `porciones` (hojas y porciones de hoja cargadas a la vez), `atomico` (cada archivo
+    en una sola transacción), `salidas` (['sql', 'parquet[:CARPETA]', 'csv[:CARPETA]'],
+    por defecto solo 'sql'; sin 'sql' no se usa la base de datos, ver salidas.py) y
+    `medir_motores` (medir los motores de lectura sobre el primer archivo; sin medir se
+    usa calamine → openpyxl → xlrd según lo instalado)
+    """
+    
+    def __init__(self, configuracion=None, engine=None, cargador='executemany', modo='append', workers=1,
+                 bloque=None, usar_cache=True, rechazos=None, max_rechazos=MAX_RECHAZOS_POR_DEFECTO,
+                 manifiesto=None, integridad_bd=False, topologia=True, resumen=True, resumen_kva=False,
+                 conexiones=1, porciones=1, atomico=False, salidas=None, medir_motores=False):
+        self.configuracion = configuracion or Configuracion.desde_entorno()
+        self._engine = engine
+        self.cargador = cargador
+        self.modo = modo
+        self.workers = workers
+        self.bloque = bloque
+        self.cache = CacheHojas() if usar_cache else None
+        self.rechazos = rechazos
+        self.max_rechazos = max_rechazos
+        self.manifiesto = manifiesto
+        self.integridad_bd = integridad_bd
+        self.topologia = topologia
+        self.resumen = resumen
+        self.resumen_kva = resumen_kva
+        self.conexiones = conexiones
+        self.porciones = porciones
+        self.atomico = atomico
+        self.salidas = list(salidas) if salidas else ['sql']
+        self.medir_motores = medir_motores
+        self.marca = None
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = self.configuracion.engine()
+        return self._engine
+    
+    def _obtener_cargador(self):
+        # En modo upsert el cargador es fijo: staging + MERGE sobre LLAVES_NATURALES
+        cargador = CargadorUpsert(LLAVES_NATURALES) if self.modo == 'upsert' else obtener_cargador(self.cargador)
+        cargador.max_rechazos = self.max_rechazos
+        return cargador
+    
+    def _destino_rechazos(self):
+        destino = (
+            self.rechazos or os.getenv('ETL_RECHAZOS')
+            or Path(self.configuracion.carpeta_logs) / f"etl_{self.marca}_rechazos.csv"
+        )
+        return crear_destino(destino, self.engine)
+    
+    def _opciones_carga(self):
+        """(conexiones, porciones por tabla, atómico) efectivos para esta corrida"""
+        if self.atomico and not incluye_sql(self.salidas):
+            logger.warning("⚠️  Sin la salida 'sql' no hay transacción; se ignora --atomico")
+            return self.conexiones, self.porciones, False
+        if self.bloque and (self.conexiones > 1 or self.porciones > 1 or self.atomico):
+            logger.warning("⚠️  --bloque carga cada hoja secuencialmente; se ignoran --conexiones, --porciones y --atomico")
+            return 1, 1, False
+        if self.atomico and self.conexiones > 1:
+            # Una transacción es una sola conexión: las hojas van una tras otra
+            logger.warning("⚠️  --atomico carga cada archivo en una sola conexión; se ignora --conexiones")
+            return 1, 1, True
+        disponibles = self.configuracion.pool_size + self.configuracion.max_overflow
+        if self.conexiones > disponibles:
+            logger.warning(
+                f"⚠️  --conexiones {self.conexiones} supera el pool ({disponibles} conexiones): "
+                f"las cargas de más esperan una conexión libre (ver SQL_POOL_SIZE y SQL_MAX_OVERFLOW)"
+            )
+        if self.conexiones > 1:
+            logger.info(f"✓ Carga concurrente: hasta {self.conexiones} conexiones, {self.porciones} porciones por hoja")
+        return self.conexiones, self.porciones, self.atomico
+    
+    def _preparar_catalogo(self, engine):
+        """
+        Lee el catálogo de columnas de la base de datos de este pipeline (una vez por engine)
+        Sin base de datos (solo salidas de archivos) se usan las columnas del esquema local
+        """
+        if mapeador_columnas.catalogo.engine is not engine:
+            usar_catalogo(CatalogoColumnas(engine))
+        mapeador_columnas.catalogo.cargar(list(TABLE_NAMES.values()))
+    
+    def ejecutar(self, carpeta=None, forzar=False, marca=None):
+        """
+        Procesa los archivos Excel de `carpeta` (por defecto la de la configuración)
+        Con `forzar` ignora el manifiesto. Retorna {"<archivo> - <tabla>": resultado}
+        Las métricas de metricas.registro quedan solo con las de esta corrida
+        """
+        carpeta = carpeta or self.configuracion.carpeta_excel
+        if carpeta == CARPETA_EXCEL_POR_DEFECTO:
+            logger.warning("⚠️  Usando ruta de Excel por defecto. Configura EXCEL_FOLDER en .env")
+        self.marca = marca or datetime.now().strftime('%Y%m%d_%H%M%S')
+        metricas.registro.extraer()
+        
+        logger.info("="*60)
+        logger.info("INICIO DEL PROCESO DE CARGA MASIVA")
+        logger.info("="*60)
+        
         # Obtener todos los archivos Excel de la carpeta
-        archivos = obtener_archivos_excel(carpeta_excel)
+        manifiesto = ManifiestoCargas(self.manifiesto, destinos_manifiesto(self.salidas))
+        archivos = obtener_archivos_excel(
+            carpeta,
+            manifiesto=None if forzar else manifiesto,
+            tabla_sheet_map=TABLE_NAMES
+        )
         
         if not archivos:
-            logger.error(f"\n✗ No se encontraron archivos Excel en la carpeta: {carpeta_excel}")
-            exit()
+            logger.info(f"\n✓ No hay archivos Excel nuevos o pendientes en la carpeta: {carpeta}")
+            return {}
+        
+        return self.procesar_archivos(archivos, forzar=forzar, manifiesto=manifiesto)
+    
+    def procesar_archivos(self, archivos, forzar=False, manifiesto=None):
+        """
+        Carga los archivos indicados con el engine, el catálogo y la caché de este pipeline
+        (de cada archivo solo las hojas pendientes según el manifiesto, salvo con `forzar`)
+        Retorna {"<archivo> - <tabla>": resultado}
+        """
+        self.marca = self.marca or datetime.now().strftime('%Y%m%d_%H%M%S')
+        manifiesto = manifiesto or ManifiestoCargas(self.manifiesto, destinos_manifiesto(self.salidas))
+        archivos = [Path(archivo) for archivo in archivos]
+        
+        con_sql, salidas = crear_salidas(self.salidas)
+        engine = self.engine if con_sql else None
+        cargador = self._obtener_cargador()
+        # Sin base de datos no hay filas rechazadas ni llaves existentes
+        rechazos = self._destino_rechazos() if con_sql else None
+        cache = self.cache
+        # Llaves de las tablas existentes: se leen una vez por corrida, al primer archivo
+        llaves_bd = LlavesBaseDatos(engine) if self.integridad_bd and con_sql else None
+        if salidas:
+            destinos = (['SQL Server'] if con_sql else []) + [salida.descripcion for salida in salidas]
+            logger.info(f"✓ Salidas: {', '.join(destinos)}")
+        
+        # Leer el catálogo de columnas antes de repartir trabajo entre procesos
+        self._preparar_catalogo(engine)
+        if cache:
+            logger.info(f"✓ Caché de hojas en {cache.carpeta} (versión de limpieza {version_limpieza()})")
+        
+        # Hojas a procesar por archivo: todas con forzar, si no solo las pendientes
+        mapas_por_archivo = {
+            archivo: TABLE_NAMES if forzar else manifiesto.hojas_pendientes(archivo, TABLE_NAMES)
+            for archivo in archivos
+        }
+        archivos = [archivo for archivo in archivos if mapas_por_archivo[archivo]]
+        if not archivos:
+            logger.info("✓ Los archivos ya fueron cargados según el manifiesto - no hay nada que hacer")
+            return {}
         
         logger.info(f"\n✓ Se encontraron {len(archivos)} archivo(s) Excel:")
         for idx, archivo in enumerate(archivos, 1):
             logger.info(f"  {idx}. {archivo.name}")
         
+        # Medir los motores parsea el primer libro una vez con cada motor: solo a pedido
+        if self.medir_motores and len(archivos) > 1 and not os.getenv('EXCEL_ENGINE'):
+            logger.info("\nMidiendo motores de lectura de Excel...")
+            seleccionar_motor(archivos[0], hojas=list(TABLE_NAMES))
+        
         # Procesar cada archivo
         todos_resultados = {}
         
-        for archivo in archivos:
-            logger.info(f"\n{'#'*60}")
-            logger.info(f"PROCESANDO ARCHIVO: {archivo.name}")
-            logger.info(f"{'#'*60}")
-            
-            # Ejecutar la carga para este archivo
-            resultados = cargar_excel_a_sql(
-                archivo_excel=str(archivo),
+        if self.workers > 1 and self.bloque:
+            logger.warning("⚠️  --bloque ya acota la memoria procesando secuencialmente; se ignora --workers")
+        conexiones, porciones_por_tabla, atomico = self._opciones_carga()
+        
+        if self.workers > 1 and not self.bloque:
+            logger.info(f"\nProcesando en paralelo con {self.workers} procesos...")
+            todos_resultados = procesar_en_paralelo(
+                archivos,
                 tabla_sheet_map=TABLE_NAMES,
                 engine=engine,
-                if_exists='append'  # Cambiar a 'replace' para reemplazar datos existentes
+                workers=self.workers,
+                if_exists='append',
+                cargador=cargador,
+                mapas_por_archivo=mapas_por_archivo,
+                manifiesto=manifiesto,
+                cache=cache,
+                rechazos=rechazos,
+                llaves_bd=llaves_bd,
+                conexiones=conexiones,
+                porciones_por_tabla=porciones_por_tabla,
+                atomico=atomico,
+                salidas=salidas
             )
+        else:
+            for archivo in archivos:
+                logger.info(f"\n{'#'*60}")
+                logger.info(f"PROCESANDO ARCHIVO: {archivo.name}")
+                logger.info(f"{'#'*60}")
             
-            todos_resultados.update(resultados)
-        
-        # Resumen final
-        logger.info("\n" + "="*60)
-        logger.info("RESUMEN GENERAL DEL PROCESO")
-        logger.info("="*60)
-        
-        exitosos = 0
-        errores = 0
-        total_filas = 0
-        
-        for clave, resultado in todos_resultados.items():
-            if resultado['estado'] == 'éxito':
-                logger.info(f"✓ {clave}: {resultado['filas']} filas cargadas")
-                exitosos += 1
-                total_filas += resultado['filas']
-            else:
-                logger.error(f"✗ {clave}: ERROR - {resultado['mensaje']}")
-                errores += 1
+                # Ejecutar la carga para este archivo
+                resultados = cargar_excel_a_sql(
+                    archivo_excel=str(archivo),
+                    tabla_sheet_map=mapas_por_archivo[archivo],
+                    engine=engine,
+                    if_exists='append',  # Cambiar a 'replace' para reemplazar datos existentes
+                    tamano_bloque=self.bloque,
+                    cargador=cargador,
+                    cache=cache,
+                    rechazos=rechazos,
+                    llaves_bd=llaves_bd,
+                    conexiones=conexiones,
+                    porciones_por_tabla=porciones_por_tabla,
+                    atomico=atomico,
+                    salidas=salidas
+                )
+                manifiesto.registrar(archivo, mapas_por_archivo[archivo], resultados)
+            
+                todos_resultados.update(resultados)
         
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Total de operaciones exitosas: {exitosos}")
-        logger.info(f"Total de errores: {errores}")
-        logger.info(f"Total de filas cargadas: {total_filas}")
-        logger.info(f"{'='*60}")
+        registrar_resumen(todos_resultados, rechazos)
+        if not con_sql and (self.topologia or self.resumen):
+            # Topología y resumen se calculan sobre las tablas de la base de datos
+            logger.info(f"\nSin la salida 'sql': no se actualizan '{TABLA_TOPOLOGIA}' ni '{TABLA_RESUMEN}'")
+        if self.topologia and con_sql:
+            actualizar_indice_topologia(engine, todos_resultados)
+        if self.resumen and con_sql:
+            # Después de la topología: la ponderación por KVA usa el índice ya actualizado
+            actualizar_resumen_confiabilidad(engine, todos_resultados, self.resumen_kva)
+        metricas.registro.registrar_resumen()
+        return todos_resultados
+    
+    def cerrar(self):
+        """Cierra las conexiones abiertas del pool (el engine se puede volver a usar después)"""
+        if self._engine is not None:
+            self._engine.dispose()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+# =============================================================================
+# EJECUTAR EL PROCESO
+# =============================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL de datos regulatorios de sistemas aislados")
+    parser.add_argument(
+        '--bloque', type=int, default=None, metavar='FILAS',
+        help="Lee, limpia y carga cada hoja en bloques de FILAS filas (memoria acotada para hojas muy grandes)"
+    )
+    parser.add_argument(
+        '--cargador', choices=list(CARGADORES), default='executemany',
+        help="Estrategia de inserción en SQL Server (por defecto: executemany con fast_executemany)"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1, metavar='N',
+        help="Lee y limpia los archivos en N procesos en paralelo (la carga a SQL se hace en este proceso)"
+    )
+    parser.add_argument(
+        '--manifiesto', default=None, metavar='RUTA',
+        help="Manifiesto de cargas (por defecto ETL_MANIFIESTO o manifiesto_cargas.json)"
+    )
+    parser.add_argument(
+        '--forzar', action='store_true',
+        help="Procesa todos los archivos aunque el manifiesto indique que ya fueron cargados"
+    )
+    parser.add_argument(
+        '--modo', choices=['append', 'upsert'], default='append',
+        help="append: agrega filas (por defecto); upsert: staging + MERGE por llave natural, "
+             "sin duplicar filas ya cargadas"
+    )
+    parser.add_argument(
+        '--rechazos', default=None, metavar='DESTINO',
+        help="Dónde guardar las filas que la base de datos rechaza: ruta de un CSV (por defecto "
+             "logs/etl_*_rechazos.csv, o ETL_RECHAZOS) o 'tabla[:NOMBRE]' (por defecto etl_rechazos)"
+    )
+    parser.add_argument(
+        '--max-rechazos', type=int, default=MAX_RECHAZOS_POR_DEFECTO, metavar='N',
+        help="Filas rechazadas por hoja (por bloque con --bloque, por porción con --porciones) a partir de las cuales la hoja falla "
+             f"(por defecto {MAX_RECHAZOS_POR_DEFECTO}; 0 = cualquier error hace fallar la hoja completa)"
+    )
+    parser.add_argument(
+        '--integridad-bd', action='store_true',
+        help="Revisa los códigos de equipo también contra las llaves que ya están en las tablas "
+             "(se leen una vez por corrida); sin esta opción solo contra las hojas del mismo archivo"
+    )
+    parser.add_argument(
+        '--sin-topologia', action='store_true',
+        help=f"No actualiza el índice de topología '{TABLA_TOPOLOGIA}' después de cargar equipos o centros"
+    )
+    parser.add_argument(
+        '--sin-resumen', action='store_true',
+        help=f"No actualiza '{TABLA_RESUMEN}' (agregados de Interrupciones por mes) después de cargar"
+    )
+    parser.add_argument(
+        '--resumen-kva', action='store_true',
+        help="Pondera cada interrupción del resumen por el KVA aguas abajo de sus equipos"
+    )
+    parser.add_argument(
+        '--conexiones', type=int, default=1, metavar='N',
+        help="Carga hasta N hojas de cada archivo a la vez, cada una con su conexión del pool (por defecto 1)"
+    )
+    parser.add_argument(
+        '--porciones', type=int, default=1, metavar='N',
+        help="Con --conexiones: parte cada hoja grande en hasta N porciones que se cargan a la vez "
+             f"(mínimo {FILAS_MINIMAS_POR_PORCION} filas por porción; no aplica en modo upsert)"
+    )
+    parser.add_argument(
+        '--atomico', action='store_true',
+        help="Carga cada archivo en una sola transacción: si una hoja falla o una fila es rechazada "
+             "se revierte el archivo completo"
+    )
+    parser.add_argument(
+        '--medir-motores', action='store_true',
+        help="Mide los motores de lectura instalados sobre el primer archivo y usa el más rápido "
+             "(por defecto calamine → openpyxl → xlrd según lo instalado, o EXCEL_ENGINE)"
+    )
+    parser.add_argument(
+        '--salida', action='append', default=None, metavar='DESTINO',
+        help="Dónde escribir las hojas limpias (se puede repetir): 'sql' (SQL Server, por defecto), "
+             "'parquet[:CARPETA]' o 'csv[:CARPETA]' (por defecto salidas/parquet y salidas/csv, "
+             "particionados por tabla y mes). Sin 'sql' no se usa la base de datos"
+    )
+    parser.add_argument(
+        '--vigilar', action='store_true',
+        help="Servicio continuo: carga lo pendiente y luego cada libro nuevo o modificado que llegue "
+             "a EXCEL_FOLDER, con el mismo engine y pool de conexiones (Ctrl+C o SIGTERM para detener)"
+    )
+    parser.add_argument(
+        '--espera', type=float, default=ESPERA_POR_DEFECTO, metavar='SEG',
+        help=f"Con --vigilar: segundos sin cambios antes de cargar un archivo (por defecto {ESPERA_POR_DEFECTO:g})"
+    )
+    parser.add_argument(
+        '--intervalo', type=float, default=INTERVALO_SONDEO_POR_DEFECTO, metavar='SEG',
+        help="Con --vigilar y sin watchdog instalado: segundos entre revisiones de la carpeta "
+             f"(por defecto {INTERVALO_SONDEO_POR_DEFECTO:g})"
+    )
+    parser.add_argument(
+        '--sin-cache', action='store_true',
+        help="No usa la caché de hojas en Parquet (.cache/hojas, ver ETL_CACHE_DIR y ETL_CACHE_MAX_MB)"
+    )
+    parser.add_argument(
+        '--debug', action='store_true',
+        help="Log detallado: columnas, mapeos y primeras filas de cada hoja"
+    )
+    parser.add_argument(
+        '--perfil', action='store_true',
+        help="Perfila la corrida con cProfile (logs/etl_*.prof)"
+    )
+    parser.add_argument(
+        '--memoria', action='store_true',
+        help="Registra el pico de memoria por etapa y una instantánea de tracemalloc (logs/etl_*_memoria.txt)"
+    )
+    args = parser.parse_args()
+    
+    configuracion = Configuracion.desde_entorno()
+    if incluye_sql(args.salida):
+        configuracion.validar()
+    log_file, timestamp = configurar_logging(
+        configuracion.carpeta_logs, logging.DEBUG if args.debug else logging.INFO
+    )
+    log_dir = log_file.parent
+    
+    if args.memoria:
+        metricas.registro.activar_memoria()
+    perfilador = cProfile.Profile() if args.perfil else None
+    if perfilador:
+        perfilador.enable()
+    
+    pipeline = Pipeline(
+        configuracion,
+        cargador=args.cargador,
+        modo=args.modo,
+        workers=args.workers,
+        bloque=args.bloque,
+        usar_cache=not args.sin_cache,
+        rechazos=args.rechazos,
+        max_rechazos=args.max_rechazos,
+        manifiesto=args.manifiesto,
+        integridad_bd=args.integridad_bd,
+        topologia=not args.sin_topologia,
+        resumen=not args.sin_resumen,
+        resumen_kva=args.resumen_kva,
+        conexiones=args.conexiones,
+        porciones=args.porciones,
+        atomico=args.atomico,
+        salidas=args.salida,
+        medir_motores=args.medir_motores
+    )
+    
+    try:
+        if args.vigilar:
+            VigilanteCarpeta(pipeline, espera=args.espera, intervalo=args.intervalo).ejecutar()
+        else:
+            pipeline.ejecutar(forzar=args.forzar, marca=timestamp)
         
         logger.info("\n¡Proceso completado!")
         logger.info(f"Log guardado en: {log_file}")
@@ -407,5 +1491,18 @@ if __name__ == "__main__":
         logger.error(f"\n✗ Error general en el proceso: {str(e)}")
     
     finally:
-        engine.dispose()
-        logger.info("\nConexión cerrada.")
\ No newline at end of file
+        pipeline.cerrar()
+        logger.info("\nConexión cerrada.")
+        
+        # Reporte de métricas junto al log (JSON + CSV)
+        if metricas.registro.mediciones:
+            ruta_json, ruta_csv = metricas.registro.escribir_reporte(log_dir / f"etl_{timestamp}_metricas")
+            logger.info(f"Métricas guardadas en: {ruta_json} y {ruta_csv}")
+        if args.memoria:
+            ruta_memoria = metricas.registro.escribir_instantanea_memoria(log_dir / f"etl_{timestamp}_memoria.txt")
+            logger.info(f"Instantánea de memoria guardada en: {ruta_memoria}")
+        if perfilador:
+            perfilador.disable()
+            ruta_perfil = log_dir / f"etl_{timestamp}.prof"
+            perfilador.dump_stats(ruta_perfil)
+            logger.info(f"Perfil guardado en: {ruta_perfil}")
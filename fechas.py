@@ -0,0 +1,293 @@
+import re
+import logging
+from pathlib import Path
+from datetime import date, datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# PARSEO DE FECHAS CON DETECCIÓN DE FORMATO
+# =============================================================================
+#
+# pd.to_datetime sin formato infiere el formato elemento por elemento cuando la
+# columna mezcla textos, y eso domina el tiempo de limpieza de Interrupciones.
+# Aquí cada columna se resuelve por caminos vectorizados:
+#
+#   1. Celdas que ya son fecha/hora (Excel las entrega como datetime): sin parseo
+#   2. Números de serie de Excel (45123.5 → 2023-07-16 12:00): aritmética
+#   3. Textos: se detectan los formatos en una muestra y se parsea cada formato
+#      de una vez sobre toda la columna
+#
+# Los formatos detectados se guardan por fuente (plantillas del mismo origen, sin
+# importar el mes) y columna, así los archivos siguientes no vuelven a detectar.
+# Las celdas con valor que no se pudieron convertir se reportan, no se anulan en silencio
+
+# Formatos que se prueban al detectar (día antes que mes: plantillas de Honduras)
+FORMATOS_CANDIDATOS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%Y-%m-%dT%H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %I:%M %p',
+    '%d/%m/%Y',
+    '%d/%m/%y %H:%M',
+    '%d/%m/%y',
+    '%d-%m-%Y %H:%M',
+    '%d-%m-%Y',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d',
+]
+
+# Número de serie de Excel: días desde 1899-12-30 (1 = 1900-01-01, 2958465 = 9999-12-31)
+ORIGEN_EXCEL = '1899-12-30'
+SERIAL_MINIMO = 1
+SERIAL_MAXIMO = 2958465
+
+TAMANO_MUESTRA = 200
+
+_TIPOS_FECHA = (datetime, date, pd.Timestamp, np.datetime64)
+
+_NUMEROS = re.compile(r'\d+')
+# Abreviaturas que reconoce la inferencia de pandas (dateutil) para el mes en palabra
+_MESES_INGLES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+_MESES = [
+    'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+    'septiembre', 'setiembre', 'octubre', 'noviembre', 'diciembre',
+]
+_NUMERO_MES = dict(zip(_MESES, [1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 10, 11, 12]))
+
+# (fuente, columna) → formatos detectados, en orden de frecuencia
+_formatos_por_fuente = {}
+
+_fuente_actual = ContextVar('fuente_fechas', default=None)
+
+
+def clave_fuente(nombre_archivo):
+    """
+    Identifica el origen de un libro sin el mes ni el año, para compartir formatos
+    entre plantillas mensuales: 'Plantilla_RECO_AGOSTO_2025.xlsx' → 'plantilla_reco'
+    """
+    nombre = Path(str(nombre_archivo)).stem.lower()
+    nombre = re.sub(r'\b(' + '|'.join(_MESES) + r')\b', ' ', nombre.replace('_', ' '))
+    nombre = re.sub(r'\d+', ' ', nombre)
+    return '_'.join(nombre.split())
+
+
+def periodo_archivo(nombre_archivo):
+    """
+    Periodo que reporta un libro según su nombre: 'Plantilla_RECO_AGOSTO_2025.xlsx' →
+    '2025-08', 'Plantilla_AGOSTO.xlsx' → 'agosto' (sin año); sin mes, el nombre del libro
+    """
+    nombre = Path(str(nombre_archivo)).stem
+    palabras = re.split(r'[\s_\-.]+', nombre.lower())
+    meses = [palabra for palabra in palabras if palabra in _MESES]
+    if not meses:
+        return nombre
+    numero = _NUMERO_MES[meses[-1]]
+    anios = re.findall(r'(?<!\d)(20\d{2})(?!\d)', nombre)
+    return f"{anios[-1]}-{numero:02d}" if anios else meses[-1]
+
+
+@contextmanager
+def fuente(nombre_archivo):
+    """Fija el libro en proceso: las columnas de fecha usan (y guardan) los formatos de su fuente"""
+    token = _fuente_actual.set(clave_fuente(nombre_archivo) if nombre_archivo else None)
+    try:
+        yield
+    finally:
+        _fuente_actual.reset(token)
+
+
+def formatos_conocidos(columna, fuente_libro=None):
+    """Formatos ya detectados para la columna en la fuente (o en la fuente en proceso)"""
+    return list(_formatos_por_fuente.get((fuente_libro or _fuente_actual.get(), columna), []))
+
+
+def detectar_formatos(textos, excluir=()):
+    """
+    Detecta los formatos presentes en una muestra de valores distintos: en cada
+    vuelta elige el candidato que convierte más valores restantes
+    """
+    restantes = pd.Series(pd.unique(textos)[:TAMANO_MUESTRA], dtype=object)
+    formatos = []
+    while len(restantes):
+        mejor, mejor_aciertos = None, None
+        for formato in FORMATOS_CANDIDATOS:
+            if formato in formatos or formato in excluir:
+                continue
+            aciertos = pd.to_datetime(restantes, format=formato, errors='coerce').notna()
+            if aciertos.any() and (mejor is None or aciertos.sum() > mejor_aciertos.sum()):
+                mejor, mejor_aciertos = formato, aciertos
+        if mejor is None:
+            break
+        formatos.append(mejor)
+        restantes = restantes[~mejor_aciertos.to_numpy()]
+    return formatos
+
+
+def serial_a_fecha(numeros):
+    """Números de serie de Excel → datetime64 (fuera de rango → NaT), redondeado al segundo"""
+    numeros = pd.to_numeric(numeros, errors='coerce').astype(float)
+    validos = numeros.between(SERIAL_MINIMO, SERIAL_MAXIMO)
+    return pd.to_datetime(numeros.where(validos), unit='D', origin=ORIGEN_EXCEL).dt.round('s')
+
+
+def fecha_coincide_con_texto(texto, fecha):
+    """
+    True si el texto escribe la fecha en orden día-mes-año o año-mes-día (con el mes en
+    número o en palabra). La inferencia de pandas intercambia campos para que un texto
+    inválido encaje ('2025-13-01' → 13 de enero): esos resultados se descartan
+    """
+    numeros = [int(numero) for numero in _NUMEROS.findall(texto)]
+
+    def es_anio(numero):
+        return numero in (fecha.year, fecha.year % 100)
+
+    if len(numeros) >= 3:
+        primero, segundo, tercero = numeros[:3]
+        if (primero, segundo) == (fecha.day, fecha.month) and es_anio(tercero):
+            return True
+        if primero == fecha.year and (segundo, tercero) == (fecha.month, fecha.day):
+            return True
+    # Mes en palabra ('16-Jul-2025', 'Jul 16, 2025'): los números son el día y el año
+    if _MESES_INGLES[fecha.month - 1] in texto.lower() and len(numeros) >= 2:
+        primero, segundo = numeros[:2]
+        return (primero == fecha.day and es_anio(segundo)) or (primero == fecha.year and segundo == fecha.day)
+    return False
+
+
+def _aplicar_formatos(pendientes, formatos, resultado):
+    """Parsea con cada formato (vectorizado) y retorna los textos que no encajaron en ninguno"""
+    for formato in formatos:
+        if not len(pendientes):
+            break
+        fechas = pd.to_datetime(pendientes, format=formato, errors='coerce')
+        convertidas = fechas.notna()
+        resultado[convertidas[convertidas].index] = fechas[convertidas]
+        pendientes = pendientes[~convertidas]
+    return pendientes
+
+
+def _parsear_textos(textos, columna, tokens_nulos=()):
+    """
+    Parsea textos con los formatos conocidos de la fuente, detectando los que falten.
+    Retorna (fechas, tokens): `tokens` marca los textos que son un token de nulo
+    """
+    fuente_libro = _fuente_actual.get()
+    clave = (fuente_libro, columna)
+    formatos = _formatos_por_fuente.get(clave) or []
+    resultado = pd.Series(pd.NaT, index=textos.index, dtype='datetime64[ns]')
+
+    if not formatos:
+        # Primera vez que se ve la columna en esta fuente: detectar sobre una muestra
+        formatos = detectar_formatos(textos.iloc[:TAMANO_MUESTRA * 10])
+    pendientes = _aplicar_formatos(textos, formatos, resultado)
+
+    # Lo que queda suele ser poco: espacios sobrantes, tokens de nulo, números de
+    # serie escritos como texto, formatos que no estaban en la muestra o basura
+    tokens = pd.Series(False, index=textos.index)
+    if len(pendientes):
+        pendientes = pendientes.str.strip()
+        es_token = pendientes.isin(tokens_nulos)
+        tokens[es_token[es_token].index] = True
+        pendientes = pendientes[~es_token]
+
+        numeros = pd.to_numeric(pendientes, errors='coerce')
+        seriales = serial_a_fecha(numeros[numeros.notna()])
+        resultado[seriales.index] = seriales
+        pendientes = _aplicar_formatos(pendientes[numeros.isna()], formatos, resultado)
+
+    if len(pendientes):
+        nuevos = detectar_formatos(pendientes, excluir=formatos)
+        pendientes = _aplicar_formatos(pendientes, nuevos, resultado)
+        formatos = formatos + nuevos
+
+    if _formatos_por_fuente.get(clave) != formatos:
+        _formatos_por_fuente[clave] = formatos
+        logger.debug(f"   Formatos de fecha para '{columna}' ({fuente_libro}): {formatos}")
+
+    if len(pendientes):
+        # Último recurso solo para los valores distintos que no encajan en ningún formato.
+        # Solo se acepta lo que el texto escribe tal cual (sin campos intercambiados ni zona
+        # horaria); el resto queda como celda no convertida y se reporta
+        unicos = pd.Series(pd.unique(pendientes), dtype=object)
+        inferidas = pd.to_datetime(unicos, format='mixed', dayfirst=True, errors='coerce')
+        aceptadas = {
+            texto: fecha for texto, fecha in zip(unicos, inferidas)
+            if pd.notna(fecha) and fecha.tzinfo is None and fecha_coincide_con_texto(texto, fecha)
+        }
+        fechas = pendientes.map(aceptadas)
+        convertidas = fechas.notna()
+        resultado[convertidas[convertidas].index] = pd.to_datetime(fechas[convertidas])
+
+    return resultado, tokens
+
+
+def _clasificar_celdas(valores):
+    """Máscaras (es fecha/hora, es número) de una columna object, sin recorrerla si es homogénea"""
+    tipo = pd.api.types.infer_dtype(valores, skipna=True)
+    todas = pd.Series(True, index=valores.index)
+    ninguna = pd.Series(False, index=valores.index)
+    if tipo == 'string':
+        return ninguna, ninguna
+    if tipo in ('datetime', 'datetime64', 'date'):
+        return todas, ninguna
+    if tipo in ('integer', 'floating', 'mixed-integer-float', 'decimal'):
+        return ninguna, todas
+
+    # Columna mezclada: clasificar por tipo (una decisión por tipo distinto, no por celda)
+    tipos = valores.map(type)
+    clases = {t: (issubclass(t, _TIPOS_FECHA),
+                  issubclass(t, (int, float, np.number)) and not issubclass(t, (bool, np.bool_)))
+              for t in tipos.unique()}
+    es_fecha = tipos.map({t: clase[0] for t, clase in clases.items()}).astype(bool)
+    es_numero = tipos.map({t: clase[1] for t, clase in clases.items()}).astype(bool)
+    return es_fecha, es_numero
+
+
+def parsear_fechas(serie, columna=None, tokens_nulos=()):
+    """
+    Convierte una columna a datetime64. Retorna (fechas, fallidas): `fallidas` marca
+    las celdas con valor (que no son un token de nulo) que no se pudieron convertir
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, pd.Series(False, index=serie.index)
+
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        fechas = serial_a_fecha(serie)
+        return fechas, serie.notna() & fechas.isna()
+
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    fallidas = serie.notna()
+    valores = serie[fallidas]
+    es_fecha, es_numero = _clasificar_celdas(valores)
+
+    # 1. Celdas que ya son fecha/hora: sin parseo
+    if es_fecha.any():
+        resultado[es_fecha[es_fecha].index] = pd.to_datetime(valores[es_fecha], errors='coerce')
+
+    # 2. Números de serie de Excel
+    if es_numero.any():
+        resultado[es_numero[es_numero].index] = serial_a_fecha(valores[es_numero])
+
+    # 3. Textos: formatos detectados por fuente, parseados de forma vectorizada
+    es_texto = ~es_fecha & ~es_numero
+    if es_texto.any():
+        textos = valores[es_texto]
+        if not es_texto.all() or pd.api.types.infer_dtype(textos, skipna=True) != 'string':
+            textos = textos.astype(str)
+        fechas, tokens = _parsear_textos(textos, columna, tokens_nulos)
+        resultado[textos.index] = fechas
+        fallidas[tokens[tokens].index] = False
+
+    fallidas &= resultado.isna()
+    return resultado, fallidas
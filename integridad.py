@@ -0,0 +1,256 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from esquemas import ESQUEMAS_TABLAS, llaves_naturales, referencias, separar_codigos
+from perfilador import MAX_EJEMPLOS, MAX_FILAS_REPORTADAS, fila_excel
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# INTEGRIDAD REFERENCIAL ENTRE HOJAS (CONJUNTOS HASH EN MEMORIA)
+# =============================================================================
+#
+# Los códigos de equipo de Interrupciones y los equipos aguas arriba de Centro MTBT
+# y de Equipos de maniobras deben existir en Equipos de maniobras (columnas con
+# 'referencia' en esquemas.ESQUEMAS_TABLAS). En lugar de buscar huérfanos después
+# con JOINs sobre columnas varchar sin índice, antes de cargar cada archivo se arma
+# un conjunto hash con las llaves de sus hojas y se revisa cada referencia contra él:
+#
+#   llaves:      tabla → {llave}                     (una pasada por hoja)
+#   referencias: (tabla, columna) → {código: filas}  (una pasada por hoja)
+#   huérfanos  = códigos referenciados que no están en las llaves   (O(n))
+#
+# Con LlavesBaseDatos las llaves que ya están en las tablas se leen una sola vez por
+# corrida y también cuentan: un código cargado en un archivo anterior no es huérfano.
+# Los códigos se comparan sin distinguir mayúsculas, como la intercalación de SQL Server
+
+
+def _normalizar(codigos):
+    """Códigos en mayúsculas (las hojas ya vienen sin espacios sobrantes de limpiar_dataframe)"""
+    if isinstance(codigos.dtype, pd.StringDtype):
+        # string[pyarrow]: upper en Arrow, sin pasar cada código a un objeto de Python
+        return codigos.str.upper()
+    return codigos.astype(str).str.upper()
+
+
+class ReporteIntegridad:
+    """Huérfanos y llaves repetidas de un archivo, con ejemplos y filas de Excel"""
+
+    def __init__(self, archivo=None):
+        self.archivo = archivo
+        self.huerfanos = {}      # (tabla, columna) → {'referencia', 'codigos', 'filas', 'ejemplos', 'filas_excel'}
+        self.duplicadas = {}     # tabla → {'llave', 'repetidas', 'ejemplos', 'filas_excel'}
+        self.existentes = {}     # tabla → llaves del archivo que ya están en la base de datos
+        self.omitidas = []       # referencias sin la tabla referida en el archivo ni en la base de datos
+
+    @property
+    def total_huerfanos(self):
+        return sum(huerfano['codigos'] for huerfano in self.huerfanos.values())
+
+    def advertencias(self):
+        """Hallazgos como mensajes de texto"""
+        mensajes = []
+        for (tabla, columna), huerfano in self.huerfanos.items():
+            filas = huerfano['filas_excel']
+            sufijo = f" (y {len(filas) - MAX_FILAS_REPORTADAS} más)" if len(filas) > MAX_FILAS_REPORTADAS else ''
+            mensajes.append(
+                f"{tabla}.'{columna}': {huerfano['codigos']} códigos en {huerfano['filas']} filas no existen "
+                f"en {huerfano['referencia']} - ejemplos: {huerfano['ejemplos']}, "
+                f"filas Excel: {filas[:MAX_FILAS_REPORTADAS]}{sufijo}"
+            )
+        for tabla, duplicada in self.duplicadas.items():
+            mensajes.append(
+                f"{tabla}.'{duplicada['llave']}': {duplicada['repetidas']} llaves repetidas en el archivo "
+                f"- ejemplos: {duplicada['ejemplos']}, filas Excel: {duplicada['filas_excel'][:MAX_FILAS_REPORTADAS]}"
+            )
+        for tabla, existentes in self.existentes.items():
+            mensajes.append(
+                f"{tabla}: {existentes} llaves ya están en la base de datos "
+                f"(append las duplica, el modo upsert las actualiza)"
+            )
+        return mensajes
+
+    def como_dict(self):
+        return {
+            'archivo': self.archivo,
+            'huerfanos': {f"{tabla}.{columna}": huerfano for (tabla, columna), huerfano in self.huerfanos.items()},
+            'duplicadas': self.duplicadas,
+            'existentes': self.existentes,
+            'omitidas': self.omitidas,
+            'advertencias': self.advertencias(),
+        }
+
+
+class LlavesBaseDatos:
+    """
+    Llaves que ya están en las tablas de la base de datos: cada columna se lee una
+    sola vez (SELECT DISTINCT) y después se le agregan las llaves de los archivos
+    que se van cargando en la corrida
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._llaves = {}
+
+    def llaves(self, tabla, columna):
+        """Conjunto de llaves (normalizadas) de tabla.columna; vacío si la tabla no existe"""
+        clave = (tabla, columna)
+        if clave not in self._llaves:
+            from sqlalchemy import inspect, text
+
+            llaves = set()
+            if inspect(self.engine).has_table(tabla):
+                preparer = self.engine.dialect.identifier_preparer
+                with self.engine.connect() as conexion:
+                    valores = conexion.execute(text(
+                        f"SELECT DISTINCT {preparer.quote(columna)} FROM {preparer.quote(tabla)} "
+                        f"WHERE {preparer.quote(columna)} IS NOT NULL"
+                    )).scalars().all()
+                llaves = set(_normalizar(pd.Series(valores, dtype=object).astype(str).str.strip()))
+                logger.info(f"   ✓ {len(llaves)} llaves de '{tabla}.{columna}' leídas de la base de datos")
+            self._llaves[clave] = llaves
+        return self._llaves[clave]
+
+    def incorporar(self, verificador, tablas=None):
+        """Agrega las llaves de las hojas ya cargadas de un archivo (solo columnas ya leídas)"""
+        for tabla, llaves in verificador.llaves.items():
+            if tablas is not None and tabla not in tablas:
+                continue
+            for columna in llaves_naturales(tabla):
+                if (tabla, columna) in self._llaves:
+                    self._llaves[(tabla, columna)] |= llaves
+
+
+class VerificadorIntegridad:
+    """
+    Acumula las llaves y los códigos referenciados de las hojas de un archivo (completas
+    o por bloques) y al final los cruza. La memoria depende de los códigos distintos,
+    no del número de filas
+
+        verificador = VerificadorIntegridad(llaves_bd)
+        verificador.agregar('Equipos de maniobras', df_equipos)
+        verificador.agregar('Interrupciones', df_interrupciones)
+        reporte = verificador.reporte('Plantilla_AGOSTO.xlsx')
+    """
+
+    def __init__(self, llaves_bd=None):
+        self.llaves_bd = llaves_bd
+        self.llaves = {}         # tabla → {llave}
+        self._repetidas = {}     # tabla → {llave repetida: primera fila donde se repite}
+        self._existentes = {}    # tabla → llaves que ya estaban en la base de datos
+        self._referencias = {}   # (tabla, columna) → {código: [filas, primera fila]}
+
+    def agregar(self, tabla, df):
+        """Agrega una hoja limpia (o un bloque) de `tabla`"""
+        llaves = [columna for columna in llaves_naturales(tabla) if columna in df.columns]
+        if len(llaves) == 1:
+            self._agregar_llaves(tabla, llaves[0], df[llaves[0]])
+
+        for columna, referencia in referencias(tabla).items():
+            if columna in df.columns:
+                self._agregar_referencias(tabla, columna, df[columna], referencia.get('separador'))
+
+    def _agregar_llaves(self, tabla, columna, serie):
+        valores = _normalizar(serie.dropna())
+        vistas = self.llaves.setdefault(tabla, set())
+        # Repetidas dentro del bloque y contra los bloques anteriores
+        repetidas = valores.duplicated() | valores.isin(vistas)
+        if repetidas.any():
+            registro = self._repetidas.setdefault(tabla, {})
+            for indice, llave in valores[repetidas].drop_duplicates().items():
+                registro.setdefault(llave, indice)
+        nuevas = pd.unique(valores[~repetidas])
+        if self.llaves_bd is not None:
+            existentes = self.llaves_bd.llaves(tabla, columna)
+            if existentes:
+                self._existentes[tabla] = self._existentes.get(tabla, 0) + int(pd.Series(nuevas).isin(existentes).sum())
+        vistas.update(nuevas)
+
+    def _agregar_referencias(self, tabla, columna, serie, separador):
+        valores = serie.dropna()
+        if not len(valores):
+            return
+        # Las celdas se repiten mucho (el mismo equipo en cientos de interrupciones):
+        # se separan y normalizan solo las celdas distintas
+        posiciones, celdas = pd.factorize(valores)
+        filas_por_celda = np.bincount(posiciones, minlength=len(celdas))
+        _, primera_posicion = np.unique(posiciones, return_index=True)
+        primera_fila = valores.index.to_numpy()[primera_posicion]
+
+        celdas = pd.Series(celdas, dtype=object)
+        codigos = _normalizar(separar_codigos(celdas, separador) if separador else celdas)
+        # Un código repetido dentro de la misma celda cuenta una vez por fila
+        pares = pd.DataFrame({'codigo': codigos.to_numpy(), 'celda': codigos.index}).drop_duplicates()
+        pares['filas'] = filas_por_celda[pares['celda']]
+        pares['primera'] = primera_fila[pares['celda']]
+        grupos = pares.groupby('codigo', sort=False).agg(filas=('filas', 'sum'), primera=('primera', 'min'))
+
+        registro = self._referencias.setdefault((tabla, columna), {})
+        for codigo, filas, primera in grupos.itertuples(name=None):
+            if codigo in registro:
+                registro[codigo][0] += filas
+            else:
+                registro[codigo] = [filas, primera]
+
+    def _llaves_referidas(self, referencia):
+        """Conjuntos donde deben estar los códigos: llaves del archivo y de la base de datos"""
+        conjuntos = []
+        if referencia['tabla'] in self.llaves:
+            conjuntos.append(self.llaves[referencia['tabla']])
+        if self.llaves_bd is not None:
+            en_bd = self.llaves_bd.llaves(referencia['tabla'], referencia['columna'])
+            if en_bd:
+                conjuntos.append(en_bd)
+        return conjuntos
+
+    def reporte(self, archivo=None):
+        """Cruza las referencias contra las llaves y arma el ReporteIntegridad"""
+        reporte = ReporteIntegridad(archivo)
+
+        for (tabla, columna), registro in self._referencias.items():
+            referencia = referencias(tabla)[columna]
+            destino = f"{referencia['tabla']}.'{referencia['columna']}'"
+            conjuntos = self._llaves_referidas(referencia)
+            if not conjuntos:
+                # La hoja referida no vino en el archivo (ya cargada o con error) y no hay base de datos
+                reporte.omitidas.append(f"{tabla}.{columna}")
+                logger.debug(f"   Integridad: se omite {tabla}.'{columna}' ({destino} no está en el archivo)")
+                continue
+            codigos = pd.Series(list(registro), dtype=object)
+            encontrados = pd.Series(False, index=codigos.index)
+            for llaves in conjuntos:
+                encontrados |= codigos.isin(llaves)
+            huerfanos = codigos[~encontrados].tolist()
+            if not huerfanos:
+                continue
+            primeras = sorted(registro[codigo][1] for codigo in huerfanos)
+            reporte.huerfanos[(tabla, columna)] = {
+                'referencia': destino,
+                'codigos': len(huerfanos),
+                'filas': sum(registro[codigo][0] for codigo in huerfanos),
+                'ejemplos': huerfanos[:MAX_EJEMPLOS],
+                'filas_excel': fila_excel(primeras),
+            }
+
+        for tabla, registro in self._repetidas.items():
+            en_orden = sorted(registro.items(), key=lambda par: par[1])
+            reporte.duplicadas[tabla] = {
+                'llave': llaves_naturales(tabla)[0],
+                'repetidas': len(registro),
+                'ejemplos': [llave for llave, _ in en_orden[:MAX_EJEMPLOS]],
+                'filas_excel': fila_excel(fila for _, fila in en_orden),
+            }
+
+        reporte.existentes = {tabla: n for tabla, n in self._existentes.items() if n}
+        return reporte
+
+
+def verificar_hojas(hojas, llaves_bd=None, archivo=None):
+    """{tabla: DataFrame limpio} → ReporteIntegridad (sin acumular por bloques)"""
+    verificador = VerificadorIntegridad(llaves_bd)
+    for tabla, df in hojas.items():
+        if tabla in ESQUEMAS_TABLAS:
+            verificador.agregar(tabla, df)
+    return verificador.reporte(archivo)
@@ -0,0 +1,294 @@
+import os
+import time
+import logging
+from pathlib import Path
+from importlib.util import find_spec
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# MOTORES DE LECTURA DISPONIBLES
+# =============================================================================
+
+# Orden de preferencia cuando no se ha medido nada: calamine (parser nativo en
+# Rust) es bastante más rápido que openpyxl; xlrd solo sirve para .xls
+MOTORES_POR_EXTENSION = {
+    '.xlsx': ['calamine', 'openpyxl'],
+    '.xls': ['calamine', 'xlrd'],
+}
+
+# Módulo que debe estar instalado para usar cada motor
+MODULOS_MOTOR = {
+    'calamine': 'python_calamine',
+    'openpyxl': 'openpyxl',
+    'xlrd': 'xlrd',
+}
+
+# pandas soporta engine='calamine' a partir de la versión 2.2
+_PANDAS_SOPORTA_CALAMINE = tuple(int(p) for p in pd.__version__.split('.')[:2]) >= (2, 2)
+
+# Motor elegido por benchmark (o por EXCEL_ENGINE) para cada extensión
+_motor_preferido = {}
+
+
+def motores_disponibles(extension):
+    """Devuelve los motores instalados que pueden leer la extensión dada"""
+    return [
+        motor for motor in MOTORES_POR_EXTENSION.get(extension.lower(), [])
+        if find_spec(MODULOS_MOTOR[motor]) is not None
+        and (motor != 'calamine' or _PANDAS_SOPORTA_CALAMINE)
+    ]
+
+
+def motor_por_defecto(archivo_excel):
+    """
+    Elige el motor para un archivo: EXCEL_ENGINE si está configurado,
+    luego el ganador del benchmark, y si no el primero instalado
+    """
+    extension = Path(archivo_excel).suffix.lower()
+    disponibles = motores_disponibles(extension)
+
+    motor_env = os.getenv('EXCEL_ENGINE')
+    if motor_env and motor_env in disponibles:
+        return motor_env
+
+    if extension in _motor_preferido:
+        return _motor_preferido[extension]
+
+    if not disponibles:
+        raise ValueError(f"No hay motor de lectura instalado para archivos '{extension}'")
+    return disponibles[0]
+
+# =============================================================================
+# LIBRO EXCEL: SE ABRE UNA SOLA VEZ POR ARCHIVO
+# =============================================================================
+class LibroExcel:
+    """
+    Envoltorio de pd.ExcelFile que abre el libro una sola vez y entrega
+    todas las hojas que necesita la corrida sin volver a descomprimirlo
+    Con `cache` (cache_hojas.CacheHojas) cada hoja se parsea del XML una sola vez:
+    las lecturas siguientes, en esta u otra corrida, salen del Parquet guardado
+    y el libro ni siquiera se abre si todas las hojas pedidas están en caché
+    """
+
+    def __init__(self, archivo_excel, motor=None, cache=None):
+        self.archivo = str(archivo_excel)
+        self.motor = motor or motor_por_defecto(self.archivo)
+        self.cache = cache if cache is not None and cache.activa else None
+        self.hash_contenido = self.cache.hash_libro(self.archivo) if self.cache else None
+        self._excel = None
+        self._hojas = {}
+        if self.cache is None:
+            self._abrir()
+
+    def _abrir(self):
+        if self._excel is None:
+            self._excel = pd.ExcelFile(self.archivo, engine=self.motor)
+            if self.cache:
+                self.cache.guardar_nombres_hojas(self.hash_contenido, self._excel.sheet_names)
+        return self._excel
+
+    @property
+    def nombres_hojas(self):
+        if self._excel is None and self.cache:
+            nombres = self.cache.leer_nombres_hojas(self.hash_contenido)
+            if nombres is not None:
+                return nombres
+        return list(self._abrir().sheet_names)
+
+    def _parsear(self, hoja):
+        return self._abrir().parse(sheet_name=hoja)
+
+    def leer_hoja(self, hoja):
+        """Lee una hoja (la primera vez la parsea o la toma de la caché, después usa la copia en memoria)"""
+        if hoja not in self._hojas:
+            if self.cache:
+                self._hojas[hoja] = self.cache.obtener(self.hash_contenido, hoja, lambda: self._parsear(hoja))
+            else:
+                self._hojas[hoja] = self._parsear(hoja)
+        return self._hojas[hoja]
+
+    def leer_hojas(self, hojas):
+        """Lee varias hojas en una sola pasada sobre el libro ya abierto"""
+        return {hoja: self.leer_hoja(hoja) for hoja in hojas}
+
+    def leer_de_cache(self, hoja, etapa, version=None):
+        """Resultado ya procesado de una hoja (p. ej. la hoja limpia), o None si no está en caché"""
+        if self.cache is None:
+            return None
+        return self.cache.leer(self.hash_contenido, hoja, etapa, version)
+
+    def guardar_en_cache(self, df, hoja, etapa, version=None):
+        """Guarda el resultado procesado de una hoja; retorna el DataFrame tal como quedó guardado"""
+        if self.cache is None:
+            return df
+        return self.cache.guardar(df, self.hash_contenido, hoja, etapa, version)
+
+    def liberar_hoja(self, hoja):
+        """Descarta la copia en memoria de una hoja ya procesada"""
+        self._hojas.pop(hoja, None)
+
+    def cerrar(self):
+        self._hojas.clear()
+        if self._excel is not None:
+            self._excel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+# =============================================================================
+# LECTURA POR BLOQUES (MEMORIA ACOTADA) PARA HOJAS MUY GRANDES
+# =============================================================================
+class LibroExcelPorBloques:
+    """
+    Abre el libro en modo solo lectura y recorre cada hoja fila por fila,
+    entregando DataFrames de tamaño fijo. Nunca tiene la hoja completa en memoria
+    """
+
+    def __init__(self, archivo_excel):
+        self.archivo = str(archivo_excel)
+        self.es_xls = Path(self.archivo).suffix.lower() == '.xls'
+
+        if self.es_xls:
+            import xlrd
+            self._libro = xlrd.open_workbook(self.archivo, on_demand=True)
+        else:
+            import openpyxl
+            self._libro = openpyxl.load_workbook(self.archivo, read_only=True, data_only=True)
+
+    @property
+    def nombres_hojas(self):
+        if self.es_xls:
+            return list(self._libro.sheet_names())
+        return list(self._libro.sheetnames)
+
+    def _filas(self, hoja):
+        """Generador de filas (tuplas de valores) de una hoja"""
+        if self.es_xls:
+            import xlrd
+            hoja_xls = self._libro.sheet_by_name(hoja)
+            for i in range(hoja_xls.nrows):
+                valores = []
+                for celda in hoja_xls.row(i):
+                    if celda.ctype == xlrd.XL_CELL_DATE:
+                        valores.append(xlrd.xldate_as_datetime(celda.value, self._libro.datemode))
+                    elif celda.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                        valores.append(None)
+                    else:
+                        valores.append(celda.value)
+                yield tuple(valores)
+            self._libro.unload_sheet(hoja)
+        else:
+            yield from self._libro[hoja].iter_rows(values_only=True)
+
+    def iterar_bloques(self, hoja, tamano_bloque=50000):
+        """
+        Recorre la hoja y entrega DataFrames de hasta `tamano_bloque` filas
+        La primera fila de la hoja se usa como encabezado, igual que pd.read_excel, y el
+        índice sigue la posición en la hoja (continúa de un bloque al siguiente)
+        """
+        if hoja not in self.nombres_hojas:
+            raise ValueError(f"Worksheet named '{hoja}' not found")
+
+        filas = self._filas(hoja)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+
+        # Igual que pandas: encabezados vacíos → 'Unnamed: i'
+        columnas = [
+            str(col).strip() if col is not None else f"Unnamed: {i}"
+            for i, col in enumerate(encabezado)
+        ]
+        n_columnas = len(columnas)
+
+        bloque = []
+        inicio = 0
+        for fila in filas:
+            # Las filas en modo solo lectura pueden venir más cortas o más largas que el encabezado
+            if len(fila) != n_columnas:
+                fila = tuple(fila[:n_columnas]) + (None,) * (n_columnas - len(fila))
+            bloque.append(fila)
+            if len(bloque) >= tamano_bloque:
+                indice = pd.RangeIndex(inicio, inicio + len(bloque))
+                yield pd.DataFrame.from_records(bloque, columns=columnas, index=indice)
+                inicio += len(bloque)
+                bloque = []
+
+        if bloque:
+            indice = pd.RangeIndex(inicio, inicio + len(bloque))
+            yield pd.DataFrame.from_records(bloque, columns=columnas, index=indice)
+
+    def cerrar(self):
+        if self.es_xls:
+            self._libro.release_resources()
+        else:
+            self._libro.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+# =============================================================================
+# BENCHMARK PARA ELEGIR EL MOTOR POR DEFECTO
+# =============================================================================
+def medir_motores(archivo_excel, hojas=None, repeticiones=1):
+    """
+    Mide cuánto tarda cada motor instalado en leer las hojas indicadas
+    Retorna {motor: segundos} (mejor tiempo de las repeticiones)
+    """
+    extension = Path(archivo_excel).suffix.lower()
+    tiempos = {}
+
+    for motor in motores_disponibles(extension):
+        mejor = None
+        for _ in range(repeticiones):
+            try:
+                inicio = time.perf_counter()
+                with LibroExcel(archivo_excel, motor=motor) as libro:
+                    libro.leer_hojas(hojas or libro.nombres_hojas)
+                duracion = time.perf_counter() - inicio
+            except Exception as e:
+                logger.warning(f"   ⚠️  Motor '{motor}' falló leyendo {archivo_excel}: {str(e)}")
+                break
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        if mejor is not None:
+            tiempos[motor] = mejor
+
+    return tiempos
+
+
+def seleccionar_motor(archivo_excel, hojas=None, repeticiones=1):
+    """Ejecuta el benchmark sobre un archivo de muestra y fija el motor por defecto de su extensión"""
+    tiempos = medir_motores(archivo_excel, hojas, repeticiones)
+    if not tiempos:
+        return None
+
+    extension = Path(archivo_excel).suffix.lower()
+    ganador = min(tiempos, key=tiempos.get)
+    _motor_preferido[extension] = ganador
+
+    for motor, segundos in sorted(tiempos.items(), key=lambda x: x[1]):
+        logger.info(f"   Motor '{motor}': {segundos:.3f} s")
+    logger.info(f"✓ Motor de lectura para '{extension}': {ganador}")
+    return ganador
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if len(sys.argv) < 2:
+        print("Uso: python lector_excel.py <archivo.xlsx> [repeticiones]")
+        sys.exit(1)
+
+    seleccionar_motor(sys.argv[1], repeticiones=int(sys.argv[2]) if len(sys.argv) > 2 else 3)
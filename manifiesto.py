@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# MANIFIESTO DE CARGAS
+# =============================================================================
+#
+# Archivo JSON con la identidad de cada libro cargado y el estado de cada hoja:
+#
+# {
+#   "archivos": {
+#     "<sha256 del contenido>": {
+#       "nombre": "Plantilla_AGOSTO.xlsx",
+#       "tamano": 155592,
+#       "mtime": 1760700000.0,
+#       "hojas": {
+#         "Centro MTBT": {"estado": "éxito", "filas": 857, "fecha": "2025-10-21T15:05:55"},
+#         "Interrupciones": {"estado": "error", "mensaje": "...", "fecha": "..."}
+#       },
+#       "salidas": {
+#         "parquet:salidas/parquet": {"Centro MTBT": {"estado": "éxito", "filas": 857, "fecha": "..."}}
+#       }
+#     }
+#   }
+# }
+#
+# Un libro con el mismo contenido (aunque se haya renombrado o copiado) no se vuelve
+# a cargar; si alguna hoja falló, solo esas hojas quedan pendientes
+# "hojas" es el estado en la base de datos y "salidas" el de cada salida de archivos:
+# una hoja escrita solo en parquet sigue pendiente para la siguiente corrida con SQL
+
+MANIFIESTO_POR_DEFECTO = 'manifiesto_cargas.json'
+DESTINO_BD = 'sql'
+
+
+def hash_archivo(ruta, tamano_bloque=1024 * 1024):
+    """SHA-256 del contenido del archivo, leído por bloques"""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class ManifiestoCargas:
+    """
+    Registro persistente de los libros ya cargados y el estado de cada hoja en cada
+    destino. `destinos` son los de la corrida (ver salidas.destinos_manifiesto)
+    """
+
+    def __init__(self, ruta=None, destinos=(DESTINO_BD,)):
+        self.ruta = Path(ruta or os.getenv('ETL_MANIFIESTO', MANIFIESTO_POR_DEFECTO))
+        self.destinos = list(destinos)
+        self.archivos = {}
+        # Identidad calculada en esta corrida por ruta, para no volver a leer el archivo
+        self._identidades = {}
+
+        if self.ruta.exists():
+            try:
+                with open(self.ruta, encoding='utf-8') as f:
+                    self.archivos = json.load(f).get('archivos', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️  No se pudo leer el manifiesto {self.ruta}: {str(e)} - se ignora")
+
+    def identidad(self, archivo):
+        """
+        Retorna el hash de contenido del archivo. Si tamaño y mtime coinciden con una
+        entrada del manifiesto con el mismo nombre, se reutiliza su hash sin leer el archivo
+        """
+        archivo = Path(archivo)
+        clave = str(archivo.resolve())
+        if clave in self._identidades:
+            return self._identidades[clave]
+
+        stat = archivo.stat()
+        for hash_contenido, entrada in self.archivos.items():
+            if (entrada.get('nombre') == archivo.name
+                    and entrada.get('tamano') == stat.st_size
+                    and entrada.get('mtime') == stat.st_mtime):
+                self._identidades[clave] = hash_contenido
+                return hash_contenido
+
+        hash_contenido = hash_archivo(archivo)
+        self._identidades[clave] = hash_contenido
+        return hash_contenido
+
+    @staticmethod
+    def _hojas(entrada, destino):
+        """Estado de las hojas de un libro en `destino`"""
+        if destino == DESTINO_BD:
+            return entrada.get('hojas', {})
+        return entrada.get('salidas', {}).get(destino, {})
+
+    def hojas_pendientes(self, archivo, tabla_sheet_map):
+        """
+        Subconjunto de tabla_sheet_map con las hojas que aún no se cargaron con éxito
+        en alguno de los destinos de la corrida
+        """
+        entrada = self.archivos.get(self.identidad(archivo), {})
+        por_destino = [self._hojas(entrada, destino) for destino in self.destinos]
+        return {
+            hoja: tabla for hoja, tabla in tabla_sheet_map.items()
+            if any(hojas.get(hoja, {}).get('estado') != 'éxito' for hojas in por_destino)
+        }
+
+    def registrar(self, archivo, tabla_sheet_map, resultados):
+        """
+        Registra el resultado de cada hoja procesada en cada destino de la corrida
+        `resultados` es el diccionario que retorna cargar_excel_a_sql (clave "<archivo> - <tabla>")
+        """
+        archivo = Path(archivo)
+        stat = archivo.stat()
+        hash_contenido = self.identidad(archivo)
+
+        entrada = self.archivos.setdefault(hash_contenido, {'hojas': {}})
+        entrada.update({'nombre': archivo.name, 'tamano': stat.st_size, 'mtime': stat.st_mtime})
+        por_destino = [
+            entrada.setdefault('hojas', {}) if destino == DESTINO_BD
+            else entrada.setdefault('salidas', {}).setdefault(destino, {})
+            for destino in self.destinos
+        ]
+
+        fecha = datetime.now().isoformat(timespec='seconds')
+        for hoja, tabla in tabla_sheet_map.items():
+            resultado = resultados.get(f"{archivo.name} - {tabla}")
+            if resultado is None:
+                continue
+            estado_hoja = {'estado': resultado['estado'], 'fecha': fecha}
+            if resultado['estado'] == 'éxito':
+                estado_hoja['filas'] = resultado['filas']
+                if resultado.get('rechazadas'):
+                    estado_hoja['rechazadas'] = resultado['rechazadas']
+            else:
+                estado_hoja['mensaje'] = resultado.get('mensaje', '')
+            for hojas in por_destino:
+                hojas[hoja] = dict(estado_hoja)
+
+        self.guardar()
+
+    def guardar(self):
+        """Escribe el manifiesto de forma atómica (archivo temporal + reemplazo)"""
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta.with_suffix(self.ruta.suffix + '.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'archivos': self.archivos}, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.ruta)
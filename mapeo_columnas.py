@@ -0,0 +1,206 @@
+import re
+import json
+import logging
+import unicodedata
+from pathlib import Path
+
+from esquemas import ESQUEMAS_TABLAS
+
+logger = logging.getLogger(__name__)
+
+RUTA_CACHE_CATALOGO = Path('.cache') / 'catalogo_columnas.json'
+
+# =============================================================================
+# NORMALIZACIÓN DE ENCABEZADOS
+# =============================================================================
+def normalizar_encabezado(nombre):
+    """
+    Forma canónica de un encabezado para comparar variantes:
+    sin acentos, minúsculas, guion bajo = espacio, espacios colapsados
+    'Código de Equipo', 'codigo_de_equipo ' y 'CODIGO DE  EQUIPO' → 'codigo de equipo'
+    """
+    texto = unicodedata.normalize('NFKD', str(nombre))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.casefold().replace('_', ' ')
+    return re.sub(r'\s+', ' ', texto).strip()
+
+# =============================================================================
+# CATÁLOGO DE COLUMNAS DESTINO (CON CACHÉ LOCAL)
+# =============================================================================
+def _clave_invalidacion(engine, tablas):
+    """
+    Clave que cambia cuando cambia la estructura de las tablas. En SQL Server es la
+    última modify_date de sys.tables (un ALTER TABLE la actualiza). En otros motores
+    no hay una consulta barata equivalente y se retorna None (no se usa la caché)
+    """
+    if engine.dialect.name != 'mssql':
+        return None
+
+    from sqlalchemy import text, bindparam
+
+    consulta = text(
+        "SELECT CONVERT(VARCHAR(33), MAX(modify_date), 126), COUNT(*) "
+        "FROM sys.tables WHERE name IN :tablas"
+    ).bindparams(bindparam('tablas', expanding=True))
+    with engine.connect() as conexion:
+        ultima_modificacion, n_tablas = conexion.execute(consulta, {'tablas': list(tablas)}).one()
+    return f"{ultima_modificacion}|{n_tablas}"
+
+
+class CatalogoColumnas:
+    """
+    Columnas reales de las tablas destino, leídas una vez del catálogo de la base de
+    datos y guardadas en un archivo local junto con su clave de invalidación
+    """
+
+    def __init__(self, engine=None, ruta_cache=RUTA_CACHE_CATALOGO, columnas=None):
+        self.engine = engine
+        self.ruta_cache = Path(ruta_cache)
+        # Con `columnas` (lo que retornó cargar() en otro proceso) no se consulta nada
+        self._columnas = columnas
+
+    def _identificador_base(self):
+        """Servidor y base de datos de la conexión (sin credenciales) para separar entradas de la caché"""
+        url = self.engine.url
+        odbc = url.query.get('odbc_connect', '')
+        partes = dict(p.split('=', 1) for p in odbc.split(';') if '=' in p)
+        servidor = url.host or partes.get('SERVER', '')
+        base_datos = url.database or partes.get('DATABASE', '')
+        return f"{url.get_backend_name()}|{servidor}|{base_datos}"
+
+    def _leer_cache(self):
+        if not self.ruta_cache.exists():
+            return {}
+        try:
+            with open(self.ruta_cache, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir_cache(self, contenido):
+        self.ruta_cache.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.ruta_cache, 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, ensure_ascii=False, indent=2)
+
+    def cargar(self, tablas):
+        """Lee (o recupera de la caché) las columnas de las tablas indicadas"""
+        if self._columnas is not None:
+            return self._columnas
+
+        if self.engine is None:
+            self._columnas = {}
+            return self._columnas
+
+        try:
+            clave = _clave_invalidacion(self.engine, tablas)
+            identificador = self._identificador_base()
+            cache = self._leer_cache()
+            entrada = cache.get(identificador)
+
+            if clave is not None and entrada and entrada.get('clave') == clave:
+                self._columnas = entrada['tablas']
+                logger.info("✓ Catálogo de columnas recuperado de la caché local")
+                return self._columnas
+
+            from sqlalchemy import inspect
+            inspector = inspect(self.engine)
+            self._columnas = {
+                tabla: [col['name'] for col in inspector.get_columns(tabla)]
+                for tabla in tablas if inspector.has_table(tabla)
+            }
+            logger.info(f"✓ Catálogo de columnas leído de la base de datos ({len(self._columnas)} tablas)")
+
+            if clave is not None:
+                cache[identificador] = {'clave': clave, 'tablas': self._columnas}
+                self._escribir_cache(cache)
+        except Exception as e:
+            logger.warning(f"⚠️  No se pudo leer el catálogo de columnas: {str(e)} - se usa el esquema local")
+            self._columnas = {}
+
+        return self._columnas
+
+    def columnas(self, tabla, tablas=None):
+        """Columnas de la tabla en la base de datos, o None si no se conocen"""
+        return self.cargar(tablas or [tabla]).get(tabla)
+
+# =============================================================================
+# MAPEADOR COMPILADO ENCABEZADO → COLUMNA
+# =============================================================================
+class MapeadorColumnas:
+    """
+    Mapea encabezados de Excel a columnas de SQL Server. Para cada tabla compila una
+    sola vez un diccionario {encabezado normalizado: columna destino} a partir de:
+      1. Las columnas reales de la tabla (catálogo) o, si no se conocen, del esquema local
+      2. Los alias del esquema y los explícitos (nombres distintos, no solo variantes de escritura)
+    El resultado por combinación de encabezados se guarda, así los archivos
+    siguientes con los mismos encabezados no recalculan nada
+    """
+
+    def __init__(self, alias=None, engine=None, tablas=None, catalogo=None):
+        self.alias = alias or {}
+        self.tablas = list(tablas) if tablas else list(ESQUEMAS_TABLAS)
+        self.catalogo = catalogo or CatalogoColumnas(engine)
+        self._compilados = {}
+        self._renombres = {}
+
+    def usar_catalogo(self, catalogo):
+        """Cambia el catálogo (p. ej. otra base de datos) y descarta lo compilado con el anterior"""
+        self.catalogo = catalogo
+        self._compilados.clear()
+        self._renombres.clear()
+
+    def columnas_destino(self, tabla):
+        """Columnas destino conocidas: catálogo de la base de datos o esquema local"""
+        columnas = self.catalogo.columnas(tabla, self.tablas)
+        if columnas:
+            return columnas
+        esquema = ESQUEMAS_TABLAS.get(tabla, {})
+        return list(esquema.get('columnas', {})) + list(esquema.get('derivadas', {}))
+
+    def compilar(self, tabla):
+        """Construye el diccionario normalizado → columna destino de la tabla"""
+        if tabla in self._compilados:
+            return self._compilados[tabla]
+
+        columnas_esquema = set(ESQUEMAS_TABLAS.get(tabla, {}).get('columnas', {}))
+        candidatos = {}
+        for columna in self.columnas_destino(tabla):
+            candidatos.setdefault(normalizar_encabezado(columna), []).append(columna)
+
+        busqueda = {}
+        for clave, columnas in candidatos.items():
+            if len(columnas) == 1:
+                busqueda[clave] = columnas[0]
+                continue
+            # Varias columnas de la tabla normalizan igual: gana la declarada en el esquema
+            preferidas = [c for c in columnas if c in columnas_esquema]
+            if len(preferidas) == 1:
+                busqueda[clave] = preferidas[0]
+            else:
+                logger.warning(f"   ⚠️  Columnas ambiguas en '{tabla}': {columnas} - requieren alias explícito")
+
+        alias = {**ESQUEMAS_TABLAS.get(tabla, {}).get('alias', {}), **self.alias.get(tabla, {})}
+        for origen, destino in alias.items():
+            busqueda[normalizar_encabezado(origen)] = destino
+
+        self._compilados[tabla] = busqueda
+        return busqueda
+
+    def renombres(self, columnas, tabla):
+        """
+        Retorna ({encabezado: columna destino}, [encabezados sin destino]) para una
+        combinación de encabezados; se calcula una vez por combinación
+        """
+        clave = (tabla, tuple(columnas))
+        if clave not in self._renombres:
+            busqueda = self.compilar(tabla)
+            renombres = {}
+            no_mapeadas = []
+            for col_excel in columnas:
+                destino = busqueda.get(normalizar_encabezado(col_excel))
+                if destino is None:
+                    no_mapeadas.append(col_excel)
+                else:
+                    renombres[col_excel] = destino
+            self._renombres[clave] = (renombres, no_mapeadas)
+        return self._renombres[clave]
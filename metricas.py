@@ -0,0 +1,169 @@
+import csv
+import json
+import time
+import logging
+import tracemalloc
+from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# REGISTRO DE MÉTRICAS POR ARCHIVO × HOJA × ETAPA
+# =============================================================================
+
+# Etapas instrumentadas del pipeline
+ETAPAS = ['lectura', 'limpieza', 'mapeo', 'validacion', 'carga']
+
+CAMPOS_REPORTE = [
+    'archivo', 'hoja', 'etapa', 'filas', 'bytes',
+    'segundos', 'segundos_cpu', 'filas_por_segundo', 'memoria_pico_bytes',
+]
+
+# Archivo y hoja en proceso (para no pasarlos por cada función intermedia)
+_archivo_actual = ContextVar('archivo_actual', default=None)
+_hoja_actual = ContextVar('hoja_actual', default=None)
+
+
+class RegistroMetricas:
+    """
+    Acumula mediciones de tiempo de reloj, tiempo de CPU, filas, bytes y filas/segundo
+    por archivo, hoja y etapa. Con `memoria=True` también registra el pico de memoria
+    de cada etapa (tracemalloc)
+    """
+
+    def __init__(self, memoria=False):
+        self.mediciones = []
+        self.memoria = memoria
+
+    def activar_memoria(self):
+        self.memoria = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def contexto(self, archivo=None, hoja=None):
+        """Fija el archivo/hoja en proceso para las mediciones dentro del bloque"""
+        token_archivo = _archivo_actual.set(archivo) if archivo is not None else None
+        token_hoja = _hoja_actual.set(hoja) if hoja is not None else None
+        try:
+            yield
+        finally:
+            if token_hoja is not None:
+                _hoja_actual.reset(token_hoja)
+            if token_archivo is not None:
+                _archivo_actual.reset(token_archivo)
+
+    @contextmanager
+    def medir(self, etapa, archivo=None, hoja=None):
+        """
+        Mide una etapa. El bloque recibe un dict donde puede anotar 'filas' y 'bytes':
+
+            with registro.medir('carga') as m:
+                cargar(df)
+                m['filas'] = len(df)
+        """
+        medicion = {
+            'archivo': archivo or _archivo_actual.get(),
+            'hoja': hoja or _hoja_actual.get(),
+            'etapa': etapa,
+            'filas': None,
+            'bytes': None,
+        }
+        if self.memoria and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield medicion
+        finally:
+            medicion['segundos'] = time.perf_counter() - inicio
+            medicion['segundos_cpu'] = time.process_time() - inicio_cpu
+            filas = medicion['filas']
+            medicion['filas_por_segundo'] = (
+                filas / medicion['segundos'] if filas and medicion['segundos'] > 0 else None
+            )
+            medicion['memoria_pico_bytes'] = (
+                tracemalloc.get_traced_memory()[1] if self.memoria and tracemalloc.is_tracing() else None
+            )
+            self.mediciones.append(medicion)
+
+    def extraer(self):
+        """Retorna y vacía las mediciones (para enviarlas desde un proceso hijo)"""
+        mediciones, self.mediciones = self.mediciones, []
+        return mediciones
+
+    def agregar(self, mediciones):
+        self.mediciones.extend(mediciones)
+
+    def resumen_por_etapa(self):
+        """Totales por etapa: {etapa: {'segundos', 'segundos_cpu', 'filas', 'filas_por_segundo'}}"""
+        resumen = {}
+        for medicion in self.mediciones:
+            total = resumen.setdefault(medicion['etapa'], {'segundos': 0.0, 'segundos_cpu': 0.0, 'filas': 0})
+            total['segundos'] += medicion['segundos']
+            total['segundos_cpu'] += medicion['segundos_cpu']
+            total['filas'] += medicion['filas'] or 0
+        for total in resumen.values():
+            total['filas_por_segundo'] = total['filas'] / total['segundos'] if total['segundos'] > 0 else None
+        return resumen
+
+    def registrar_resumen(self):
+        """Escribe en el log el tiempo total de cada etapa"""
+        resumen = self.resumen_por_etapa()
+        if not resumen:
+            return
+        logger.info("\nTiempos por etapa:")
+        for etapa in ETAPAS + [e for e in resumen if e not in ETAPAS]:
+            if etapa in resumen:
+                total = resumen[etapa]
+                velocidad = f", {total['filas_por_segundo']:,.0f} filas/s" if total['filas_por_segundo'] else ''
+                logger.info(
+                    f"  {etapa:<12} {total['segundos']:8.2f} s (CPU {total['segundos_cpu']:.2f} s)"
+                    f"{velocidad}"
+                )
+
+    def escribir_reporte(self, ruta_base):
+        """
+        Escribe <ruta_base>.json (mediciones + resumen por etapa) y <ruta_base>.csv
+        (una fila por medición). Retorna las rutas escritas
+        """
+        ruta_base = Path(ruta_base)
+        ruta_json = ruta_base.with_suffix('.json')
+        ruta_csv = ruta_base.with_suffix('.csv')
+
+        with open(ruta_json, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'mediciones': self.mediciones, 'resumen_por_etapa': self.resumen_por_etapa()},
+                f, ensure_ascii=False, indent=2, default=str
+            )
+
+        with open(ruta_csv, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=CAMPOS_REPORTE, extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(self.mediciones)
+
+        return ruta_json, ruta_csv
+
+    def escribir_instantanea_memoria(self, ruta, limite=25):
+        """Guarda las líneas de código que más memoria retienen (requiere memoria=True)"""
+        if not tracemalloc.is_tracing():
+            return None
+        estadisticas = tracemalloc.take_snapshot().statistics('lineno')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            for estadistica in estadisticas[:limite]:
+                f.write(f"{estadistica}\n")
+        return ruta
+
+
+# Registro compartido por todo el proceso
+registro = RegistroMetricas()
+
+
+def medir(etapa, archivo=None, hoja=None):
+    return registro.medir(etapa, archivo, hoja)
+
+
+def contexto(archivo=None, hoja=None):
+    return registro.contexto(archivo, hoja)
@@ -0,0 +1,321 @@
+import logging
+
+import pandas as pd
+
+from esquemas import (
+    CONVERTIDORES, fuera_de_rango, llaves_naturales, normalizar_columna, quitar_tokens_nulos, sobre_umbral,
+    spec_columna, tipo_memoria, valor_maximo_decimal,
+)
+from mapeo_columnas import MapeadorColumnas
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# PERFILADOR COLUMNAR DE HOJAS (UNA SOLA PASADA POR COLUMNA)
+# =============================================================================
+#
+# Cada columna se recorre una vez: el texto se normaliza sobre sus valores distintos
+# (espacios, tokens nulos y longitud, ver esquemas.normalizar_columna) y se hace una
+# sola conversión al tipo del esquema (números y fechas; esas columnas solo pierden sus
+# tokens nulos, las celdas fecha o número llegan tal cual). Las columnas ya limpias y
+# convertidas quedan en el reporte para que limpiar_dataframe las reutilice en lugar
+# de repetir el trabajo. El texto limpio ya sale con el tipo en memoria del plan
+# (category o string[pyarrow], ver tipo_memoria)
+
+# Límite de longitud cuando la columna no está en el esquema
+LONGITUD_POR_DEFECTO = 255
+
+# Porcentaje de nulos a partir del cual se advierte
+PORCENTAJE_NULOS_ALTO = 50
+
+MAX_EJEMPLOS = 3
+MAX_FILAS_REPORTADAS = 20
+
+_ACENTOS = set('áéíóúñÁÉÍÓÚÑ')
+_ESPECIALES = set('()[]{}@#$%')
+
+
+def fila_excel(indice):
+    """Número de fila en Excel de cada índice del DataFrame (fila 1 = encabezado)"""
+    return [int(i) + 2 for i in indice]
+
+
+def problemas_nombre_columna(columna):
+    """Motivos por los que un encabezado no es un identificador SQL seguro"""
+    nombre = str(columna)
+    problemas = []
+    if _ACENTOS & set(nombre):
+        problemas.append("acentos")
+    if '/' in nombre:
+        problemas.append("slash")
+    if ' ' in nombre:
+        problemas.append("espacios")
+    if _ESPECIALES & set(nombre):
+        problemas.append("caracteres especiales")
+    if len(nombre) > 128:
+        problemas.append("nombre muy largo")
+    return problemas
+
+
+class PerfilColumna:
+    """Resultado del perfilado de una columna de Excel"""
+
+    def __init__(self, columna, destino=None, tipo=None):
+        self.columna = columna          # Encabezado en Excel
+        self.destino = destino          # Columna en SQL Server (None si no tiene equivalente)
+        self.tipo = tipo                # Tipo del esquema ('texto', 'entero', 'decimal', 'fecha')
+        self.no_nulos = 0
+        self.nulos = 0
+        self.tokens_na = 0
+        self.recortadas = 0             # Celdas con espacios al inicio/final
+        self.espacios_colapsados = 0    # Celdas con espacios internos repetidos
+        self.longitud_maxima = None
+        self.limite_longitud = None
+        self.no_convertibles = 0
+        self.ejemplos_no_convertibles = []
+        self.filas_no_convertibles = []   # Filas de Excel (encabezado = fila 1)
+        self.fuera_de_rango = 0
+        self.ejemplos_fuera_de_rango = []
+        self.sobre_umbral = 0           # Valores mayores que 'advertir_mayor_que' del esquema
+        self.ejemplos_sobre_umbral = []
+        self.problemas_nombre = []
+
+    @property
+    def porcentaje_nulos(self):
+        total = self.nulos + self.no_nulos
+        return 100 * self.nulos / total if total else 0.0
+
+    def como_dict(self):
+        return dict(vars(self))
+
+
+class ReporteValidacion:
+    """
+    Reporte estructurado de una hoja: conteos por columna, llaves, duplicados y
+    hallazgos de reglas por tabla. advertencias() los resume como texto
+    """
+
+    def __init__(self, hoja, tabla):
+        self.hoja = hoja
+        self.tabla = tabla
+        self.filas = 0
+        self.columnas = 0
+        self.filas_vacias = 0
+        self.duplicados = 0
+        self.perfiles = {}            # encabezado → PerfilColumna
+        self.llaves_nulas = {}        # llave natural → filas sin valor
+        self.llaves_duplicadas = {}   # llave natural → valores repetidos
+        self.observaciones = []       # hallazgos de las reglas de la tabla
+        # Columnas ya procesadas, reutilizables por limpiar_dataframe
+        self.texto_limpio = {}        # encabezado → esquemas.TextoNormalizado (columnas de texto)
+        self.convertidas = {}         # columna SQL → serie convertida al tipo del esquema
+        self.valores = {}             # columna SQL → valores limpios antes de convertir
+
+    @property
+    def columnas_con_problemas_nombre(self):
+        return [col for col, perfil in self.perfiles.items() if perfil.problemas_nombre]
+
+    @property
+    def lista_para_insercion(self):
+        return not self.columnas_con_problemas_nombre
+
+    def advertencias(self):
+        """Hallazgos del perfilado como mensajes de texto"""
+        mensajes = []
+        for col, perfil in self.perfiles.items():
+            if perfil.porcentaje_nulos > PORCENTAJE_NULOS_ALTO:
+                mensajes.append(f"'{col}': {perfil.porcentaje_nulos:.1f}% valores nulos")
+            if perfil.tokens_na:
+                mensajes.append(f"'{col}': {perfil.tokens_na} valores de texto sin dato (NA, -, /, etc) se cargan como nulo")
+            if perfil.limite_longitud and perfil.longitud_maxima and perfil.longitud_maxima > perfil.limite_longitud:
+                mensajes.append(
+                    f"'{col}': valor más largo = {perfil.longitud_maxima} caracteres "
+                    f"(límite SQL: {perfil.limite_longitud})"
+                )
+            if perfil.no_convertibles:
+                if perfil.tipo == 'fecha':
+                    mensaje = f"'{col}': {perfil.no_convertibles} fechas inválidas de {perfil.no_nulos} no-nulas"
+                else:
+                    mensaje = f"'{col}': {perfil.no_convertibles} valores no numéricos"
+                filas = perfil.filas_no_convertibles
+                sufijo = f" (y {len(filas) - MAX_FILAS_REPORTADAS} más)" if len(filas) > MAX_FILAS_REPORTADAS else ''
+                mensajes.append(
+                    f"{mensaje} - ejemplos: {perfil.ejemplos_no_convertibles}, "
+                    f"filas Excel: {filas[:MAX_FILAS_REPORTADAS]}{sufijo}"
+                )
+            if perfil.fuera_de_rango and perfil.tipo == 'decimal':
+                spec = spec_columna(self.tabla, perfil.destino)
+                limite = valor_maximo_decimal(spec['precision'], spec['escala'])
+                mensajes.append(
+                    f"'{col}': {perfil.fuera_de_rango} valores > {limite:g} no caben en "
+                    f"DECIMAL({spec['precision']},{spec['escala']}) - ejemplos: {perfil.ejemplos_fuera_de_rango}"
+                )
+            if perfil.sobre_umbral:
+                spec = spec_columna(self.tabla, perfil.destino)
+                unidad = f" {spec['unidad']}" if spec.get('unidad') else ''
+                mensajes.append(
+                    f"'{col}': {perfil.sobre_umbral} valores > {spec['advertir_mayor_que']:g}{unidad} "
+                    f"(umbral de advertencia) - ejemplos: {perfil.ejemplos_sobre_umbral}"
+                )
+
+        for llave, nulas in self.llaves_nulas.items():
+            if nulas:
+                mensajes.append(f"'{llave}': {nulas} valores vacíos (la llave no puede ser NULL)")
+        for llave, repetidas in self.llaves_duplicadas.items():
+            if repetidas:
+                mensajes.append(f"'{llave}': {repetidas} valores repetidos de la llave")
+        if self.duplicados:
+            mensajes.append(f"{self.duplicados} filas completamente duplicadas")
+
+        return mensajes + self.observaciones
+
+    def como_dict(self):
+        """Reporte serializable (sin las series de datos)"""
+        return {
+            'hoja': self.hoja,
+            'tabla': self.tabla,
+            'filas': self.filas,
+            'columnas': self.columnas,
+            'filas_vacias': self.filas_vacias,
+            'duplicados': self.duplicados,
+            'perfiles': {col: perfil.como_dict() for col, perfil in self.perfiles.items()},
+            'llaves_nulas': self.llaves_nulas,
+            'llaves_duplicadas': self.llaves_duplicadas,
+            'observaciones': self.observaciones,
+            'advertencias': self.advertencias(),
+        }
+
+# =============================================================================
+# REGLAS POR TABLA (SOBRE LAS COLUMNAS YA CONVERTIDAS)
+# =============================================================================
+def _regla_cierre_despues_de_inicio(reporte):
+    inicio = reporte.convertidas.get('Fecha y Hora_Inicio')
+    cierre = reporte.convertidas.get('Fecha y Hora_Cierre')
+    if inicio is None or cierre is None:
+        return
+    errores = int((cierre < inicio).sum())
+    if errores:
+        reporte.observaciones.append(
+            f"{errores} registros donde Fecha_Cierre < Fecha_Inicio (lógica incorrecta)"
+        )
+
+
+def _regla_codigos_multiples(reporte):
+    codigos = reporte.valores.get('Código de Equipo')
+    if codigos is None or (codigos.dtype != object and not isinstance(codigos.dtype, pd.StringDtype)):
+        return
+    multiples = int(codigos.str.contains(',', na=False).sum())
+    if multiples:
+        reporte.observaciones.append(
+            f"{multiples} registros con múltiples códigos de equipo (separados por coma); "
+            f"la columna 'CódigoDePrimerEquipo' se crea automáticamente"
+        )
+
+
+REGLAS_TABLAS = {
+    'Interrupciones': [_regla_cierre_despues_de_inicio, _regla_codigos_multiples],
+}
+
+# =============================================================================
+# PERFILADO
+# =============================================================================
+_mapeador_por_defecto = None
+
+
+def _mapeador():
+    """Mapeador con el esquema local (sin base de datos), creado una sola vez"""
+    global _mapeador_por_defecto
+    if _mapeador_por_defecto is None:
+        _mapeador_por_defecto = MapeadorColumnas()
+    return _mapeador_por_defecto
+
+
+def _perfilar_columna(reporte, serie, perfil, spec):
+    """Perfila una columna y guarda en el reporte su versión limpia y convertida"""
+    no_nulos = serie.notna()
+    perfil.no_nulos = int(no_nulos.sum())
+    perfil.nulos = len(serie) - perfil.no_nulos
+    valores = serie
+    normalizado = None
+
+    if serie.dtype == object and perfil.tipo in CONVERTIDORES:
+        # Números y fechas no pasan por la limpieza de texto: solo los tokens de nulo
+        valores, perfil.tokens_na = quitar_tokens_nulos(serie)
+    elif serie.dtype == object:
+        normalizado = normalizar_columna(serie, tipo_memoria(reporte.tabla, perfil.destino))
+        perfil.tokens_na = normalizado.tokens_na
+        perfil.recortadas = normalizado.recortadas
+        perfil.espacios_colapsados = normalizado.espacios_colapsados
+        perfil.longitud_maxima = normalizado.longitud_maxima
+        if perfil.tipo in (None, 'texto'):
+            perfil.limite_longitud = (spec or {}).get('longitud') or LONGITUD_POR_DEFECTO
+
+        # Los tokens de nulo ya salen como nulo: no cuentan como conversiones fallidas
+        valores = normalizado.valores
+        reporte.texto_limpio[perfil.columna] = normalizado
+
+    if perfil.destino is not None:
+        reporte.valores[perfil.destino] = valores
+
+    if spec is not None and spec['tipo'] in CONVERTIDORES:
+        convertida = CONVERTIDORES[spec['tipo']](valores, perfil.destino, spec)
+        reporte.convertidas[perfil.destino] = convertida
+
+        fallidas = valores.notna() & convertida.isna()
+        perfil.no_convertibles = int(fallidas.sum())
+        perfil.ejemplos_no_convertibles = serie[fallidas].head(MAX_EJEMPLOS).tolist()
+        perfil.filas_no_convertibles = fila_excel(fallidas[fallidas].index)
+
+        mascara = fuera_de_rango(convertida, spec)
+        if mascara is not None:
+            mascara = mascara.fillna(False).astype(bool)
+            perfil.fuera_de_rango = int(mascara.sum())
+            perfil.ejemplos_fuera_de_rango = serie[mascara].head(MAX_EJEMPLOS).tolist()
+
+        mascara = sobre_umbral(convertida, spec)
+        if mascara is not None:
+            mascara = mascara.fillna(False).astype(bool)
+            perfil.sobre_umbral = int(mascara.sum())
+            perfil.ejemplos_sobre_umbral = serie[mascara].head(MAX_EJEMPLOS).tolist()
+    elif perfil.limite_longitud and perfil.longitud_maxima:
+        perfil.fuera_de_rango = normalizado.filas_mas_largas(perfil.limite_longitud)
+
+
+def perfilar_hoja(df, hoja, tabla=None, mapeador=None):
+    """
+    Perfila una hoja leída de Excel en una sola pasada por columna y retorna un
+    ReporteValidacion. `tabla` es la tabla destino (por defecto el nombre de la hoja)
+    y `mapeador` resuelve encabezados → columnas SQL (por defecto el esquema local)
+    """
+    tabla = tabla or hoja
+    mapeador = mapeador or _mapeador()
+    renombres, _ = mapeador.renombres(df.columns, tabla)
+
+    reporte = ReporteValidacion(hoja, tabla)
+    reporte.filas = len(df)
+    reporte.columnas = len(df.columns)
+    vacias = df.isna().all(axis=1)
+    reporte.filas_vacias = int(vacias.sum())
+    reporte.duplicados = int(df[~vacias].duplicated().sum())
+
+    for col in df.columns:
+        destino = renombres.get(col)
+        spec = spec_columna(tabla, destino) if destino else None
+        perfil = PerfilColumna(col, destino, spec['tipo'] if spec else None)
+        perfil.problemas_nombre = problemas_nombre_columna(col)
+        _perfilar_columna(reporte, df[col], perfil, spec)
+        reporte.perfiles[col] = perfil
+
+    # Llaves naturales: sin nulos ni repetidos (sin contar las filas vacías)
+    for llave in llaves_naturales(tabla):
+        valores = reporte.valores.get(llave)
+        if valores is None:
+            continue
+        valores = valores[~vacias]
+        reporte.llaves_nulas[llave] = int(valores.isna().sum())
+        reporte.llaves_duplicadas[llave] = int(valores.dropna().duplicated().sum())
+
+    for regla in REGLAS_TABLAS.get(tabla, []):
+        regla(reporte)
+
+    return reporte
@@ -0,0 +1,103 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from cargadores import COLUMNA_ERROR
+from perfilador import fila_excel
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# REGISTRO DE FILAS RECHAZADAS POR LA BASE DE DATOS
+# =============================================================================
+#
+# Cuando la base de datos rechaza un lote, el cargador lo divide hasta aislar las
+# filas culpables y carga todo lo demás (cargadores.Cargador._insertar_aislando).
+# Las filas rechazadas se guardan aquí, con el error y su fila en el Excel, en un
+# CSV o en una tabla SQL con las mismas columnas:
+#
+#   fecha | archivo | hoja | tabla | fila_excel | error | datos (JSON con los valores de la fila)
+#
+# Los valores van como JSON para que filas de tablas distintas quepan en el mismo destino
+# Con cargas concurrentes varias hojas escriben al mismo destino: cada escritura va con un lock
+
+COLUMNAS_RECHAZOS = ['fecha', 'archivo', 'hoja', 'tabla', 'fila_excel', 'error', 'datos']
+
+TABLA_RECHAZOS_POR_DEFECTO = 'etl_rechazos'
+
+
+def registros_rechazo(rechazadas, tabla, archivo=None, hoja=None):
+    """Filas rechazadas (con COLUMNA_ERROR) → DataFrame con COLUMNAS_RECHAZOS"""
+    datos = rechazadas.drop(columns=[COLUMNA_ERROR])
+    datos = datos.astype(object).where(datos.notna(), None)
+    return pd.DataFrame({
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'archivo': archivo,
+        'hoja': hoja,
+        'tabla': tabla,
+        'fila_excel': fila_excel(rechazadas.index),
+        'error': rechazadas[COLUMNA_ERROR].tolist(),
+        'datos': [
+            json.dumps(fila, ensure_ascii=False, default=str)
+            for fila in datos.to_dict(orient='records')
+        ],
+    }, columns=COLUMNAS_RECHAZOS)
+
+
+class RechazosArchivo:
+    """Agrega las filas rechazadas a un CSV (UTF-8 con BOM, se abre directo en Excel)"""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self._bloqueo = threading.Lock()
+
+    @property
+    def descripcion(self):
+        return str(self.ruta)
+
+    def escribir(self, rechazadas, tabla, archivo=None, hoja=None):
+        registros = registros_rechazo(rechazadas, tabla, archivo, hoja)
+        with self._bloqueo:
+            nuevo = not self.ruta.exists()
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            registros.to_csv(
+                self.ruta, mode='a', header=nuevo, index=False,
+                encoding='utf-8-sig' if nuevo else 'utf-8'
+            )
+        return len(registros)
+
+
+class RechazosTabla:
+    """Agrega las filas rechazadas a una tabla SQL (se crea en la primera escritura)"""
+
+    def __init__(self, engine, tabla=TABLA_RECHAZOS_POR_DEFECTO):
+        self.engine = engine
+        self.tabla = tabla
+        self._bloqueo = threading.Lock()
+
+    @property
+    def descripcion(self):
+        return f"la tabla '{self.tabla}'"
+
+    def escribir(self, rechazadas, tabla, archivo=None, hoja=None):
+        registros = registros_rechazo(rechazadas, tabla, archivo, hoja)
+        with self._bloqueo:
+            registros.to_sql(name=self.tabla, con=self.engine, if_exists='append', index=False)
+        return len(registros)
+
+
+def crear_destino(destino, engine=None):
+    """
+    'tabla' o 'tabla:<nombre>' → RechazosTabla en la misma base de datos;
+    cualquier otro valor es la ruta de un CSV
+    """
+    destino = str(destino)
+    if destino == 'tabla' or destino.startswith('tabla:'):
+        if engine is None:
+            raise ValueError("Para guardar los rechazos en una tabla se necesita el engine")
+        return RechazosTabla(engine, destino.partition(':')[2] or TABLA_RECHAZOS_POR_DEFECTO)
+    return RechazosArchivo(destino)
@@ -0,0 +1,165 @@
+import os
+import glob
+import logging
+import threading
+from pathlib import Path
+
+from cache_hojas import PYARROW_DISPONIBLE, preparar_para_parquet
+from confiabilidad import INICIO, TABLA_INTERRUPCIONES, mes
+from fechas import periodo_archivo
+from manifiesto import DESTINO_BD
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# SALIDAS EN ARCHIVOS PARTICIONADOS (PARQUET / CSV)
+# =============================================================================
+#
+# Además de SQL Server (o en su lugar) cada hoja limpia se puede escribir en archivos
+# particionados por tabla y mes, que los analistas leen directo sin SELECT * por la red:
+#
+#   <carpeta>/<tabla>/mes=AAAA-MM/<libro>-0001.parquet       (tablas con fecha: mes de cada fila)
+#   <carpeta>/<tabla>/periodo=<periodo>/<libro>-0001.parquet (resto: periodo del nombre del libro)
+#
+# Las salidas se escriben en la misma pasada que la carga, sin volver a leer el Excel,
+# con las filas que la base de datos aceptó (sin base de datos, la hoja completa)
+# Cada hoja, porción o bloque escrito es una parte nueva del libro. La primera vez que
+# una salida escribe un libro en la corrida borra las partes de cargas anteriores: volver
+# a cargar un archivo reemplaza sus archivos en lugar de duplicar filas
+
+SALIDA_SQL = 'sql'
+CARPETA_SALIDAS_POR_DEFECTO = Path('salidas')
+
+# Columna de fecha que define la partición mensual de cada tabla
+COLUMNA_MES = {TABLA_INTERRUPCIONES: INICIO}
+SIN_FECHA = 'sin_fecha'
+
+
+class SalidaArchivos:
+    """
+    Escribe hojas limpias en archivos particionados por tabla y mes (o periodo del libro)
+    Las subclases implementan `_escribir_archivo`
+    """
+
+    formato = None
+    extension = None
+
+    def __init__(self, carpeta):
+        self.carpeta = Path(carpeta)
+        self._partes = {}   # (tabla, libro) → partes escritas en esta corrida
+        # Con cargas concurrentes varias hojas y porciones escriben a la vez
+        self._bloqueo = threading.Lock()
+
+    @property
+    def descripcion(self):
+        return f"{self.formato} en {self.carpeta}"
+
+    @property
+    def destino(self):
+        """Clave de la salida en el manifiesto de cargas"""
+        return f"{self.formato}:{self.carpeta.as_posix()}"
+
+    def _particiones(self, df, tabla, archivo):
+        """(carpeta de partición, filas) de un DataFrame"""
+        columna = COLUMNA_MES.get(tabla)
+        if columna is None or columna not in df.columns:
+            yield f"periodo={periodo_archivo(archivo)}", df
+            return
+        meses = mes(df[columna]).fillna(SIN_FECHA)
+        for valor, filas in df.groupby(meses.to_numpy(), sort=True):
+            yield f"mes={valor}", filas
+
+    def _siguiente_parte(self, tabla, libro):
+        with self._bloqueo:
+            if (tabla, libro) not in self._partes:
+                patron = f"*/{glob.escape(libro)}-[0-9][0-9][0-9][0-9]{self.extension}"
+                for anterior in (self.carpeta / tabla).glob(patron):
+                    anterior.unlink()
+                self._partes[(tabla, libro)] = 0
+            self._partes[(tabla, libro)] += 1
+            return self._partes[(tabla, libro)]
+
+    def escribir(self, df, tabla, archivo=None, hoja=None):
+        """Escribe las filas de `tabla` que vienen del libro `archivo`; retorna cuántas"""
+        libro = Path(str(archivo or tabla)).stem
+        parte = self._siguiente_parte(tabla, libro)
+        if not len(df):
+            return 0
+        for particion, filas in self._particiones(df, tabla, libro):
+            ruta = self.carpeta / tabla / particion / f"{libro}-{parte:04d}{self.extension}"
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: quien lee la carpeta nunca ve un archivo a medias
+            temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+            try:
+                self._escribir_archivo(filas, temporal)
+                os.replace(temporal, ruta)
+            finally:
+                temporal.unlink(missing_ok=True)
+        return len(df)
+
+    def _escribir_archivo(self, df, ruta):
+        raise NotImplementedError
+
+
+class SalidaParquet(SalidaArchivos):
+    """Parquet (pyarrow): columnar, con tipos; se lee con pandas, pyarrow, DuckDB o Power BI"""
+
+    formato = 'parquet'
+    extension = '.parquet'
+
+    def __init__(self, carpeta):
+        if not PYARROW_DISPONIBLE:
+            raise ValueError("La salida parquet requiere pyarrow (pip install pyarrow)")
+        super().__init__(carpeta)
+
+    def _escribir_archivo(self, df, ruta):
+        preparar_para_parquet(df).to_parquet(ruta, engine='pyarrow', index=False)
+
+
+class SalidaCSV(SalidaArchivos):
+    """CSV UTF-8 con BOM (se abre directo en Excel), fechas ISO y nulos como campo vacío"""
+
+    formato = 'csv'
+    extension = '.csv'
+
+    def _escribir_archivo(self, df, ruta):
+        df.to_csv(ruta, index=False, encoding='utf-8-sig')
+
+
+SALIDAS = {
+    SalidaParquet.formato: SalidaParquet,
+    SalidaCSV.formato: SalidaCSV,
+}
+
+
+def incluye_sql(especificaciones):
+    """True si las salidas incluyen la base de datos (sin salidas: solo la base de datos)"""
+    return not especificaciones or any(
+        str(especificacion).partition(':')[0].strip().lower() == SALIDA_SQL for especificacion in especificaciones
+    )
+
+
+def crear_salidas(especificaciones):
+    """
+    ['sql', 'parquet[:CARPETA]', 'csv[:CARPETA]'] → (con SQL, [salidas de archivos])
+    Sin carpeta los archivos van a salidas/parquet o salidas/csv
+    """
+    salidas = []
+    for especificacion in especificaciones or []:
+        formato, _, carpeta = str(especificacion).partition(':')
+        formato = formato.strip().lower()
+        if formato == SALIDA_SQL:
+            continue
+        if formato not in SALIDAS:
+            raise ValueError(
+                f"Salida '{especificacion}' no reconocida. Opciones: {SALIDA_SQL}, "
+                + ", ".join(f"{nombre}[:CARPETA]" for nombre in SALIDAS)
+            )
+        salidas.append(SALIDAS[formato](carpeta or CARPETA_SALIDAS_POR_DEFECTO / formato))
+    return incluye_sql(especificaciones), salidas
+
+
+def destinos_manifiesto(especificaciones):
+    """Destinos de las salidas como claves del manifiesto: ['sql', 'parquet:salidas/parquet', ...]"""
+    con_sql, salidas = crear_salidas(especificaciones)
+    return ([DESTINO_BD] if con_sql else []) + [salida.destino for salida in salidas]
@@ -0,0 +1,195 @@
+import threading
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from cargadores import CARGADORES, COLUMNA_ERROR, CargadorUpsert, asegurar_indices, obtener_cargador
+
+# =============================================================================
+# CARGADORES CONTRA SQLITE (SUSTITUTO LOCAL DE SQL SERVER)
+# =============================================================================
+#
+# Cada estrategia de CARGADORES se ejecuta contra un archivo SQLite. La restricción
+# CHECK de 'KVA' hace que la base de datos rechace filas concretas, como un
+# DECIMAL(p, s) desbordado en SQL Server, para probar el aislamiento por bisección
+
+TABLA = 'Carga'
+LIMITE_KVA = 99.9999
+ESTRATEGIAS = sorted(CARGADORES)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prueba.db'}")
+    with engine.begin() as conexion:
+        conexion.execute(text(
+            f'CREATE TABLE "{TABLA}" ('
+            f'"Código" TEXT NOT NULL, "KVA" REAL CHECK ("KVA" <= {LIMITE_KVA}), '
+            f'"Fecha" TIMESTAMP, "Propietario" TEXT)'
+        ))
+    yield engine
+    engine.dispose()
+
+
+def hoja(filas=50, invalidas=()):
+    """Hoja limpia de `filas` filas; las posiciones en `invalidas` no caben en 'KVA'"""
+    df = pd.DataFrame({
+        'Código': [f"CT{i}" for i in range(filas)],
+        'KVA': [float(i % 90) for i in range(filas)],
+        'Fecha': pd.date_range('2025-08-01', periods=filas, freq='h'),
+        'Propietario': ['RECO' if i % 2 else None for i in range(filas)],
+    })
+    df.loc[list(invalidas), 'KVA'] = 150.5
+    return df
+
+
+def contar(engine, tabla=TABLA):
+    with engine.connect() as conexion:
+        return conexion.execute(text(f'SELECT COUNT(*) FROM "{tabla}"')).scalar()
+
+
+@pytest.mark.parametrize('estrategia', ESTRATEGIAS)
+def test_carga_todas_las_filas(engine, estrategia):
+    df = hoja()
+    metricas = obtener_cargador(estrategia).cargar(df, TABLA, engine)
+
+    assert metricas['estrategia'] == estrategia
+    assert metricas['filas'] == len(df)
+    assert metricas['rechazadas'].empty
+    with engine.connect() as conexion:
+        cargadas = pd.read_sql(f'SELECT * FROM "{TABLA}" ORDER BY rowid', conexion)
+    assert cargadas['Código'].tolist() == df['Código'].tolist()
+    assert cargadas['KVA'].tolist() == df['KVA'].tolist()
+    assert cargadas['Propietario'].isna().sum() == df['Propietario'].isna().sum()
+
+
+@pytest.mark.parametrize('estrategia', ESTRATEGIAS)
+def test_biseccion_aisla_las_filas_rechazadas(engine, estrategia):
+    invalidas = [0, 17, 18, 49]
+    df = hoja(invalidas=invalidas)
+    metricas = obtener_cargador(estrategia).cargar(df, TABLA, engine)
+
+    rechazadas = metricas['rechazadas']
+    assert rechazadas.index.tolist() == invalidas
+    assert rechazadas[COLUMNA_ERROR].str.contains('CHECK').all()
+    assert metricas['filas'] == len(df) - len(invalidas)
+    assert contar(engine) == len(df) - len(invalidas)
+
+
+@pytest.mark.parametrize('estrategia', ESTRATEGIAS)
+def test_sin_aislamiento_no_deja_filas_a_medias(engine, estrategia):
+    cargador = obtener_cargador(estrategia)
+    cargador.max_rechazos = 0
+
+    with pytest.raises(Exception):
+        cargador.cargar(hoja(invalidas=[30]), TABLA, engine)
+    assert contar(engine) == 0
+
+
+def test_demasiados_rechazos_detienen_la_carga(engine):
+    cargador = obtener_cargador('executemany')
+    cargador.max_rechazos = 2
+
+    with pytest.raises(RuntimeError, match="Más de 2 filas rechazadas"):
+        cargador.cargar(hoja(invalidas=[1, 2, 3, 4]), TABLA, engine)
+
+
+@pytest.mark.parametrize('estrategia', ESTRATEGIAS)
+def test_carga_dentro_de_una_transaccion_se_revierte(engine, estrategia):
+    # Carga atómica de un archivo: los cargadores escriben en la conexión de la transacción
+    with engine.connect() as conexion:
+        transaccion = conexion.begin()
+        obtener_cargador(estrategia).cargar(hoja(), TABLA, conexion)
+        assert conexion.execute(text(f'SELECT COUNT(*) FROM "{TABLA}"')).scalar() == 50
+        transaccion.rollback()
+    assert contar(engine) == 0
+
+
+def test_porciones_concurrentes_crean_la_tabla_una_vez(engine):
+    df = hoja(filas=400)
+    errores = []
+
+    def cargar(porcion):
+        try:
+            obtener_cargador('executemany').cargar(porcion, 'Nueva', engine)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=cargar, args=(df.iloc[i::4],)) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert not errores
+    assert contar(engine, 'Nueva') == len(df)
+
+# =============================================================================
+# UPSERT
+# =============================================================================
+def test_upsert_repetido_no_cambia_nada(engine):
+    cargador = CargadorUpsert({TABLA: ['Código']})
+    df = hoja(filas=20)
+
+    primera = cargador.cargar(df, TABLA, engine)
+    segunda = cargador.cargar(df, TABLA, engine)
+
+    assert primera['insertadas'] == 20
+    assert (segunda['insertadas'], segunda['actualizadas'], segunda['sin_cambios']) == (0, 0, 20)
+    assert contar(engine) == 20
+
+
+def test_upsert_actualiza_solo_las_filas_modificadas(engine):
+    cargador = CargadorUpsert({TABLA: ['Código']})
+    df = hoja(filas=20)
+    cargador.cargar(df, TABLA, engine)
+
+    corregida = pd.concat([df, hoja(filas=21).tail(1)], ignore_index=True)
+    corregida.loc[3, 'Propietario'] = 'USUARIO (PRIVADO)'
+    metricas = cargador.cargar(corregida, TABLA, engine)
+
+    assert (metricas['insertadas'], metricas['actualizadas'], metricas['sin_cambios']) == (1, 1, 19)
+    with engine.connect() as conexion:
+        propietario = conexion.execute(
+            text(f'SELECT "Propietario" FROM "{TABLA}" WHERE "Código" = :codigo'), {'codigo': 'CT3'}
+        ).scalar()
+    assert propietario == 'USUARIO (PRIVADO)'
+    assert contar(engine) == 21
+
+
+def test_upsert_omite_filas_sin_llave_y_repetidas(engine):
+    df = hoja(filas=10)
+    df.loc[2, 'Código'] = None
+    df = pd.concat([df, df.tail(1)], ignore_index=True)
+
+    metricas = CargadorUpsert({TABLA: ['Código']}).cargar(df, TABLA, engine)
+
+    assert metricas['omitidas'] == 2
+    assert contar(engine) == 9
+
+# =============================================================================
+# TABLAS CREADAS POR EL ETL E ÍNDICES
+# =============================================================================
+def test_tabla_creada_con_longitudes_del_esquema(engine):
+    hija = pd.DataFrame({'ID_Interrupcion': ['INT-1'], 'Código de equipo': ['EQ-A'], 'Posición': [1]})
+    obtener_cargador('executemany').cargar(hija, 'Interrupciones Equipos', engine)
+
+    columnas = {col['name']: str(col['type']) for col in inspect(engine).get_columns('Interrupciones Equipos')}
+    assert columnas['ID_Interrupcion'] == 'NVARCHAR(50)'
+    assert columnas['Código de equipo'] == 'NVARCHAR(100)'
+    assert asegurar_indices(engine, 'Interrupciones Equipos', [['Código de equipo', 'ID_Interrupcion']]) == [
+        'IX_Interrupciones_Equipos_Código_de_equipo_ID_Interrupcion'
+    ]
+
+
+def test_indice_fallido_no_propaga_el_error(engine, caplog):
+    # Otra tabla ya usa el nombre del índice de 'Código': su CREATE INDEX falla
+    with engine.begin() as conexion:
+        conexion.execute(text('CREATE TABLE "Otra" ("x" TEXT)'))
+        conexion.execute(text('CREATE INDEX "IX_Carga_Código" ON "Otra" ("x")'))
+
+    creados = asegurar_indices(engine, TABLA, [['Código'], ['KVA']])
+
+    assert creados == ['IX_Carga_KVA']
+    assert "No se pudo crear el índice 'IX_Carga_Código'" in caplog.text
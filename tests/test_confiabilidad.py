@@ -0,0 +1,94 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from confiabilidad import TABLA_INTERRUPCIONES, TABLA_RESUMEN, TODOS, actualizar_resumen, resumir_interrupciones
+
+# =============================================================================
+# RESUMEN MENSUAL DE INTERRUPCIONES (SQLITE)
+# =============================================================================
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'confiabilidad.db'}")
+    yield engine
+    engine.dispose()
+
+
+def interrupciones(*filas):
+    """Interrupciones con filas (ID, inicio, minutos, lista de equipos)"""
+    inicio = pd.to_datetime([fila[1] for fila in filas])
+    return pd.DataFrame({
+        'ID_Interrupcion': [fila[0] for fila in filas],
+        'Fecha y Hora_Inicio': inicio,
+        'Fecha y Hora_Cierre': inicio + pd.to_timedelta([fila[2] for fila in filas], unit='min'),
+        'Causa': 'FALLA',
+        'Origen del evento': 'DISTRIBUCION',
+        'Código de Equipo': [fila[3] for fila in filas],
+    })
+
+
+MARZO_Y_ABRIL = interrupciones(
+    ('INT-1', '2025-03-01 10:00', 30, 'EQ-A, EQ-B'),
+    ('INT-2', '2025-03-15 08:00', 60, 'EQ-A'),
+    ('INT-3', '2025-04-02 12:00', 10, 'EQ-C'),
+)
+
+
+def resumen_guardado(engine):
+    resumen = pd.read_sql(f'SELECT * FROM "{TABLA_RESUMEN}"', engine)
+    return resumen.set_index(['Mes', 'Código de equipo'])[['Interrupciones', 'Minutos']]
+
+
+def test_una_fila_por_equipo_y_una_con_el_total():
+    resumen = resumir_interrupciones(MARZO_Y_ABRIL).set_index(['Mes', 'Código de equipo'])
+
+    assert resumen.loc[('2025-03', 'EQ-A'), 'Interrupciones'] == 2
+    assert resumen.loc[('2025-03', 'EQ-B'), 'Minutos'] == 30
+    # INT-1 tiene dos equipos pero en el total cuenta una vez
+    assert resumen.loc[('2025-03', TODOS), 'Interrupciones'] == 2
+    assert resumen.loc[('2025-03', TODOS), 'Minutos'] == 90
+
+
+def test_solo_se_reemplazan_los_meses_indicados(engine):
+    MARZO_Y_ABRIL.to_sql(TABLA_INTERRUPCIONES, engine, index=False)
+    actualizar_resumen(engine)
+
+    # Llega una interrupción de marzo; abril no se recalcula aunque la tabla cambie
+    nuevas = interrupciones(('INT-4', '2025-03-20 09:00', 15, 'EQ-A'), ('INT-5', '2025-04-09 09:00', 5, 'EQ-C'))
+    nuevas.to_sql(TABLA_INTERRUPCIONES, engine, index=False, if_exists='append')
+    resultado = actualizar_resumen(engine, ['2025-03'])
+
+    resumen = resumen_guardado(engine)
+    assert resultado['meses'] == 1 and resultado['filas_borradas'] == 3
+    assert resumen.loc[('2025-03', 'EQ-A'), 'Interrupciones'] == 3
+    assert resumen.loc[('2025-04', 'EQ-C'), 'Interrupciones'] == 1
+    assert len(resumen) == 5
+
+
+def test_reconstruccion_completa_quita_meses_sin_interrupciones(engine):
+    MARZO_Y_ABRIL.to_sql(TABLA_INTERRUPCIONES, engine, index=False)
+    actualizar_resumen(engine)
+
+    with engine.begin() as conexion:
+        conexion.execute(text(f'DELETE FROM "{TABLA_INTERRUPCIONES}" WHERE "ID_Interrupcion" = \'INT-3\''))
+    actualizar_resumen(engine)
+
+    assert resumen_guardado(engine).index.get_level_values('Mes').unique().tolist() == ['2025-03']
+
+
+@pytest.mark.parametrize('meses', [['2025-03'], None])
+def test_insercion_fallida_conserva_el_resumen(engine, meses):
+    MARZO_Y_ABRIL.to_sql(TABLA_INTERRUPCIONES, engine, index=False)
+    actualizar_resumen(engine)
+    antes = resumen_guardado(engine)
+
+    with engine.begin() as conexion:
+        conexion.execute(text(
+            f'CREATE TRIGGER sin_insercion BEFORE INSERT ON "{TABLA_RESUMEN}" '
+            f"BEGIN SELECT RAISE(ABORT, 'insercion bloqueada'); END"
+        ))
+    with pytest.raises(Exception, match='insercion bloqueada'):
+        actualizar_resumen(engine, meses)
+
+    pd.testing.assert_frame_equal(resumen_guardado(engine), antes)
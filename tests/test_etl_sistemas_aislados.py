@@ -0,0 +1,107 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from cargadores import CargadorUpsert
+from confiabilidad import actualizar_resumen
+from configuracion import Configuracion
+from etl_sistemas_aislados import LLAVES_NATURALES, Pipeline, cargar_en_destinos, meses_cargados
+
+# =============================================================================
+# CARGA DE UNA HOJA CON SUS TABLAS HIJAS (SQLITE)
+# =============================================================================
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    yield engine
+    engine.dispose()
+
+
+def interrupciones(*filas):
+    """Hoja limpia de Interrupciones con filas (ID_Interrupcion, inicio, lista de equipos)"""
+    return pd.DataFrame({
+        'ID_Interrupcion': [fila[0] for fila in filas],
+        'Fecha y Hora_Inicio': pd.to_datetime([fila[1] for fila in filas]),
+        'Fecha y Hora_Cierre': pd.to_datetime([fila[1] for fila in filas]) + pd.Timedelta(minutes=30),
+        'Causa': 'FALLA',
+        'Origen del evento': 'DISTRIBUCION',
+        'Código de Equipo': [fila[2] for fila in filas],
+    })
+
+
+def leer(engine, tabla, orden):
+    return pd.read_sql(f'SELECT * FROM "{tabla}" ORDER BY {orden}', engine)
+
+
+def test_upsert_no_carga_equipos_de_la_llave_repetida_descartada(engine):
+    df = interrupciones(
+        ('INT-1', '2025-03-01 10:00', 'EQ-A, EQ-B'),
+        ('INT-2', '2025-03-02 10:00', 'EQ-C'),
+        ('INT-1', '2025-04-05 08:00', 'EQ-D'),
+    )
+    metricas_carga, rechazadas, hijas = cargar_en_destinos(
+        df, 'Interrupciones', engine, 'append', CargadorUpsert(LLAVES_NATURALES), 'libro.xlsx', 'Interrupciones'
+    )
+
+    assert (metricas_carga['omitidas'], rechazadas) == (1, 0)
+    assert metricas_carga['indice_omitidas'].tolist() == [0]
+    padre = leer(engine, 'Interrupciones', '"ID_Interrupcion"')
+    assert padre['Código de Equipo'].tolist() == ['EQ-D', 'EQ-C']
+    puente = leer(engine, 'Interrupciones Equipos', '"ID_Interrupcion", "Posición"')
+    assert list(zip(puente['ID_Interrupcion'], puente['Código de equipo'])) == [('INT-1', 'EQ-D'), ('INT-2', 'EQ-C')]
+    assert hijas['Interrupciones Equipos']['filas'] == 2
+
+# =============================================================================
+# MESES DEL RESUMEN DE CONFIABILIDAD
+# =============================================================================
+def test_upsert_recalcula_el_mes_que_deja_una_interrupcion_corregida(engine):
+    cargador = CargadorUpsert(LLAVES_NATURALES)
+    original = interrupciones(('INT-1', '2025-03-01 10:00', 'EQ-A'), ('INT-2', '2025-03-02 10:00', 'EQ-B'))
+    metricas_carga, _, _ = cargar_en_destinos(
+        original, 'Interrupciones', engine, 'append', cargador, 'libro.xlsx', 'Interrupciones'
+    )
+    actualizar_resumen(engine, meses_cargados(original, metricas_carga, 'Interrupciones'))
+
+    # El reenvío corrige el inicio de INT-1: pasa de marzo a abril
+    corregido = interrupciones(('INT-1', '2025-04-01 10:00', 'EQ-A'))
+    metricas_carga, _, _ = cargar_en_destinos(
+        corregido, 'Interrupciones', engine, 'append', cargador, 'libro.xlsx', 'Interrupciones'
+    )
+    meses = meses_cargados(corregido, metricas_carga, 'Interrupciones')
+    actualizar_resumen(engine, meses)
+
+    assert meses == ['2025-03', '2025-04']
+    resumen = leer(engine, 'Resumen Confiabilidad', '"Mes", "Código de equipo"')
+    totales = resumen[resumen['Código de equipo'] == '(todos)'].set_index('Mes')['Interrupciones']
+    assert totales.to_dict() == {'2025-03': 1, '2025-04': 1}
+
+# =============================================================================
+# MANIFIESTO POR DESTINO
+# =============================================================================
+def test_hoja_escrita_solo_en_parquet_sigue_pendiente_para_sql(engine, tmp_path):
+    pytest.importorskip('pyarrow')
+    carpeta = tmp_path / 'excel'
+    carpeta.mkdir()
+    pd.DataFrame({
+        'Codigo de Equipo': ['EQ-1', 'EQ-2'],
+        'Tipo de Equipo': 'Cuchilla',
+        'Codigo de Equipo Aguas Arriba': [None, 'EQ-1'],
+    }).to_excel(carpeta / 'Plantilla_AGOSTO.xlsx', sheet_name='Equipos de maniobras', index=False)
+    opciones = dict(
+        configuracion=Configuracion(carpeta_excel=str(carpeta), carpeta_logs=str(tmp_path)),
+        usar_cache=False, manifiesto=tmp_path / 'manifiesto.json', topologia=False, resumen=False,
+    )
+    clave = 'Plantilla_AGOSTO.xlsx - Equipos de maniobras'
+
+    solo_archivos = Pipeline(salidas=[f"parquet:{tmp_path / 'salidas'}"], **opciones).ejecutar()
+    assert solo_archivos[clave]['estado'] == 'éxito'
+    assert not inspect(engine).has_table('Equipos de maniobras')
+
+    con_sql = Pipeline(engine=engine, **opciones).ejecutar()
+    assert con_sql[clave]['estado'] == 'éxito'
+    assert len(leer(engine, 'Equipos de maniobras', '"Código de Equipo"')) == 2
+
+    # Ya está en los dos destinos: la hoja no se vuelve a cargar en ninguno
+    ambos = Pipeline(salidas=['sql', f"parquet:{tmp_path / 'salidas'}"], engine=engine, **opciones).ejecutar()
+    assert clave not in ambos
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import fechas
+from esquemas import quitar_tokens_nulos
+from fechas import detectar_formatos, formatos_conocidos, parsear_fechas
+from perfilador import perfilar_hoja
+
+TOKENS = ['N/A', '-']
+
+
+@pytest.fixture(autouse=True)
+def sin_formatos_detectados():
+    fechas._formatos_por_fuente.clear()
+    yield
+    fechas._formatos_por_fuente.clear()
+
+
+def textos(*valores):
+    return pd.Series(valores, dtype=object)
+
+# =============================================================================
+# DETECCIÓN DE FORMATOS
+# =============================================================================
+def test_detecta_cada_formato_presente():
+    formatos = detectar_formatos(textos('15/11/2024 07:56', '16/11/2024 08:10', '2024-11-17'))
+    assert formatos == ['%d/%m/%Y %H:%M', '%Y-%m-%d']
+
+
+def test_dia_antes_que_mes():
+    resultado, fallidas = parsear_fechas(textos('03/04/2024', '13/04/2024'), 'Inicio')
+    assert resultado.tolist() == [pd.Timestamp('2024-04-03'), pd.Timestamp('2024-04-13')]
+    assert not fallidas.any()
+
+
+def test_formatos_se_guardan_por_fuente():
+    with fechas.fuente('Plantilla_RECO_AGOSTO_2025.xlsx'):
+        parsear_fechas(textos('15/08/2025 07:56'), 'Inicio')
+    # Otro mes de la misma plantilla comparte los formatos ya detectados
+    assert formatos_conocidos('Inicio', 'plantilla_reco') == ['%d/%m/%Y %H:%M']
+
+# =============================================================================
+# ÚLTIMO RECURSO (INFERENCIA DE PANDAS)
+# =============================================================================
+def test_ultimo_recurso_no_intercambia_campos():
+    resultado, fallidas = parsear_fechas(textos('2025-13-01', '15/08/2025', '16-Jul-2025'), 'Inicio')
+    assert pd.isna(resultado[0])
+    assert fallidas.tolist() == [True, False, False]
+    assert resultado[2] == pd.Timestamp('2025-07-16')
+
+
+def test_ultimo_recurso_rechaza_zona_horaria():
+    resultado, fallidas = parsear_fechas(textos('2025-08-01T10:00:00Z', '2025-08-02'), 'Inicio')
+    assert pd.isna(resultado[0]) and fallidas[0]
+    assert resultado[1] == pd.Timestamp('2025-08-02')
+
+# =============================================================================
+# COLUMNAS MEZCLADAS
+# =============================================================================
+def test_columna_mezclada_conserva_fechas_y_seriales():
+    serie = textos(datetime(2024, 3, 4, 10, 0), 45356.5, ' N/A ', '05/03/2024 08:00', None)
+    limpia, tokens = quitar_tokens_nulos(serie, TOKENS)
+
+    assert tokens == 1
+    assert isinstance(limpia[0], datetime) and limpia[1] == 45356.5
+    resultado, fallidas = parsear_fechas(limpia, 'Inicio', TOKENS)
+    assert resultado.tolist()[:4] == [
+        pd.Timestamp('2024-03-04 10:00'), pd.Timestamp('2024-03-05 12:00'), pd.NaT, pd.Timestamp('2024-03-05 08:00'),
+    ]
+    assert not fallidas.any()
+
+
+def test_perfilador_no_convierte_a_texto_las_columnas_de_fecha():
+    hoja = pd.DataFrame({
+        'ID_Interrupcion': ['INT-1', 'INT-2', 'INT-3'],
+        'Fecha y Hora_Inicio': textos(datetime(2024, 3, 4, 10, 0), 45356.5, 'N/A'),
+    })
+    reporte = perfilar_hoja(hoja, 'Interrupciones')
+
+    assert reporte.valores['Fecha y Hora_Inicio'][0] == datetime(2024, 3, 4, 10, 0)
+    assert 'Fecha y Hora_Inicio' not in reporte.texto_limpio
+    convertida = reporte.convertidas['Fecha y Hora_Inicio']
+    assert convertida.tolist()[:2] == [pd.Timestamp('2024-03-04 10:00'), pd.Timestamp('2024-03-05 12:00')]
+    assert pd.isna(convertida[2])
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from integridad import LlavesBaseDatos, VerificadorIntegridad, verificar_hojas
+
+# =============================================================================
+# HUÉRFANOS Y LLAVES REPETIDAS DENTRO DEL ARCHIVO
+# =============================================================================
+
+
+def equipos(*filas):
+    """Hoja limpia de Equipos de maniobras con filas (código, equipo aguas arriba)"""
+    return pd.DataFrame(filas, columns=['Código de equipo', 'Codigo de Equipo Aguas Arriba'])
+
+
+def interrupciones(*filas):
+    """Hoja limpia de Interrupciones con filas (ID_Interrupcion, lista de equipos)"""
+    return pd.DataFrame(filas, columns=['ID_Interrupcion', 'Código de Equipo'])
+
+
+def test_codigos_de_la_lista_que_no_estan_en_equipos():
+    reporte = verificar_hojas({
+        'Equipos de maniobras': equipos(('EQ-1', None), ('EQ-2', 'eq-1')),
+        'Interrupciones': interrupciones(
+            ('INT-1', 'EQ-1, EQ-9'), ('INT-2', 'eq-2'), ('INT-3', 'EQ-9, EQ-9'), ('INT-4', 'EQ-8'),
+        ),
+    })
+
+    # Sin distinguir mayúsculas; EQ-9 repetido en una celda cuenta una vez por fila
+    huerfano = reporte.huerfanos[('Interrupciones', 'Código de Equipo')]
+    assert (huerfano['codigos'], huerfano['filas']) == (2, 3)
+    assert sorted(huerfano['ejemplos']) == ['EQ-8', 'EQ-9']
+    assert huerfano['filas_excel'] == [2, 5]
+    assert ('Equipos de maniobras', 'Codigo de Equipo Aguas Arriba') not in reporte.huerfanos
+    assert reporte.total_huerfanos == 2
+
+
+def test_llaves_repetidas_entre_bloques():
+    verificador = VerificadorIntegridad()
+    verificador.agregar('Equipos de maniobras', equipos(('EQ-1', None), ('EQ-2', 'EQ-1'), ('eq-1', None)))
+    # El segundo bloque sigue el índice de la hoja
+    verificador.agregar('Equipos de maniobras', equipos(('EQ-2', None), ('EQ-3', None)).set_axis([3, 4]))
+    duplicada = verificador.reporte().duplicadas['Equipos de maniobras']
+
+    assert (duplicada['llave'], duplicada['repetidas']) == ('Código de equipo', 2)
+    assert duplicada['ejemplos'] == ['EQ-1', 'EQ-2']
+    assert duplicada['filas_excel'] == [4, 5]
+
+
+def test_sin_la_hoja_referida_la_referencia_se_omite():
+    reporte = verificar_hojas({'Interrupciones': interrupciones(('INT-1', 'EQ-1'))})
+
+    assert not reporte.huerfanos
+    assert reporte.omitidas == ['Interrupciones.Código de Equipo']
+
+# =============================================================================
+# LLAVES QUE YA ESTÁN EN LA BASE DE DATOS (SQLITE)
+# =============================================================================
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'integridad.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_codigos_cargados_antes_no_son_huerfanos(engine):
+    equipos(('EQ-1', None), ('EQ-2 ', 'EQ-1')).to_sql('Equipos de maniobras', engine, index=False)
+    llaves_bd = LlavesBaseDatos(engine)
+
+    reporte = verificar_hojas({
+        'Equipos de maniobras': equipos(('EQ-2', None), ('EQ-3', 'EQ-1')),
+        'Interrupciones': interrupciones(('INT-1', 'eq-2, EQ-3'), ('INT-2', 'EQ-4')),
+    }, llaves_bd)
+
+    assert reporte.huerfanos[('Interrupciones', 'Código de Equipo')]['ejemplos'] == ['EQ-4']
+    # EQ-2 ya estaba en la tabla (con espacio sobrante): append lo duplicaría
+    assert reporte.existentes == {'Equipos de maniobras': 1}
+    assert not reporte.omitidas
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from salidas import SalidaCSV, SalidaParquet, crear_salidas, destinos_manifiesto
+
+# =============================================================================
+# PARTICIONES POR TABLA Y MES (O PERIODO DEL LIBRO)
+# =============================================================================
+
+
+def partes(carpeta, tabla):
+    """Rutas de las partes de una tabla, relativas a su carpeta"""
+    return sorted(ruta.relative_to(carpeta / tabla).as_posix() for ruta in (carpeta / tabla).rglob('*.csv'))
+
+
+def test_interrupciones_por_mes_y_el_resto_por_periodo(tmp_path):
+    salida = SalidaCSV(tmp_path)
+    interrupciones = pd.DataFrame({
+        'ID_Interrupcion': ['INT-1', 'INT-2', 'INT-3'],
+        'Fecha y Hora_Inicio': pd.to_datetime(['2025-08-30 10:00', '2025-09-01 08:00', None]),
+    })
+    centros = pd.DataFrame({'Código Centro de transformación MT/BT': ['CT-1']})
+
+    assert salida.escribir(interrupciones, 'Interrupciones', 'Plantilla_AGOSTO_2025.xlsx') == 3
+    salida.escribir(centros, 'Centro MTBT', 'Plantilla_AGOSTO_2025.xlsx')
+
+    assert partes(tmp_path, 'Interrupciones') == [
+        'mes=2025-08/Plantilla_AGOSTO_2025-0001.csv',
+        'mes=2025-09/Plantilla_AGOSTO_2025-0001.csv',
+        'mes=sin_fecha/Plantilla_AGOSTO_2025-0001.csv',
+    ]
+    assert partes(tmp_path, 'Centro MTBT') == ['periodo=2025-08/Plantilla_AGOSTO_2025-0001.csv']
+    septiembre = pd.read_csv(tmp_path / 'Interrupciones' / 'mes=2025-09' / 'Plantilla_AGOSTO_2025-0001.csv')
+    assert septiembre['ID_Interrupcion'].tolist() == ['INT-2']
+
+# =============================================================================
+# PARTES DE CARGAS ANTERIORES
+# =============================================================================
+def test_nueva_carga_del_libro_reemplaza_sus_partes(tmp_path):
+    bloque = pd.DataFrame({'Código de equipo': ['EQ-1', 'EQ-2']})
+    primera = SalidaCSV(tmp_path)
+    # Dos bloques de la misma hoja en una corrida: dos partes
+    primera.escribir(bloque, 'Equipos de maniobras', 'Plantilla_AGOSTO.xlsx')
+    primera.escribir(bloque, 'Equipos de maniobras', 'Plantilla_AGOSTO.xlsx')
+    primera.escribir(bloque, 'Equipos de maniobras', 'Plantilla_SEPTIEMBRE.xlsx')
+    assert len(partes(tmp_path, 'Equipos de maniobras')) == 3
+
+    # La corrida siguiente vuelve a cargar AGOSTO con una sola fila
+    SalidaCSV(tmp_path).escribir(bloque.head(1), 'Equipos de maniobras', 'Plantilla_AGOSTO.xlsx')
+
+    assert partes(tmp_path, 'Equipos de maniobras') == [
+        'periodo=agosto/Plantilla_AGOSTO-0001.csv', 'periodo=septiembre/Plantilla_SEPTIEMBRE-0001.csv',
+    ]
+    tabla = pd.concat(pd.read_csv(ruta) for ruta in (tmp_path / 'Equipos de maniobras').rglob('*.csv'))
+    assert len(tabla) == 3
+
+
+def test_hoja_vacia_tambien_borra_las_partes_anteriores(tmp_path):
+    hoja = pd.DataFrame({'Código de equipo': ['EQ-1']})
+    SalidaCSV(tmp_path).escribir(hoja, 'Equipos de maniobras', 'Libro.xlsx')
+    assert SalidaCSV(tmp_path).escribir(hoja.head(0), 'Equipos de maniobras', 'Libro.xlsx') == 0
+    assert partes(tmp_path, 'Equipos de maniobras') == []
+
+# =============================================================================
+# ESPECIFICACIONES DE --salida
+# =============================================================================
+def test_especificaciones_de_salida():
+    pytest.importorskip('pyarrow')
+    con_sql, salidas = crear_salidas(['parquet:datos', 'CSV'])
+
+    assert not con_sql
+    assert [(type(salida), salida.carpeta) for salida in salidas] == [
+        (SalidaParquet, Path('datos')), (SalidaCSV, Path('salidas') / 'csv'),
+    ]
+    assert destinos_manifiesto(['sql', 'csv']) == ['sql', 'csv:salidas/csv']
+    with pytest.raises(ValueError, match='no reconocida'):
+        crear_salidas(['excel'])
@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from topologia import CENTROS, EQUIPOS, TABLA_TOPOLOGIA, IndiceTopologia, actualizar_topologia, construir_topologia
+
+# =============================================================================
+# ÍNDICE DE EULER SOBRE LOS ENLACES AGUAS ARRIBA
+# =============================================================================
+#
+#   EQ-1 ── EQ-2 ── CT-1 (50 KVA)
+#       │       └── CT-2 (25 KVA)
+#       └── EQ-3 ── CT-3 (10 KVA)
+#   EQ-9 (otro árbol, sin centros)
+
+
+def equipos(*enlaces):
+    """Equipos de maniobras con filas (código, equipo aguas arriba)"""
+    return pd.DataFrame(enlaces, columns=[EQUIPOS['codigo'], EQUIPOS['padre']])
+
+
+def centros(*filas):
+    """Centro MTBT con filas (código, equipo aguas arriba, KVA)"""
+    return pd.DataFrame(filas, columns=[CENTROS['codigo'], CENTROS['padre'], CENTROS['kva']])
+
+
+RED_EQUIPOS = equipos(('EQ-1', None), ('EQ-2', 'EQ-1'), ('EQ-3', 'EQ-1'), ('EQ-9', None))
+RED_CENTROS = centros(('CT-1', 'EQ-2', 50.0), ('CT-2', 'EQ-2', 25.0), ('CT-3', 'EQ-3', 10.0))
+
+
+def test_subarbol_es_el_rango_entrada_salida():
+    indice, ciclos, _ = construir_topologia(RED_EQUIPOS, RED_CENTROS)
+    nodos = IndiceTopologia(indice)
+
+    assert ciclos.empty
+    raiz = nodos.nodo('EQ-1')
+    assert (raiz['Raíz'], raiz['Entrada'], raiz['Salida']) == ('equipo:EQ-1', 0, 5)
+    assert (raiz['KVA aguas abajo'], raiz['Centros aguas abajo']) == (85.0, 3)
+    assert sorted(nodos.aguas_abajo('EQ-2')['Código']) == ['CT-1', 'CT-2']
+    assert nodos.aguas_abajo('EQ-3')['Código'].tolist() == ['CT-3']
+    assert nodos.aguas_arriba('CT-3')['Código'].tolist() == ['EQ-3', 'EQ-1']
+    # Cada subárbol ocupa un rango contiguo: Salida - Entrada + 1 = tamaño del subárbol
+    for _, nodo in indice.iterrows():
+        assert nodo['Salida'] - nodo['Entrada'] + 1 == 1 + len(nodos.aguas_abajo(nodo['Código'], nodo['Tipo'], None))
+
+
+def test_centro_raiz_con_el_codigo_de_un_equipo_es_otro_arbol():
+    # 'EQ-9' es también el código de un centro sin equipo aguas arriba
+    indice, _, _ = construir_topologia(RED_EQUIPOS, centros(('EQ-9', None, 40.0), ('CT-1', 'EQ-9', 5.0)))
+    nodos = IndiceTopologia(indice)
+
+    assert nodos.nodo('EQ-9', 'centro')['Raíz'] == 'centro:EQ-9'
+    assert nodos.nodo('EQ-9')['Raíz'] == 'equipo:EQ-9'
+    assert nodos.aguas_abajo('EQ-9')['Código'].tolist() == ['CT-1']
+    assert nodos.aguas_abajo('EQ-9', 'centro').empty
+    huellas = indice.groupby('Raíz')['Hash árbol'].nunique()
+    assert (huellas == 1).all()
+
+# =============================================================================
+# ACTUALIZACIÓN INCREMENTAL EN LA BASE DE DATOS
+# =============================================================================
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'topologia.db'}")
+    yield engine
+    engine.dispose()
+
+
+def guardar(engine, equipos_df, centros_df):
+    equipos_df.to_sql(EQUIPOS['tabla'], engine, if_exists='replace', index=False)
+    centros_df.to_sql(CENTROS['tabla'], engine, if_exists='replace', index=False)
+
+
+def test_solo_se_reescriben_los_arboles_que_cambiaron(engine):
+    guardar(engine, RED_EQUIPOS, RED_CENTROS)
+    primera = actualizar_topologia(engine)
+    assert (primera['arboles'], primera['arboles_actualizados'], primera['filas_escritas']) == (2, 2, 7)
+
+    assert actualizar_topologia(engine)['arboles_actualizados'] == 0
+
+    # Un centro nuevo bajo EQ-9: solo ese árbol se reescribe
+    guardar(engine, RED_EQUIPOS, pd.concat([RED_CENTROS, centros(('CT-4', 'EQ-9', 15.0))]))
+    segunda = actualizar_topologia(engine)
+    assert (segunda['arboles_actualizados'], segunda['filas_escritas'], segunda['filas_borradas']) == (1, 2, 1)
+
+    nodos = IndiceTopologia.desde_bd(engine)
+    assert len(nodos.nodos) == 8
+    assert nodos.nodo('EQ-9')['KVA aguas abajo'] == 15.0
+    assert nodos.nodo('EQ-1')['KVA aguas abajo'] == 85.0
+
+
+def test_arbol_que_desaparece_se_borra(engine):
+    guardar(engine, RED_EQUIPOS, RED_CENTROS)
+    actualizar_topologia(engine)
+
+    guardar(engine, RED_EQUIPOS[RED_EQUIPOS[EQUIPOS['codigo']] != 'EQ-9'], RED_CENTROS)
+    resumen = actualizar_topologia(engine)
+
+    assert (resumen['arboles_actualizados'], resumen['filas_borradas']) == (1, 1)
+    raices = pd.read_sql(f'SELECT DISTINCT "Raíz" FROM "{TABLA_TOPOLOGIA}"', engine)['Raíz']
+    assert raices.tolist() == ['equipo:EQ-1']
+
+
+def test_codigo_repetido_cuenta_el_ultimo_cargado(engine):
+    # 'id' fuera de orden físico: la fila id = 2 es la carga más reciente de EQ-2
+    guardar(engine, equipos(('EQ-1', None), ('EQ-2', 'EQ-1'), ('EQ-9', None), ('EQ-2', 'EQ-9'))
+            .assign(id=[3, 2, 4, 1]), RED_CENTROS.iloc[:0])
+
+    actualizar_topologia(engine)
+
+    assert IndiceTopologia.desde_bd(engine).nodo('EQ-2')['Padre'] == 'EQ-1'
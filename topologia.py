@@ -0,0 +1,313 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from cargadores import CargadorExecutemany, asegurar_indices, borrar_por_llave
+from esquemas import indices_tabla, separar_codigos
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# ÍNDICE DE TOPOLOGÍA DE LA RED (ENLACES "AGUAS ARRIBA")
+# =============================================================================
+#
+# Equipos de maniobras.'Codigo de Equipo Aguas Arriba' y Centro MTBT.'Equipo aguas
+# arriba' describen el árbol de alimentadores de cada sistema aislado. Después de
+# cargar se arma un índice con un recorrido de Euler por árbol:
+#
+#   Raíz:           '<tipo>:<código>' de la raíz del árbol ('equipo:EQ-1')
+#   Entrada/Salida: numeración en preorden dentro del árbol; el subárbol de un nodo
+#                   son los nodos del mismo árbol con Entrada entre su Entrada y su Salida
+#   KVA aguas abajo / Centros aguas abajo: totales del subárbol ya calculados
+#
+# "Centros MT/BT y KVA aguas abajo del equipo X" pasa de un CTE recursivo a un rango
+# sobre el índice (Raíz, Entrada), o a leer una fila para los totales. El índice se
+# guarda en la tabla 'Topologia Red' y solo se reescriben los árboles cuyos enlaces
+# cambiaron (cada árbol guarda la huella de sus nodos en 'Hash árbol')
+#
+# Los nodos en un ciclo (o colgados de uno) no tienen raíz: se reportan y no se guardan
+
+TABLA_TOPOLOGIA = 'Topologia Red'
+
+EQUIPOS = {
+    'tabla': 'Equipos de maniobras', 'codigo': 'Código de equipo', 'padre': 'Codigo de Equipo Aguas Arriba',
+}
+CENTROS = {
+    'tabla': 'Centro MTBT', 'codigo': 'Código Centro de transformación MT/BT', 'padre': 'Equipo aguas arriba',
+    'kva': 'KVA instalado por transformador',
+}
+
+COLUMNAS_TOPOLOGIA = [
+    'Tipo', 'Código', 'Padre', 'Raíz', 'Profundidad', 'Entrada', 'Salida',
+    'KVA', 'KVA aguas abajo', 'Centros aguas abajo', 'Estado', 'Hash árbol',
+]
+
+# Estado de cada nodo
+RAIZ = 'raíz'              # sin equipo aguas arriba
+CONECTADO = 'conectado'
+HUERFANO = 'huérfano'      # su equipo aguas arriba no existe en Equipos de maniobras
+
+
+def _primer_codigo(serie):
+    """Primer código de cada celda (el enlace aguas arriba puede venir como lista)"""
+    codigos = separar_codigos(serie)
+    primeros = codigos[~codigos.index.duplicated()]
+    return primeros.str.upper().reindex(serie.index), int(codigos.index.duplicated().sum())
+
+
+def _preparar_nodos(equipos, centros):
+    """Equipos y centros (columnas de las tablas) → DataFrame de nodos ordenado y sin repetidos"""
+    partes = []
+    multiples = 0
+    for df, spec, tipo in ((equipos, EQUIPOS, 'equipo'), (centros, CENTROS, 'centro')):
+        if df is None or not len(df):
+            continue
+        padres, repetidos = _primer_codigo(df[spec['padre']])
+        multiples += repetidos
+        partes.append(pd.DataFrame({
+            'Tipo': tipo,
+            'Código': df[spec['codigo']].astype(str).str.strip().str.upper(),
+            'Padre': padres,
+            'KVA': pd.to_numeric(df[spec['kva']], errors='coerce') if 'kva' in spec else np.nan,
+        })[df[spec['codigo']].notna().to_numpy()])
+    if not partes:
+        return pd.DataFrame(columns=['Tipo', 'Código', 'Padre', 'KVA']), 0
+    nodos = pd.concat(partes, ignore_index=True)
+    # Con cargas en modo append un equipo puede estar varias veces: cuenta la última
+    # cargada (las filas llegan ordenadas, ver _leer_columnas)
+    nodos = nodos.drop_duplicates(subset=['Tipo', 'Código'], keep='last')
+    # Orden estable por código: la numeración no depende del orden de las filas en la tabla
+    nodos = nodos.sort_values(['Tipo', 'Código'], kind='stable', ignore_index=True)
+    return nodos, multiples
+
+
+def _niveles(padre):
+    """
+    Recorre el bosque por niveles desde las raíces (padre < 0) con arreglos de hijos
+    en formato CSR: retorna [(nodos del nivel, padres de esos nodos)] y la profundidad
+    (-1 = no alcanzado: ciclo o colgado de un ciclo). Costo O(n) en total
+    """
+    n = len(padre)
+    orden = np.argsort(padre, kind='stable')
+    padres_ordenados = padre[orden]
+    inicio = np.searchsorted(padres_ordenados, np.arange(n), side='left')
+    fin = np.searchsorted(padres_ordenados, np.arange(n), side='right')
+
+    profundidad = np.full(n, -1, dtype=np.int64)
+    nivel = np.flatnonzero(padre < 0)
+    profundidad[nivel] = 0
+    niveles = [(nivel, np.full(len(nivel), -1, dtype=np.int64))]
+    d = 0
+    while len(nivel):
+        cuentas = fin[nivel] - inicio[nivel]
+        total = int(cuentas.sum())
+        if not total:
+            break
+        # Hijos de todos los nodos del nivel, agrupados por padre, sin recorrer nodo por nodo
+        desplazamiento = np.repeat(inicio[nivel] - (np.cumsum(cuentas) - cuentas), cuentas)
+        hijos = orden[desplazamiento + np.arange(total)]
+        d += 1
+        profundidad[hijos] = d
+        niveles.append((hijos, np.repeat(nivel, cuentas)))
+        nivel = hijos
+    return niveles, profundidad
+
+
+def construir_topologia(equipos, centros=None):
+    """
+    Arma el índice de topología a partir de las columnas de Equipos de maniobras y
+    Centro MTBT (DataFrames con los nombres de columna de SQL Server)
+    Retorna (nodos con COLUMNAS_TOPOLOGIA, nodos en ciclos, enlaces con más de un código)
+    """
+    nodos, multiples = _preparar_nodos(equipos, centros)
+    n = len(nodos)
+    equipos_idx = pd.Index(nodos['Código'][nodos['Tipo'] == 'equipo'])
+    posiciones_equipo = np.flatnonzero((nodos['Tipo'] == 'equipo').to_numpy())
+
+    # Arreglo de padres: posición del equipo aguas arriba (-1 si no tiene o no existe)
+    encontrado = equipos_idx.get_indexer(nodos['Padre'].fillna(''))
+    padre = np.where(encontrado >= 0, posiciones_equipo[np.maximum(encontrado, 0)], -1)
+    sin_padre = nodos['Padre'].isna().to_numpy()
+    huerfano = ~sin_padre & (padre < 0)
+    # Un equipo que se declara aguas arriba de sí mismo es un ciclo de un nodo
+    padre = np.where(padre == np.arange(n), -2, padre)
+
+    niveles, profundidad = _niveles(padre)
+
+    # Totales del subárbol, de las hojas hacia las raíces (un nivel a la vez)
+    kva = nodos['KVA'].fillna(0).to_numpy(dtype=float)
+    tamano = np.ones(n, dtype=np.int64)
+    kva_abajo = kva.copy()
+    centros_abajo = (nodos['Tipo'] == 'centro').to_numpy().astype(np.int64)
+    for hijos, padres in reversed(niveles[1:]):
+        np.add.at(tamano, padres, tamano[hijos])
+        np.add.at(kva_abajo, padres, kva_abajo[hijos])
+        np.add.at(centros_abajo, padres, centros_abajo[hijos])
+
+    # Preorden dentro de cada árbol, de las raíces hacia las hojas: cada hijo empieza
+    # después de su padre y de los subárboles de los hermanos anteriores
+    entrada = np.full(n, -1, dtype=np.int64)
+    raiz = np.full(n, -1, dtype=np.int64)
+    raices = niveles[0][0]
+    entrada[raices] = 0
+    raiz[raices] = raices
+    for hijos, padres in niveles[1:]:
+        acumulado = np.cumsum(tamano[hijos]) - tamano[hijos]
+        primero = np.r_[True, padres[1:] != padres[:-1]]
+        base = np.maximum.accumulate(np.where(primero, np.arange(len(hijos)), 0))
+        entrada[hijos] = entrada[padres] + 1 + acumulado - acumulado[base]
+        raiz[hijos] = raiz[padres]
+
+    alcanzados = profundidad >= 0
+    # La raíz se guarda con su tipo: un centro sin enlace es la raíz de su propio árbol
+    # y puede tener el mismo código que un equipo raíz
+    raices_nodos = (nodos['Tipo'] + ':' + nodos['Código']).to_numpy()
+    indice = pd.DataFrame({
+        'Tipo': nodos['Tipo'],
+        'Código': nodos['Código'],
+        'Padre': nodos['Padre'],
+        'Raíz': np.where(alcanzados, raices_nodos[np.maximum(raiz, 0)], None),
+        'Profundidad': profundidad,
+        'Entrada': entrada,
+        'Salida': entrada + tamano - 1,
+        'KVA': nodos['KVA'],
+        'KVA aguas abajo': kva_abajo,
+        'Centros aguas abajo': centros_abajo,
+        'Estado': np.where(huerfano, HUERFANO, np.where(sin_padre, RAIZ, CONECTADO)),
+    })
+    ciclos = indice[~alcanzados]
+    indice = indice[alcanzados].copy()
+
+    # Huella de cada árbol (suma de los hashes de sus nodos, sin importar el orden)
+    hashes = pd.util.hash_pandas_object(indice[['Tipo', 'Código', 'Padre', 'KVA']], index=False)
+    huellas = hashes.groupby(indice['Raíz'].to_numpy()).sum()
+    indice['Hash árbol'] = indice['Raíz'].map(huellas).astype('uint64').astype('int64')
+    indice = indice.sort_values(['Raíz', 'Entrada'], ignore_index=True)[COLUMNAS_TOPOLOGIA]
+    return indice, ciclos[['Tipo', 'Código', 'Padre']].reset_index(drop=True), multiples
+
+
+class IndiceTopologia:
+    """
+    Consultas sobre el índice (en memoria o leído de la tabla 'Topologia Red'):
+    las filas están ordenadas por (Raíz, Entrada), así un subárbol es un rango que se
+    encuentra con búsqueda binaria
+
+        indice = IndiceTopologia.desde_bd(engine)
+        indice.aguas_abajo('EQ-12')                    # centros MT/BT aguas abajo
+        indice.nodo('EQ-12')['KVA aguas abajo']        # total sin recorrer el subárbol
+    """
+
+    def __init__(self, nodos):
+        self.nodos = nodos.sort_values(['Raíz', 'Entrada'], ignore_index=True)
+        self._raices = self.nodos['Raíz'].to_numpy()
+        self._entradas = self.nodos['Entrada'].to_numpy()
+        self._posiciones = {
+            (tipo, codigo): i for i, (tipo, codigo) in enumerate(zip(self.nodos['Tipo'], self.nodos['Código']))
+        }
+
+    @classmethod
+    def desde_bd(cls, engine, tabla=TABLA_TOPOLOGIA):
+        return cls(pd.read_sql_table(tabla, engine, columns=COLUMNAS_TOPOLOGIA))
+
+    def nodo(self, codigo, tipo='equipo'):
+        """Fila del nodo (KeyError si no está en el índice)"""
+        return self.nodos.iloc[self._posiciones[(tipo, str(codigo).strip().upper())]]
+
+    def aguas_abajo(self, codigo, tipo='equipo', solo='centro'):
+        """Nodos del subárbol (sin el propio nodo); `solo` filtra por tipo (None = todos)"""
+        nodo = self.nodo(codigo, tipo)
+        inicio = np.searchsorted(self._raices, nodo['Raíz'], side='left')
+        fin = np.searchsorted(self._raices, nodo['Raíz'], side='right')
+        desde = inicio + np.searchsorted(self._entradas[inicio:fin], nodo['Entrada'], side='right')
+        hasta = inicio + np.searchsorted(self._entradas[inicio:fin], nodo['Salida'], side='right')
+        subarbol = self.nodos.iloc[desde:hasta]
+        return subarbol[subarbol['Tipo'] == solo] if solo else subarbol
+
+    def aguas_arriba(self, codigo, tipo='centro'):
+        """Equipos desde el nodo hasta la raíz (el más cercano primero)"""
+        camino = []
+        nodo = self.nodo(codigo, tipo)
+        while isinstance(nodo['Padre'], str) and ('equipo', nodo['Padre']) in self._posiciones:
+            nodo = self.nodo(nodo['Padre'])
+            camino.append(nodo)
+        return pd.DataFrame(camino)
+
+
+def _leer_columnas(engine, spec):
+    """
+    Columnas de la tabla que necesita la topología (None si la tabla no existe), en orden
+    de carga: por 'id' (IDENTITY de CreateScript.sql) o, si la tabla no lo tiene, por las
+    mismas columnas. Sin ORDER BY el orden de SQL Server es arbitrario y el código
+    repetido que "cuenta la última" (ver _preparar_nodos) cambiaría entre corridas
+    """
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    if not inspector.has_table(spec['tabla']):
+        return None
+    columnas = [spec['codigo'], spec['padre']] + ([spec['kva']] if 'kva' in spec else [])
+    existentes = {columna['name'] for columna in inspector.get_columns(spec['tabla'])}
+    preparer = engine.dialect.identifier_preparer
+    orden = ['id'] if 'id' in existentes else columnas
+    return pd.read_sql(
+        f"SELECT {', '.join(preparer.quote(c) for c in columnas)} FROM {preparer.quote(spec['tabla'])} "
+        f"ORDER BY {', '.join(preparer.quote(c) for c in orden)}",
+        engine,
+    )
+
+
+def _huellas_guardadas(engine, tabla):
+    from sqlalchemy import inspect, text
+
+    if not inspect(engine).has_table(tabla):
+        return None
+    preparer = engine.dialect.identifier_preparer
+    with engine.connect() as conexion:
+        filas = conexion.execute(text(
+            f"SELECT DISTINCT {preparer.quote('Raíz')}, {preparer.quote('Hash árbol')} FROM {preparer.quote(tabla)}"
+        )).all()
+    return {raiz: huella for raiz, huella in filas}
+
+
+def actualizar_topologia(engine, tabla=TABLA_TOPOLOGIA):
+    """
+    Reconstruye el índice desde las tablas cargadas y reescribe en `tabla` solo los
+    árboles nuevos, modificados o que desaparecieron. Retorna un resumen (dict)
+    """
+    indice, ciclos, multiples = construir_topologia(_leer_columnas(engine, EQUIPOS), _leer_columnas(engine, CENTROS))
+    nuevas = dict(zip(indice['Raíz'], indice['Hash árbol']))
+    guardadas = _huellas_guardadas(engine, tabla)
+
+    if guardadas is None:
+        cambiadas = set(nuevas)
+    else:
+        cambiadas = {raiz for raiz, huella in nuevas.items() if guardadas.get(raiz) != huella}
+        cambiadas |= set(guardadas) - set(nuevas)
+
+    if cambiadas:
+        filas = indice[indice['Raíz'].isin(cambiadas)]
+        cargador = CargadorExecutemany()
+        # Un árbol a medias no sirve: cualquier rechazo hace fallar la actualización
+        cargador.max_rechazos = 0
+        # DELETE e INSERT en una sola transacción: si la inserción falla, los árboles
+        # guardados quedan como estaban
+        with engine.connect() as conexion, conexion.begin():
+            borradas = borrar_por_llave(conexion, tabla, 'Raíz', cambiadas) if guardadas else 0
+            cargador.cargar(filas, tabla, conexion)
+        asegurar_indices(engine, tabla, indices_tabla(tabla))
+    else:
+        borradas, filas = 0, indice.iloc[:0]
+
+    return {
+        'nodos': len(indice),
+        'arboles': len(nuevas),
+        'arboles_actualizados': len(cambiadas),
+        'filas_escritas': len(filas),
+        'filas_borradas': borradas,
+        'huerfanos': int((indice['Estado'] == HUERFANO).sum()),
+        'ejemplos_huerfanos': indice.loc[indice['Estado'] == HUERFANO, 'Código'].head(3).tolist(),
+        'en_ciclos': len(ciclos),
+        'ejemplos_ciclos': ciclos['Código'].head(3).tolist(),
+        'enlaces_multiples': multiples,
+    }
@@ -0,0 +1,325 @@
+import os
+import queue
+import signal
+import logging
+import zipfile
+import threading
+import time
+from pathlib import Path
+from importlib.util import find_spec
+
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# VIGILANCIA DE CARPETA: CARGA CADA LIBRO EN CUANTO LLEGA
+# =============================================================================
+#
+# En lugar de recorrer la carpeta en cada corrida de cron, el servicio queda
+# escuchando cambios y carga cada libro nuevo o modificado con el mismo Pipeline
+# (engine, pool de conexiones, catálogo de columnas y caché ya calientes):
+#
+#   evento (watchdog/inotify o sondeo) → espera a que el archivo deje de cambiar
+#   → cola de listos → Pipeline.procesar_archivos([libro])
+#
+# Con watchdog el hilo principal duerme bloqueado en la cola mientras no llegan
+# archivos (una carpeta sin actividad no consume CPU). Sin watchdog se sondea la
+# carpeta cada `intervalo` segundos comparando tamaño y fecha de modificación (sin
+# leer ni hashear los archivos). Al detener el servicio (Ctrl+C o SIGTERM) se
+# terminan de cargar los libros que ya estaban listos antes de salir
+
+EXTENSIONES_EXCEL = ('.xlsx', '.xls')
+
+# Segundos sin cambios de tamaño ni fecha antes de considerar un archivo completo
+ESPERA_POR_DEFECTO = 2.0
+# Segundos entre revisiones de la carpeta cuando no hay watchdog
+INTERVALO_SONDEO_POR_DEFECTO = 5.0
+
+WATCHDOG_DISPONIBLE = find_spec('watchdog') is not None
+
+# Marca en la cola de eventos para despertar al hilo principal al detener
+_DETENER = object()
+
+# En Windows una espera bloqueada sin límite no atiende Ctrl+C: se despierta cada segundo
+_ESPERA_MAXIMA = 1.0 if os.name == 'nt' else None
+
+
+def es_libro_excel(ruta):
+    """Libros Excel, sin los archivos de bloqueo (~$Libro.xlsx) ni temporales de Office"""
+    nombre = Path(ruta).name
+    return (
+        nombre.lower().endswith(EXTENSIONES_EXCEL)
+        and not nombre.startswith(('~$', '.~'))
+    )
+
+
+def firma_archivo(ruta):
+    """(tamaño, mtime en ns) del archivo, o None si no existe o no se puede leer"""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_size, estado.st_mtime_ns
+
+
+def archivo_completo(ruta):
+    """
+    True si el archivo se puede abrir y, en .xlsx, el zip ya tiene su directorio
+    final (un .xlsx copiado a medias no lo tiene). En Windows un archivo que aún
+    se está copiando no se puede abrir
+    """
+    try:
+        with open(ruta, 'rb') as archivo:
+            archivo.read(1)
+    except OSError:
+        return False
+    if str(ruta).lower().endswith('.xlsx'):
+        return zipfile.is_zipfile(ruta)
+    return True
+
+
+class VigilanteCarpeta:
+    """
+    Servicio que vigila una carpeta y carga los libros que llegan con un Pipeline
+    (etl_sistemas_aislados.Pipeline), reutilizando su engine y pool de conexiones
+
+        vigilante = VigilanteCarpeta(pipeline, carpeta)
+        vigilante.ejecutar()        # hasta Ctrl+C / SIGTERM / vigilante.detener()
+    """
+
+    def __init__(self, pipeline, carpeta=None, espera=ESPERA_POR_DEFECTO,
+                 intervalo=INTERVALO_SONDEO_POR_DEFECTO, usar_watchdog=None):
+        self.pipeline = pipeline
+        self.carpeta = Path(carpeta or pipeline.configuracion.carpeta_excel)
+        self.espera = espera
+        self.intervalo = intervalo
+        self.usar_watchdog = WATCHDOG_DISPONIBLE if usar_watchdog is None else usar_watchdog
+        # Rutas con cambios recientes (las escriben el observador o el hilo de sondeo)
+        self._eventos = queue.Queue()
+        # Archivos esperando a que dejen de cambiar: ruta → (firma, instante del último cambio)
+        self._en_espera = {}
+        # Archivos completos, en orden de llegada, pendientes de carga
+        self._listos = []
+        self._detenido = threading.Event()
+        self._observador = None
+        self._hilo_sondeo = None
+        self.cargados = 0
+
+    # -------------------------------------------------------------------------
+    # Detección de cambios
+    # -------------------------------------------------------------------------
+    def _notificar(self, ruta):
+        if es_libro_excel(ruta):
+            self._eventos.put(Path(ruta))
+
+    def _iniciar_watchdog(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        vigilante = self
+
+        class _Manejador(FileSystemEventHandler):
+            def on_created(self, evento):
+                if not evento.is_directory:
+                    vigilante._notificar(evento.src_path)
+
+            def on_modified(self, evento):
+                if not evento.is_directory:
+                    vigilante._notificar(evento.src_path)
+
+            def on_moved(self, evento):
+                # Copias que se escriben con un nombre temporal y se renombran al final
+                if not evento.is_directory:
+                    vigilante._notificar(evento.dest_path)
+
+        self._observador = Observer()
+        self._observador.schedule(_Manejador(), str(self.carpeta), recursive=False)
+        self._observador.start()
+        logger.info(f"✓ Vigilando {self.carpeta} con eventos del sistema de archivos (watchdog)")
+
+    def _escanear(self):
+        """{ruta: (tamaño, mtime)} de los libros de la carpeta (solo stat, sin abrirlos)"""
+        firmas = {}
+        with os.scandir(self.carpeta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and es_libro_excel(entrada.name):
+                    estado = entrada.stat()
+                    firmas[entrada.path] = (estado.st_size, estado.st_mtime_ns)
+        return firmas
+
+    def _sondear(self, firmas):
+        """Hilo de respaldo sin watchdog: compara tamaño y mtime de los libros en cada vuelta"""
+        while not self._detenido.wait(self.intervalo):
+            try:
+                actuales = self._escanear()
+            except OSError as e:
+                logger.warning(f"⚠️  No se pudo revisar la carpeta {self.carpeta}: {str(e)}")
+                continue
+            for ruta, firma in actuales.items():
+                if firmas.get(ruta) != firma:
+                    self._notificar(ruta)
+            firmas = actuales
+
+    def _iniciar_sondeo(self):
+        # Lo que ya está en la carpeta lo cubre la carga inicial
+        self._hilo_sondeo = threading.Thread(
+            target=self._sondear, args=(self._escanear(),), name='sondeo-carpeta', daemon=True
+        )
+        self._hilo_sondeo.start()
+        logger.info(f"✓ Vigilando {self.carpeta} por sondeo cada {self.intervalo:g} s (watchdog no instalado)")
+
+    # -------------------------------------------------------------------------
+    # Espera de archivos a medio escribir
+    # -------------------------------------------------------------------------
+    def _registrar_cambio(self, ruta):
+        firma = firma_archivo(ruta)
+        if firma is None:
+            # Borrado o renombrado antes de terminar de copiarse
+            self._en_espera.pop(ruta, None)
+            return
+        anterior = self._en_espera.get(ruta)
+        if anterior is None or anterior[0] != firma:
+            self._en_espera[ruta] = (firma, time.monotonic())
+
+    def _revisar_en_espera(self):
+        """Pasa a la cola de listos los archivos que dejaron de cambiar; retorna segundos hasta la próxima revisión"""
+        ahora = time.monotonic()
+        proxima = None
+        for ruta, (firma, instante) in list(self._en_espera.items()):
+            faltan = instante + self.espera - ahora
+            if faltan > 0:
+                proxima = faltan if proxima is None else min(proxima, faltan)
+                continue
+            actual = firma_archivo(ruta)
+            if actual != firma:
+                # Cambió sin que llegara evento (p. ej. en sondeo): volver a esperar
+                self._registrar_cambio(ruta)
+                proxima = self.espera if proxima is None else min(proxima, self.espera)
+                continue
+            if not archivo_completo(ruta):
+                self._en_espera[ruta] = (firma, ahora)
+                proxima = self.espera if proxima is None else min(proxima, self.espera)
+                continue
+            del self._en_espera[ruta]
+            if ruta not in self._listos:
+                self._listos.append(ruta)
+        return proxima
+
+    # -------------------------------------------------------------------------
+    # Ciclo principal
+    # -------------------------------------------------------------------------
+    def _cargar_listos(self):
+        while self._listos:
+            ruta = self._listos.pop(0)
+            logger.info(f"\n{'#'*60}")
+            logger.info(f"ARCHIVO RECIBIDO: {ruta.name}")
+            logger.info(f"{'#'*60}")
+            # Métricas y resumen de cada archivo por separado (el servicio no acumula mediciones)
+            metricas.registro.extraer()
+            try:
+                resultados = self.pipeline.procesar_archivos([ruta])
+                self.cargados += bool(resultados)
+            except Exception as e:
+                logger.error(f"✗ Error procesando {ruta.name}: {str(e)}")
+
+    def _esperar_evento(self, timeout):
+        """Bloquea hasta el próximo evento (o `timeout`); procesa todos los eventos acumulados"""
+        try:
+            evento = self._eventos.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            if evento is not _DETENER:
+                self._registrar_cambio(evento)
+            try:
+                evento = self._eventos.get_nowait()
+            except queue.Empty:
+                return
+
+    def _senal(self, numero, marco):
+        if self._detenido.is_set():
+            # Segunda señal: salir sin esperar
+            raise KeyboardInterrupt
+        logger.info("\nSeñal de detención recibida - se termina lo que está en cola (repetir para forzar)")
+        self.detener()
+
+    def _instalar_senales(self):
+        """Ctrl+C y SIGTERM (servicio detenido) terminan la carga en curso y lo listo antes de salir"""
+        anteriores = {}
+        if threading.current_thread() is not threading.main_thread():
+            return anteriores
+        for nombre in ('SIGINT', 'SIGTERM'):
+            numero = getattr(signal, nombre, None)
+            if numero is None:
+                continue
+            try:
+                anteriores[numero] = signal.signal(numero, self._senal)
+            except (ValueError, OSError):
+                pass
+        return anteriores
+
+    def detener(self):
+        """Pide detener el servicio; los archivos ya listos se cargan antes de salir"""
+        self._detenido.set()
+        self._eventos.put(_DETENER)
+
+    def ejecutar(self):
+        """Carga lo pendiente de la carpeta y luego vigila hasta que se pida detener"""
+        anteriores = self._instalar_senales()
+        logger.info("="*60)
+        logger.info("SERVICIO DE CARGA CONTINUA")
+        logger.info("="*60)
+
+        # La vigilancia empieza antes de la carga inicial: lo que llegue durante esa
+        # carga queda en la cola de eventos
+        if self.usar_watchdog:
+            self._iniciar_watchdog()
+        else:
+            self._iniciar_sondeo()
+
+        try:
+            # Primero lo que ya estaba en la carpeta (lo llegado mientras el servicio no corría)
+            try:
+                self.pipeline.ejecutar(self.carpeta)
+            except Exception as e:
+                logger.error(f"✗ Error en la carga inicial: {str(e)}")
+
+            while not self._detenido.is_set():
+                # Sin archivos en espera se duerme hasta el próximo evento
+                proxima = self._revisar_en_espera()
+                self._esperar_evento(proxima if proxima is not None else _ESPERA_MAXIMA)
+                self._revisar_en_espera()
+                self._cargar_listos()
+        except KeyboardInterrupt:
+            # Detención forzada (segunda señal): no se carga nada más
+            self._detenido.set()
+            self._listos.clear()
+            self._en_espera.clear()
+            with self._eventos.mutex:
+                self._eventos.queue.clear()
+        finally:
+            logger.info("\nDeteniendo el servicio de carga continua...")
+            if self._observador is not None:
+                self._observador.stop()
+                self._observador.join()
+            # Vaciar la cola: lo que ya estaba completo se carga antes de salir
+            while True:
+                try:
+                    evento = self._eventos.get_nowait()
+                except queue.Empty:
+                    break
+                if evento is not _DETENER:
+                    self._registrar_cambio(evento)
+            self._revisar_en_espera()
+            if self._listos:
+                logger.info(f"   Cargando {len(self._listos)} archivo(s) que ya estaban en cola...")
+            self._cargar_listos()
+            if self._en_espera:
+                logger.warning(
+                    f"⚠️  {len(self._en_espera)} archivo(s) aún se estaban escribiendo - "
+                    f"se cargarán al volver a iniciar el servicio: {[r.name for r in self._en_espera]}"
+                )
+            logger.info(f"✓ Servicio detenido ({self.cargados} archivo(s) cargados en esta sesión)")
+            for numero, manejador in anteriores.items():
+                signal.signal(numero, manejador)